@@ -1,30 +1,138 @@
-from parse_resume_pdf import extract_text_from_pdf
-from gemini_ai_writer import generate_mail_dict, regenerate_mail_body
-from automate_mail import send_email
+from resume_cache import resume_cache
+from resume_store import resume_store, parsed_resume
+from uploads import read_upload, parse_resume_upload
+from executor import run_io, iterate_io, shutdown_pools, pool_stats, PoolSaturated
+from gemini_ai_writer import (
+    generate_mail_dict,
+    regenerate_mail_body,
+    stream_mail_dict,
+    stream_mail_body,
+    regenerate_instruction,
+    gemini_quota
+)
+from rate_limiter import BATCH, QuotaTimeout
+from automate_mail import (
+    send_email_async,
+    smtp_pool,
+    attachment_parts,
+    transport_stats,
+    async_transport_stats,
+    threaded_fallback_transports,
+    close_async_transports
+)
+from mail_queue import mail_queue
+from mail_template import Template
+from campaigns import (
+    campaign_store,
+    campaign_runner,
+    parse_contacts,
+    contact_email,
+    RECIPIENT_STATUSES
+)
+from llm_cache import llm_cache
+from model_registry import warm_up as warm_up_models
+from prompt_prep import prep_stats
+from jd_analyzer import analyzer_stats
+from speculation import regenerate_speculator
+from gmail_auth import gmail_holder, credentials_from_info
+from shared_state import shared_cache
+from metrics import registry, request_seconds, start_trace, end_trace, server_timing
 from schemas import (
     SendEmailRequest,
     SendEmailResponse,
     GenerateEmailResponse,
     GenerateEmailData,
     RegenerateResponse,
+    BatchSendResponse,
+    JobStatusResponse,
+    BatchEmailItem,
+    GenerateBatchItem,
+    ResumeUploadResponse,
+    CampaignResponse,
+    CampaignStatusResponse,
+    CampaignRecipientsResponse,
     ErrorResponse
 )
+from config import (
+    GENERATE_BATCH_MAX_ITEMS,
+    GENERATE_BATCH_CONCURRENCY,
+    MAX_ATTACHMENT_SIZE,
+    MAX_REQUEST_OVERHEAD,
+    LOG_LEVEL,
+    HOT_PATH_LOG_LEVEL,
+    GMAIL_REFRESH_INTERVAL_SECONDS,
+    ADMIN_TOKEN,
+    CAMPAIGN_MAX_CONTACTS,
+    MAIL_ASYNC_TRANSPORTS
+)
 
 import os
-import tempfile
-import shutil
+import json
+import time
+import hmac
+import asyncio
 import logging
+from contextlib import asynccontextmanager
+from typing import List
 from pydantic import ValidationError
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # ---------- Setup ----------
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=LOG_LEVEL)
 logger = logging.getLogger(__name__)
+# Per-request logs (see HOT_PATH_LOG_LEVEL); quiet by default
+logging.getLogger("hotpath").setLevel(HOT_PATH_LOG_LEVEL)
+hot_logger = logging.getLogger(f"hotpath.{__name__}")
+
+
+async def refresh_gmail_token():
+    """
+    Server auth mode: the only place the Gmail token is refreshed, so
+    requests never wait on (or race for) a refresh.
+    """
+    while True:
+        try:
+            if not await run_io(gmail_holder.refresh_if_needed):
+                logger.warning("No usable Gmail token — provision one with `python gmail_auth.py provision`")
+        except Exception:
+            logger.exception("Gmail token refresh failed")
+        await asyncio.sleep(GMAIL_REFRESH_INTERVAL_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await run_io(warm_up_models)
+    except Exception:
+        logger.exception("Gemini warm-up failed")
+    if MAIL_ASYNC_TRANSPORTS and threaded_fallback_transports():
+        logger.warning(
+            "aiosmtplib/httpx not installed: API sends via %s use the threaded fallback on the I/O pool",
+            ", ".join(threaded_fallback_transports()),
+        )
+    mail_queue.start()
+    refresher = None if gmail_holder.interactive else asyncio.create_task(refresh_gmail_token())
+    await campaign_runner.resume_interrupted()
+    yield
+    if regenerate_speculator:
+        regenerate_speculator.close()
+    await campaign_runner.stop_all()
+    if refresher is not None:
+        refresher.cancel()
+        try:
+            await refresher
+        except asyncio.CancelledError:
+            pass
+    mail_queue.stop()
+    await close_async_transports()
+    shutdown_pools()
+    smtp_pool.close_all()
+
 
-app = FastAPI(title="AI Job Application Email Generator API")
+app = FastAPI(title="AI Job Application Email Generator API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -34,6 +142,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ---------- Request Size Limit ----------
+@app.middleware("http")
+async def limit_request_size(request: Request, call_next):
+    # Reject oversized uploads before the multipart body is spooled at all
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and \
+            int(content_length) > MAX_ATTACHMENT_SIZE + MAX_REQUEST_OVERHEAD:
+        return JSONResponse(
+            status_code=413,
+            content=ErrorResponse(
+                error_code=413,
+                message=f"Request must be at most {MAX_ATTACHMENT_SIZE // (1024 * 1024)} MB"
+            ).model_dump()
+        )
+
+    return await call_next(request)
+
+
+# ---------- Request Metrics ----------
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    trace, token = start_trace()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        if trace:
+            # Streaming responses only include stages finished before headers
+            response.headers["Server-Timing"] = server_timing(trace)
+        return response
+    finally:
+        end_trace(token)
+        route = request.scope.get("route")
+        request_seconds.observe(
+            time.perf_counter() - start,
+            request.method,
+            route.path if route is not None else "unmatched",
+            status,
+        )
+
+
 # ---------- Global Error Handler ----------
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -56,30 +206,229 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     )
 
 
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": "1"},
+        content=ErrorResponse(
+            error_code=503,
+            message="Server is busy, please retry shortly",
+            details={"pool": exc.pool_name}
+        ).model_dump()
+    )
+
+
+@app.exception_handler(QuotaTimeout)
+async def quota_timeout_handler(request: Request, exc: QuotaTimeout):
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(exc.retry_after)},
+        content=ErrorResponse(
+            error_code=429,
+            message="AI quota exhausted, please retry shortly",
+            details={"quota": exc.name, "waited_seconds": round(exc.waited, 1)}
+        ).model_dump()
+    )
+
+
+# ---------- Stats ----------
+def collect_stats():
+    # Runs on the I/O pool: mail_queue.stats() counts rows in SQLite
+    return {
+        "resume_cache": resume_cache.stats(),
+        "pools": pool_stats(),
+        "gmail_service": gmail_holder.stats(),
+        "smtp_pool": smtp_pool.stats(),
+        "mail_transports": transport_stats(),
+        "async_transports": async_transport_stats(),
+        "attachment_parts": attachment_parts.stats(),
+        "mail_queue": mail_queue.stats(),
+        "campaigns": campaign_runner.stats(),
+        "llm_cache": llm_cache.stats(),
+        "shared_cache": shared_cache.stats() if shared_cache else None,
+        "gemini_quota": gemini_quota.stats(),
+        "prompt_prep": prep_stats.snapshot(),
+        "jd_analyzer": analyzer_stats.snapshot(),
+        "speculation": regenerate_speculator.stats() if regenerate_speculator else None
+    }
+
+
+@app.get("/stats")
+async def stats_api():
+    return await run_io(collect_stats)
+
+
+def component_stat_samples():
+    # Numeric leaves of /stats, e.g. component="llm_cache", stat="memory.hits"
+    def walk(prefix, value):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                yield from walk(f"{prefix}.{key}" if prefix else str(key), child)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield prefix, value
+
+    for component, values in collect_stats().items():
+        for stat, value in walk("", values):
+            yield (component, stat), value
+
+
+registry.gauge(
+    "component_stat", "Numeric values from /stats, per component.", ("component", "stat"), component_stat_samples
+)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_api():
+    # component_stat collects /stats, so rendering leaves the event loop too
+    return PlainTextResponse(await run_io(registry.render), media_type="text/plain; version=0.0.4")
+
+
+# ---------- Admin ----------
+def require_admin(token):
+    if ADMIN_TOKEN is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"code": "ADMIN_DISABLED", "message": "Admin endpoints are disabled (ADMIN_TOKEN is not set)"}
+        )
+    if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=401,
+            detail={"code": "UNAUTHORIZED", "message": "Missing or invalid X-Admin-Token"}
+        )
+
+
+@app.get("/admin/gmail/status")
+async def gmail_status_api(x_admin_token: str = Header(None)):
+    require_admin(x_admin_token)
+    return await run_io(gmail_holder.status)
+
+
+@app.post("/admin/gmail/token")
+async def gmail_token_api(token_file: UploadFile = File(...), x_admin_token: str = Header(None)):
+    """
+    Installs a token.json produced by `python gmail_auth.py provision` on
+    another machine, for servers that cannot open a browser.
+    """
+    require_admin(x_admin_token)
+    try:
+        info = json.loads(await token_file.read())
+        creds = await run_io(credentials_from_info, info)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(
+            status_code=400,
+            detail={"code": "INVALID_TOKEN", "message": str(e)}
+        )
+
+    await run_io(gmail_holder.provision, creds)
+    return {"status": "success", "gmail": await run_io(gmail_holder.status)}
+
+
+# ---------- Resumes ----------
+def ensure_pdf(resume_file):
+    if resume_file.content_type != "application/pdf":
+        raise HTTPException(
+            status_code=400,
+            detail={"code": "INVALID_FILE", "message": "Resume must be PDF"}
+        )
+
+
+def resume_not_found(resume_id):
+    return HTTPException(
+        status_code=404,
+        detail={"code": "RESUME_NOT_FOUND", "message": f"No stored resume with id {resume_id}"}
+    )
+
+
+def stored_resume_path(resume_id):
+    path = resume_store.path(resume_id)
+    if path is None:
+        raise resume_not_found(resume_id)
+    return path
+
+
+async def load_resume(resume_file=None, resume_id=None):
+    """
+    (text, links) for the request's resume: a stored resume_id takes
+    precedence over an uploaded file. Returns (None, None) if neither is given.
+    """
+    if resume_id:
+        parsed = await parsed_resume(resume_id)
+        if parsed is None:
+            raise resume_not_found(resume_id)
+        return parsed
+
+    if resume_file:
+        ensure_pdf(resume_file)
+        return await parse_resume_upload(resume_file)
+
+    return None, None
+
+
+async def load_resume_or_500(resume_file, resume_id, failure):
+    """
+    load_resume for the streaming and batch endpoints, which load the resume
+    before their response starts: a corrupt PDF becomes the same
+    INTERNAL_ERROR the other endpoints return, prefixed with `failure`.
+    """
+    try:
+        return await load_resume(resume_file, resume_id)
+    except (HTTPException, PoolSaturated, QuotaTimeout):
+        raise
+    except Exception as e:
+        logger.exception("Loading the resume failed")
+        raise HTTPException(
+            status_code=500,
+            detail={"code": "INTERNAL_ERROR", "message": f"{failure}: {str(e)}"}
+        )
+
+
+@app.post("/resumes", response_model=ResumeUploadResponse)
+async def upload_resume_api(resume_file: UploadFile = File(...)):
+    """
+    Stores the resume once and parses it up front. The returned resume_id can
+    be passed instead of resume_file to every generate/regenerate/send endpoint.
+    """
+    ensure_pdf(resume_file)
+
+    data = await read_upload(resume_file)
+    resume_id = await run_io(resume_store.save, data, resume_file.filename)
+    await parsed_resume(resume_id)
+
+    return ResumeUploadResponse(
+        status="success",
+        resume_id=resume_id,
+        filename=resume_file.filename or "resume.pdf",
+        size=len(data)
+    )
+
+
+# ---------- LLM Cache Option ----------
+def use_llm_cache(cache):
+    """Maps the per-request `cache` form field to a use_cache flag."""
+    if cache is None or cache in ("", "default"):
+        return True
+    if cache == "bypass":
+        return False
+
+    raise HTTPException(
+        status_code=400,
+        detail={"code": "INVALID_CACHE_OPTION", "message": "cache must be 'default' or 'bypass'"}
+    )
+
+
 # ---------- Generate Email ----------
 @app.post("/generate-email", response_model=GenerateEmailResponse)
 async def generate_email_api(
     jd_text: str = Form(...),
-    resume_file: UploadFile | None = File(None)
+    resume_file: UploadFile | None = File(None),
+    resume_id: str | None = Form(None),
+    cache: str | None = Form(None)
 ):
     try:
-        resume_text, resume_links = None, None
+        resume_text, resume_links = await load_resume(resume_file, resume_id)
 
-        if resume_file:
-            if resume_file.content_type != "application/pdf":
-                raise HTTPException(
-                    status_code=400,
-                    detail={"code": "INVALID_FILE", "message": "Resume must be PDF"}
-                )
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                tmp.write(await resume_file.read())
-                resume_path = tmp.name
-
-            resume_text, resume_links = extract_text_from_pdf(resume_path)
-            os.remove(resume_path)
-
-        email_data = generate_mail_dict(jd_text, resume_text, resume_links)
+        email_data = await run_io(generate_mail_dict, jd_text, resume_text, resume_links, use_llm_cache(cache))
 
         if email_data.get("error"):
             raise HTTPException(
@@ -87,14 +436,17 @@ async def generate_email_api(
                 detail={"code": "AI_GENERATION_FAILED", "message": "AI failed to generate email"}
             )
 
-        logger.info(f"Generated email data: {email_data}")
+        hot_logger.debug("Generated email data: %s", email_data)
+
+        if regenerate_speculator:
+            regenerate_speculator.speculate(email_data.get("body"), resume_text)
 
         return GenerateEmailResponse(
             status="success",
             data=GenerateEmailData(**email_data)
         )
 
-    except HTTPException:
+    except (HTTPException, PoolSaturated, QuotaTimeout):
         raise
     except Exception as e:
         raise HTTPException(
@@ -103,18 +455,180 @@ async def generate_email_api(
         )
 
 
+# ---------- Streaming ----------
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def sse_error(error_code, message):
+    return sse_event("error", ErrorResponse(error_code=error_code, message=message).model_dump())
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@app.post("/generate-email/stream")
+async def generate_email_stream_api(
+    jd_text: str = Form(...),
+    resume_file: UploadFile | None = File(None),
+    resume_id: str | None = Form(None),
+    cache: str | None = Form(None)
+):
+    """
+    Server-sent events variant of /generate-email. Emits a `field` event for
+    recipient, cc and subject as soon as each is complete, then `done` with
+    the full GenerateEmailData (or `error`).
+    """
+    use_cache = use_llm_cache(cache)
+    resume_text, resume_links = await load_resume_or_500(
+        resume_file, resume_id, "Unexpected error during generation"
+    )
+
+    async def events():
+        try:
+            async for event in iterate_io(stream_mail_dict, jd_text, resume_text, resume_links, use_cache):
+                if event[0] == "field":
+                    _, name, value = event
+                    yield sse_event("field", {"name": name, "value": value})
+                    continue
+
+                email_data = event[1]
+                if email_data.get("error"):
+                    yield sse_error(500, "AI failed to generate email")
+                else:
+                    yield sse_event("done", GenerateEmailData(**email_data).model_dump())
+                    if regenerate_speculator:
+                        regenerate_speculator.speculate(email_data.get("body"), resume_text)
+        except PoolSaturated:
+            yield sse_error(503, "Server is busy, please retry shortly")
+        except QuotaTimeout:
+            yield sse_error(429, "AI quota exhausted, please retry shortly")
+        except Exception as e:
+            logger.exception("Streaming generation failed")
+            yield sse_error(500, f"Unexpected error during generation: {str(e)}")
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+# ---------- Batch Generate ----------
+async def generate_batch_item(index, jd_text, resume_text, resume_links, slots, use_cache=True):
+    async with slots:
+        try:
+            email_data = await run_io(generate_mail_dict, jd_text, resume_text, resume_links, use_cache, BATCH)
+        except PoolSaturated:
+            return GenerateBatchItem(index=index, status="error", error_code=503, message="Server is busy, please retry shortly")
+        except QuotaTimeout:
+            return GenerateBatchItem(index=index, status="error", error_code=429, message="AI quota exhausted, please retry later")
+        except Exception as e:
+            logger.exception("Batch generation failed for item %s", index)
+            return GenerateBatchItem(index=index, status="error", error_code=500, message=f"Unexpected error during generation: {str(e)}")
+
+    if email_data.get("error"):
+        return GenerateBatchItem(index=index, status="error", error_code=500, message="AI failed to generate email")
+
+    try:
+        return GenerateBatchItem(index=index, status="success", data=GenerateEmailData(**email_data))
+    except ValidationError:
+        return GenerateBatchItem(index=index, status="error", error_code=500, message="AI returned incomplete email data")
+
+
+@app.post("/generate-email/batch")
+async def generate_email_batch_api(
+    jd_texts: List[str] = Form(...),
+    resume_file: UploadFile | None = File(None),
+    resume_id: str | None = Form(None),
+    cache: str | None = Form(None)
+):
+    """
+    Generates one draft per JD. The resume is parsed once and the Gemini calls
+    fan out with bounded concurrency; each result is streamed back as an NDJSON
+    line (GenerateBatchItem) as soon as it completes, so order is not preserved.
+    """
+    use_cache = use_llm_cache(cache)
+    jd_texts = [jd.strip() for jd in jd_texts if jd and jd.strip()]
+
+    if not jd_texts:
+        raise HTTPException(
+            status_code=400,
+            detail={"code": "EMPTY_BATCH", "message": "At least one job description is required"}
+        )
+
+    if len(jd_texts) > GENERATE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "code": "BATCH_TOO_LARGE",
+                "message": f"At most {GENERATE_BATCH_MAX_ITEMS} job descriptions per batch"
+            }
+        )
+
+    resume_text, resume_links = await load_resume_or_500(
+        resume_file, resume_id, "Unexpected error during generation"
+    )
+
+    async def stream_results():
+        slots = asyncio.Semaphore(GENERATE_BATCH_CONCURRENCY)
+        tasks = [
+            asyncio.create_task(generate_batch_item(i, jd, resume_text, resume_links, slots, use_cache))
+            for i, jd in enumerate(jd_texts)
+        ]
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                yield item.model_dump_json() + "\n"
+        finally:
+            # Client disconnected → stop work that hasn't started yet
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
 # ---------- Send Email ----------
+def build_send_request(recipient, subject, body, cc=None):
+    """Splits comma separated recipient/cc strings and validates them."""
+
+    # Convert recipient → list
+    recipient_list = [
+        email.strip()
+        for email in recipient.split(",")
+        if email.strip() and "@" in email
+    ]
+
+    # Convert cc → list (future-proof)
+    cc_list = None
+    if cc and cc.strip():
+        cc_list = [
+            email.strip()
+            for email in cc.split(",")
+            if email.strip() and "@" in email
+        ]
+
+        if not cc_list:
+            cc_list = None
+
+    return SendEmailRequest(
+        recipient=recipient_list,
+        subject=subject,
+        body=body,
+        cc=cc_list
+    )
+
+
+
 @app.post("/send-email", response_model=SendEmailResponse)
 async def send_email_api(
     recipient: str = Form(...),
     subject: str = Form(...),
     body: str = Form(...),
     cc: str | None = Form(None),
-    resume_file: UploadFile | None = File(None)
+    resume_file: UploadFile | None = File(None),
+    resume_id: str | None = Form(None)
 ):
-    logger.info(f"Sending email to: {recipient}, cc: {cc}")
+    hot_logger.info("Sending email to: %s, cc: %s", recipient, cc)
     resume_path = None
-    tmp_dir = None
+    attachment = None
 
     try:
         if not all([recipient, subject.strip(), body.strip()]):
@@ -126,61 +640,30 @@ async def send_email_api(
                 }
             )
 
-        # Convert recipient → list
-        recipient_list = [
-            email.strip()
-            for email in recipient.split(",")
-            if email.strip() and "@" in email
-        ]
-
-        # Convert cc → list (future-proof)
-        cc_list = None
-        if cc and cc.strip():
-            cc_list = [
-                email.strip()
-                for email in cc.split(",")
-                if email.strip() and "@" in email
-            ]
-
-            if not cc_list:
-                cc_list = None
-
-        data = SendEmailRequest(
-            recipient=recipient_list,
-            subject=subject,
-            body=body,
-            cc=cc_list
-        )
+        data = build_send_request(recipient, subject, body, cc)
 
         # Convert to string for SMTP
         recipient_str = ",".join(data.recipient)
         cc_emails = ",".join(data.cc) if data.cc else None
 
-        if resume_file:
-            if resume_file.content_type != "application/pdf":
-                raise HTTPException(
-                    status_code=400,
-                    detail={
-                        "code": "INVALID_FILE",
-                        "message": "Resume must be PDF"
-                    }
-                )
+        if resume_id:
+            resume_path = stored_resume_path(resume_id)
 
-            tmp_dir = tempfile.mkdtemp()
-            resume_path = os.path.join(tmp_dir, resume_file.filename)
+        elif resume_file:
+            ensure_pdf(resume_file)
 
-            with open(resume_path, "wb") as f:
-                f.write(await resume_file.read())
+            attachment = (os.path.basename(resume_file.filename or "resume.pdf"), await read_upload(resume_file))
 
-        success = send_email(
+        success = await send_email_async(
             recipient_email=recipient_str,
             subject=subject,
             body=body,
             attachment_path=resume_path,
-            cc_emails=cc_emails
+            cc_emails=cc_emails,
+            attachment=attachment
         )
 
-        logger.info(f"Email sent successfully: {success}")
+        hot_logger.info("Email sent successfully: %s", success)
         if not success:
             raise HTTPException(
                 status_code=500,
@@ -206,7 +689,7 @@ async def send_email_api(
             }
         )
 
-    except HTTPException:
+    except (HTTPException, PoolSaturated):
         raise
 
     except Exception as e:
@@ -218,21 +701,278 @@ async def send_email_api(
             }
         )
 
-    finally:
-        if tmp_dir and os.path.exists(tmp_dir):
-            shutil.rmtree(tmp_dir)
+
+# ---------- Batch Send ----------
+@app.post("/send-email/batch", response_model=BatchSendResponse)
+async def send_email_batch_api(
+    messages: str = Form(...),
+    resume_file: UploadFile | None = File(None),
+    resume_id: str | None = Form(None)
+):
+    """
+    Queues many emails at once. `messages` is a JSON array of
+    {recipient, subject, body, cc} objects; the optional resume is attached
+    to every message. Returns immediately with the queued job IDs.
+    """
+    try:
+        try:
+            items = [BatchEmailItem(**item) for item in json.loads(messages)]
+        except (ValueError, TypeError) as e:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "code": "INVALID_BATCH",
+                    "message": f"messages must be a JSON array of emails: {str(e)}"
+                }
+            )
+
+        if not items:
+            raise HTTPException(
+                status_code=400,
+                detail={"code": "EMPTY_BATCH", "message": "At least one message is required"}
+            )
+
+        queued = []
+        for item in items:
+            data = build_send_request(item.recipient, item.subject, item.body, item.cc)
+            queued.append({
+                "recipient": ",".join(data.recipient),
+                "cc": ",".join(data.cc) if data.cc else None,
+                "subject": data.subject,
+                "body": data.body
+            })
+
+        attachment_path = None
+        if resume_id:
+            attachment_path = stored_resume_path(resume_id)
+
+        elif resume_file:
+            ensure_pdf(resume_file)
+
+            attachment_path = await run_io(
+                mail_queue.store_attachment,
+                await read_upload(resume_file),
+                resume_file.filename
+            )
+
+        batch_id, job_ids = await run_io(mail_queue.enqueue_batch, queued, attachment_path)
+
+        return BatchSendResponse(status="queued", batch_id=batch_id, job_ids=job_ids)
+
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={"code": "VALIDATION_ERROR", "message": e.errors()}
+        )
+
+    except (HTTPException, PoolSaturated):
+        raise
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "code": "INTERNAL_ERROR",
+                "message": f"Unexpected error while queueing emails: {str(e)}"
+            }
+        )
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def job_status_api(job_id: str):
+    """Status of a single queued job, or progress of a whole batch by batch_id."""
+    job = await run_io(mail_queue.get_job, job_id)
+    if job:
+        return JobStatusResponse(status="success", job=job)
+
+    batch = await run_io(mail_queue.get_batch, job_id)
+    if batch:
+        return JobStatusResponse(status="success", batch=batch)
+
+    raise HTTPException(
+        status_code=404,
+        detail={"code": "JOB_NOT_FOUND", "message": f"No job or batch with id {job_id}"}
+    )
+
+
+# ---------- Campaigns ----------
+def campaign_not_found(campaign_id):
+    return HTTPException(
+        status_code=404,
+        detail={"code": "CAMPAIGN_NOT_FOUND", "message": f"No campaign with id {campaign_id}"}
+    )
+
+
+@app.post("/campaigns", response_model=CampaignResponse)
+async def create_campaign_api(
+    contacts_file: UploadFile = File(...),
+    name: str | None = Form(None),
+    subject_template: str | None = Form(None),
+    body_template: str | None = Form(None),
+    seed_jd_text: str | None = Form(None),
+    resume_file: UploadFile | None = File(None),
+    resume_id: str | None = Form(None),
+    start: bool = Form(False)
+):
+    """
+    Creates a mail-merge campaign from a CSV/JSON contact list and
+    subject/body templates with {{ field }} or {{ field | fallback }}
+    placeholders (field names are the contact columns, normalized to
+    snake_case). Missing templates can be seeded with one AI generation from
+    seed_jd_text. The resume, if given, is attached to every message.
+    """
+    try:
+        try:
+            contacts = parse_contacts(await read_upload(contacts_file), contacts_file.filename)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise HTTPException(
+                status_code=400,
+                detail={"code": "INVALID_CONTACTS", "message": f"contacts_file must be CSV or a JSON array: {str(e)}"}
+            )
+
+        if not contacts:
+            raise HTTPException(
+                status_code=400,
+                detail={"code": "EMPTY_CAMPAIGN", "message": "At least one contact is required"}
+            )
+        if len(contacts) > CAMPAIGN_MAX_CONTACTS:
+            raise HTTPException(
+                status_code=400,
+                detail={"code": "TOO_MANY_CONTACTS", "message": f"At most {CAMPAIGN_MAX_CONTACTS} contacts per campaign"}
+            )
+        if not any(contact_email(contact) for contact in contacts):
+            raise HTTPException(
+                status_code=400,
+                detail={"code": "NO_EMAIL_COLUMN", "message": "Contacts need an email (or email_address) column"}
+            )
+
+        resume_text, resume_links = await load_resume(resume_file, resume_id)
+
+        if not (subject_template and body_template):
+            if not seed_jd_text:
+                raise HTTPException(
+                    status_code=400,
+                    detail={
+                        "code": "MISSING_TEMPLATE",
+                        "message": "Provide subject_template and body_template, or seed_jd_text to generate them"
+                    }
+                )
+
+            # One generation seeds the whole campaign
+            seed = await run_io(generate_mail_dict, seed_jd_text, resume_text, resume_links, priority=BATCH)
+            if seed.get("error"):
+                raise HTTPException(
+                    status_code=500,
+                    detail={"code": "AI_GENERATION_FAILED", "message": "AI failed to generate the campaign template"}
+                )
+            subject_template = subject_template or seed.get("subject") or ""
+            body_template = body_template or seed.get("body") or ""
+
+        attachment_path = None
+        if resume_id:
+            attachment_path = stored_resume_path(resume_id)
+        elif resume_file:
+            # The resume store, not the queue's: queue attachments are deleted once their jobs finish
+            resume_id = await run_io(resume_store.save, await read_upload(resume_file), resume_file.filename)
+            attachment_path = stored_resume_path(resume_id)
+
+        fields = set().union(*(contact.keys() for contact in contacts))
+        missing = sorted(set(Template(subject_template).missing_fields(fields)) |
+                         set(Template(body_template).missing_fields(fields)))
+
+        campaign_id, invalid = await run_io(
+            campaign_store.create, name, subject_template, body_template, contacts, attachment_path
+        )
+        started = await campaign_runner.start(campaign_id) if start else False
+
+        return CampaignResponse(
+            status="success",
+            campaign_id=campaign_id,
+            total=len(contacts),
+            invalid=invalid,
+            missing_fields=missing,
+            subject_template=subject_template,
+            body_template=body_template,
+            started=started
+        )
+
+    except (HTTPException, PoolSaturated, QuotaTimeout):
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={"code": "INTERNAL_ERROR", "message": f"Unexpected error while creating campaign: {str(e)}"}
+        )
+
+
+@app.post("/campaigns/{campaign_id}/start", response_model=CampaignStatusResponse)
+async def start_campaign_api(campaign_id: str):
+    """Starts a draft campaign, or resumes a paused/interrupted one where it stopped."""
+    if not await campaign_runner.start(campaign_id):
+        progress = await run_io(campaign_store.progress, campaign_id)
+        if progress is None:
+            raise campaign_not_found(campaign_id)
+        raise HTTPException(
+            status_code=409,
+            detail={"code": "CAMPAIGN_NOT_STARTABLE", "message": f"Campaign is {progress['status']}"}
+        )
+
+    return CampaignStatusResponse(status="success", campaign=await run_io(campaign_store.progress, campaign_id))
+
+
+@app.post("/campaigns/{campaign_id}/pause", response_model=CampaignStatusResponse)
+async def pause_campaign_api(campaign_id: str):
+    """Stops new sends; sends already in flight still complete and are recorded."""
+    if not await campaign_runner.pause(campaign_id):
+        progress = await run_io(campaign_store.progress, campaign_id)
+        if progress is None:
+            raise campaign_not_found(campaign_id)
+        raise HTTPException(
+            status_code=409,
+            detail={"code": "CAMPAIGN_NOT_PAUSABLE", "message": f"Campaign is {progress['status']}"}
+        )
+
+    return CampaignStatusResponse(status="success", campaign=await run_io(campaign_store.progress, campaign_id))
+
+
+@app.get("/campaigns/{campaign_id}", response_model=CampaignStatusResponse)
+async def campaign_status_api(campaign_id: str):
+    progress = await run_io(campaign_store.progress, campaign_id)
+    if progress is None:
+        raise campaign_not_found(campaign_id)
+    return CampaignStatusResponse(status="success", campaign=progress)
+
+
+@app.get("/campaigns/{campaign_id}/recipients", response_model=CampaignRecipientsResponse)
+async def campaign_recipients_api(campaign_id: str, status: str | None = None, offset: int = 0, limit: int = 100):
+    """Per-recipient status, in contact-list order; filter with status=sent|failed|retry|..."""
+    if status is not None and status not in RECIPIENT_STATUSES:
+        raise HTTPException(
+            status_code=400,
+            detail={"code": "INVALID_STATUS", "message": f"status must be one of {', '.join(RECIPIENT_STATUSES)}"}
+        )
+    if await run_io(campaign_store.campaign, campaign_id) is None:
+        raise campaign_not_found(campaign_id)
+
+    recipients = await run_io(
+        campaign_store.recipients, campaign_id, status, max(0, offset), min(max(1, limit), 1000)
+    )
+    return CampaignRecipientsResponse(status="success", recipients=recipients)
+
 
 # ---------- Regenerate Email ----------
 @app.post("/regenerate-body", response_model=RegenerateResponse)
 async def regenerate_body_api(
     original_body: str = Form(...),
     instruction: str | None = Form(None),
-    resume_file: UploadFile | None = File(None)
+    resume_file: UploadFile | None = File(None),
+    resume_id: str | None = Form(None),
+    cache: str | None = Form(None)
 ):
     resume_text = None
 
     try:
-        logger.info("Regenerate endpoint called")
+        hot_logger.debug("Regenerate endpoint called")
 
         if not original_body.strip():
             raise HTTPException(
@@ -243,48 +983,34 @@ async def regenerate_body_api(
                 }
             )
 
-        if resume_file:
-            logger.info(f"Resume file received: {resume_file.filename}")
-            
-            if resume_file.content_type != "application/pdf":
-                raise HTTPException(
-                    status_code=400,
-                    detail={
-                        "code": "INVALID_FILE",
-                        "message": "Resume must be PDF"
-                    }
-                )
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                tmp.write(await resume_file.read())
-                resume_path = tmp.name
-
-            logger.info(f"Temporary resume path: {resume_path}")
+        if resume_file or resume_id:
+            hot_logger.debug("Resume received: %s", resume_id or resume_file.filename)
 
-            resume_text, _ = extract_text_from_pdf(resume_path)
+            resume_text, _ = await load_resume(resume_file, resume_id)
 
-            logger.info("Resume text extracted successfully")
+            hot_logger.debug("Resume text extracted successfully")
 
-            os.remove(resume_path)
+        final_instruction = regenerate_instruction(instruction)
 
-        final_instruction = (
-            instruction.strip()
-            if instruction and instruction.strip()
-            else "Rewrite the email to be clearer and more concise while keeping the same intent."
-        )
+        hot_logger.debug("Final instruction: %s", final_instruction)
 
-        logger.info(f"Final instruction: {final_instruction}")
+        use_cache = use_llm_cache(cache)
+        new_body = None
+        if regenerate_speculator and use_cache:
+            new_body = await regenerate_speculator.lookup(original_body, final_instruction, resume_text)
 
-        logger.info("Calling regenerate_mail_body")
+        if new_body is None:
+            hot_logger.debug("Calling regenerate_mail_body")
 
-        new_body = regenerate_mail_body(
-            original_body=original_body,
-            instruction=final_instruction,
-            resume_text=resume_text
-        )
+            new_body = await run_io(
+                regenerate_mail_body,
+                original_body=original_body,
+                instruction=final_instruction,
+                resume_text=resume_text,
+                use_cache=use_cache
+            )
 
-        logger.info(f"Regenerated body type: {type(new_body)}")
-        logger.info(f"Regenerated body: {new_body}")
+        hot_logger.debug("Regenerated body (%s): %s", type(new_body).__name__, new_body)
 
         if not isinstance(new_body, str):
             raise HTTPException(
@@ -309,7 +1035,7 @@ async def regenerate_body_api(
             body=new_body
         )
 
-    except HTTPException:
+    except (HTTPException, PoolSaturated, QuotaTimeout):
         raise
 
     except Exception as e:
@@ -321,4 +1047,64 @@ async def regenerate_body_api(
                 "code": "INTERNAL_ERROR",
                 "message": f"Failed to regenerate email: {str(e)}"
             }
-        )
\ No newline at end of file
+        )
+
+
+@app.post("/regenerate-body/stream")
+async def regenerate_body_stream_api(
+    original_body: str = Form(...),
+    instruction: str | None = Form(None),
+    resume_file: UploadFile | None = File(None),
+    resume_id: str | None = Form(None),
+    cache: str | None = Form(None)
+):
+    """
+    Server-sent events variant of /regenerate-body. Emits `chunk` events with
+    text as Gemini produces it, then `done` with the full body (or `error`).
+    """
+    use_cache = use_llm_cache(cache)
+
+    if not original_body.strip():
+        raise HTTPException(
+            status_code=400,
+            detail={"code": "BODY_MISSING", "message": "Original email body is required"}
+        )
+
+    resume_text, _ = await load_resume_or_500(resume_file, resume_id, "Failed to regenerate email")
+    # Same key as /regenerate-body, so a blank instruction finds the default variant
+    final_instruction = regenerate_instruction(instruction)
+
+    async def events():
+        chunks = []
+        try:
+            speculated = None
+            if regenerate_speculator and use_cache:
+                speculated = await regenerate_speculator.lookup(original_body, final_instruction, resume_text)
+
+            if speculated is not None:
+                chunks.append(speculated)
+                yield sse_event("chunk", {"text": speculated})
+            else:
+                async for text in iterate_io(
+                    stream_mail_body, original_body, final_instruction, resume_text, use_cache
+                ):
+                    chunks.append(text)
+                    yield sse_event("chunk", {"text": text})
+        except PoolSaturated:
+            yield sse_error(503, "Server is busy, please retry shortly")
+            return
+        except QuotaTimeout:
+            yield sse_error(429, "AI quota exhausted, please retry shortly")
+            return
+        except Exception as e:
+            logger.exception("Streaming regenerate failed")
+            yield sse_error(500, f"Failed to regenerate email: {str(e)}")
+            return
+
+        new_body = "".join(chunks).strip()
+        if not new_body:
+            yield sse_error(500, "AI returned empty response")
+        else:
+            yield sse_event("done", RegenerateResponse(status="success", body=new_body).model_dump())
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
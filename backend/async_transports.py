@@ -0,0 +1,323 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+try:
+    import aiosmtplib
+except ImportError:  # optional; SMTP sends then go through the threaded pool
+    aiosmtplib = None
+
+try:
+    import httpx
+except ImportError:  # optional; Gmail sends then go through googleapiclient
+    httpx = None
+
+
+class SharedSlots:
+    """
+    Concurrency cap for one provider, shared by worker threads (`with`) and
+    event-loop tasks (`async with`), so the threaded and the async clients
+    together never have more than `limit` sends in flight. A freed slot is
+    handed to the longest waiter of either kind; tasks wait on a future
+    rather than blocking the loop.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._waiters = deque()  # threading.Event, or (loop, future) for tasks
+
+    def _try_take(self):
+        # Caller must hold self._lock
+        if self._in_use < self.limit and not self._waiters:
+            self._in_use += 1
+            return True
+        return False
+
+    def acquire(self):
+        with self._lock:
+            if self._try_take():
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        # release() hands the slot over before setting the event
+        event.wait()
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._try_take():
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+
+        future = waiter[1]
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # The slot was handed over before the cancellation landed. A
+            # cancelled future is given back by _hand_over; a resolved one is ours.
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self._in_use -= 1
+                return
+            waiter = self._waiters.popleft()
+
+        # The slot passes straight to the waiter, so _in_use stays the same
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+            return
+        loop, future = waiter
+        try:
+            loop.call_soon_threadsafe(self._hand_over, future)
+        except RuntimeError:
+            # That loop is closed: nobody is waiting on the future any more
+            self.release()
+
+    def _hand_over(self, future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    async def __aenter__(self):
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+    def stats(self):
+        with self._lock:
+            return {"limit": self.limit, "in_use": self._in_use, "waiting": len(self._waiters)}
+
+
+class _LoopBound:
+    """
+    asyncio primitives and connections belong to the loop that created them.
+    Subclasses (re)create that state in _reset() the first time they are used
+    on a new loop, e.g. after the server restarts inside the same process.
+    """
+
+    _loop = None
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._reset()
+
+    def _reset(self):
+        raise NotImplementedError
+
+
+class AsyncSMTPPool(_LoopBound):
+    """
+    Event-loop counterpart of smtp_pool.SMTPConnectionPool on aiosmtplib:
+    up to `size` authenticated connections, reused across sends, with the
+    same idle timeout, NOOP health check and one reconnect on disconnect.
+    """
+
+    def __init__(self, host, port, username=None, password=None, use_ssl=True,
+                 size=4, idle_timeout=60, healthcheck_after=5, timeout=30):
+        if aiosmtplib is None:
+            raise RuntimeError("aiosmtplib is not installed")
+
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.healthcheck_after = healthcheck_after
+        self.timeout = timeout
+
+        self._slots = None
+        self._idle = []  # list of (connection, last_used)
+        self.created = 0
+        self.reused = 0
+        self.reconnects = 0
+
+    def _reset(self):
+        # Connections of a previous loop cannot be closed from this one
+        self._slots = asyncio.Semaphore(self.size)
+        self._idle = []
+
+    async def _connect(self):
+        conn = aiosmtplib.SMTP(
+            hostname=self.host,
+            port=self.port,
+            use_tls=self.use_ssl,
+            start_tls=False,
+            timeout=self.timeout,
+        )
+        await conn.connect()
+
+        if self.username and self.password:
+            try:
+                await conn.login(self.username, self.password)
+            except BaseException:
+                await self._close(conn)
+                raise
+
+        self.created += 1
+        return conn
+
+    @staticmethod
+    async def _close(conn):
+        try:
+            await conn.quit()
+        except Exception:
+            conn.close()
+
+    @staticmethod
+    async def _is_alive(conn):
+        try:
+            return (await conn.noop()).code == 250
+        except Exception:
+            return False
+
+    async def _checkout(self):
+        while self._idle:
+            conn, last_used = self._idle.pop()
+
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.idle_timeout or not conn.is_connected:
+                await self._close(conn)
+                continue
+            if idle_for > self.healthcheck_after and not await self._is_alive(conn):
+                await self._close(conn)
+                continue
+
+            self.reused += 1
+            return conn
+
+        return await self._connect()
+
+    async def send_raw(self, from_addr, to_addrs, raw):
+        """Sends an already serialized message (bytes) to the envelope recipients."""
+        self._bind()
+        async with self._slots:
+            conn = await self._checkout()
+            try:
+                await conn.sendmail(from_addr, to_addrs, raw)
+            except aiosmtplib.SMTPServerDisconnected:
+                conn.close()
+                self.reconnects += 1
+                conn = await self._connect()
+                try:
+                    await conn.sendmail(from_addr, to_addrs, raw)
+                except BaseException:
+                    await self._close(conn)
+                    raise
+            except BaseException:
+                await self._close(conn)
+                raise
+
+            self._idle.append((conn, time.monotonic()))
+
+    async def close_all(self):
+        if self._loop is not asyncio.get_running_loop():
+            return
+        idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            await self._close(conn)
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "created": self.created,
+            "reused": self.reused,
+            "reconnects": self.reconnects,
+        }
+
+
+class GmailSendError(Exception):
+    """Non-2xx response from the Gmail API; `status` is the HTTP status code."""
+
+    def __init__(self, status, message):
+        super().__init__(f"Gmail API returned {status}: {message}")
+        self.status = status
+
+
+class AsyncGmailClient(_LoopBound):
+    """
+    Sends pre-encoded messages with users.messages.send over a pooled
+    httpx.AsyncClient (keep-alive, HTTP/1.1), so a send in flight costs a
+    socket rather than a thread. `transport` lets tests and load tests
+    substitute an httpx.MockTransport for the real endpoint.
+    """
+
+    def __init__(self, base_url="https://gmail.googleapis.com", max_connections=20, timeout=30, transport=None):
+        if httpx is None:
+            raise RuntimeError("httpx is not installed")
+
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.transport = transport
+
+        self._client = None
+        self._slots = None
+        self.requests = 0
+        self.errors = 0
+
+    def _reset(self):
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+            # Waiting for a pooled connection is bounded by _slots, not a timeout
+            timeout=httpx.Timeout(self.timeout, pool=None),
+            transport=self.transport,
+        )
+        self._slots = asyncio.Semaphore(self.max_connections)
+
+    async def send_raw(self, raw, access_token, user_id="me"):
+        """POSTs {"raw": raw}; returns the API's message resource or raises GmailSendError."""
+        self._bind()
+        async with self._slots:
+            self.requests += 1
+            response = await self._client.post(
+                f"/gmail/v1/users/{user_id}/messages/send",
+                json={"raw": raw},
+                headers={"Authorization": f"Bearer {access_token}"},
+            )
+
+        if response.status_code >= 400:
+            self.errors += 1
+            raise GmailSendError(response.status_code, response.text[:200])
+        return response.json()
+
+    async def close(self):
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+    def stats(self):
+        return {
+            "max_connections": self.max_connections,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
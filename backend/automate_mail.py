@@ -1,178 +1,399 @@
-import base64
+import logging
 import smtplib
-from email.message import EmailMessage
+import time
 import os
-import mimetypes
 from googleapiclient.errors import HttpError
-from gmail_auth import get_gmail_service
+from google.auth.exceptions import RefreshError
+from gmail_auth import get_gmail_service, gmail_holder
+from smtp_pool import SMTPConnectionPool
+from async_transports import AsyncSMTPPool, AsyncGmailClient, GmailSendError, SharedSlots, aiosmtplib, httpx
+from executor import run_io, PoolSaturated
+from mime_compose import compose_message, attachment_parts
+from metrics import stage, mail_attempts, mail_fallbacks, circuit_transitions
+from circuit_breaker import CircuitBreaker
+from config import (
+    SMTP_HOST,
+    SMTP_PORT,
+    SMTP_USE_SSL,
+    SMTP_TIMEOUT_SECONDS,
+    SMTP_POOL_SIZE,
+    SMTP_IDLE_TIMEOUT_SECONDS,
+    SMTP_HEALTHCHECK_AFTER_SECONDS,
+    MAIL_OAUTH_CONCURRENCY,
+    MAIL_SMTP_CONCURRENCY,
+    MAIL_BREAKER_FAILURE_THRESHOLD,
+    MAIL_BREAKER_RECOVERY_SECONDS,
+    MAIL_SLOW_SEND_SECONDS,
+    MAIL_LATENCY_REPROBE_SECONDS,
+    MAIL_ASYNC_TRANSPORTS,
+    GMAIL_API_URL,
+    GMAIL_ASYNC_MAX_CONNECTIONS,
+)
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(f"hotpath.{__name__}")
+
 SENDER_EMAIL = os.getenv('sender_email')
 SENDER_PASSWORD = os.getenv('sender_password')
-MAX_ATTACHMENT_SIZE = 25 * 1024 * 1024
 
-import re
+smtp_pool = SMTPConnectionPool(
+    SMTP_HOST,
+    SMTP_PORT,
+    username=SENDER_EMAIL,
+    password=SENDER_PASSWORD,
+    use_ssl=SMTP_USE_SSL,
+    size=SMTP_POOL_SIZE,
+    idle_timeout=SMTP_IDLE_TIMEOUT_SECONDS,
+    healthcheck_after=SMTP_HEALTHCHECK_AFTER_SECONDS,
+    timeout=SMTP_TIMEOUT_SECONDS,
+)
 
-def plain_text_to_html(text):
-    """
-    Converts plain text with line breaks to clean HTML.
-    Handles Windows/Mac/Linux line endings properly.
-    """
+# Event-loop clients for the API's sends; None falls back to the threaded ones
+async_smtp_pool = AsyncSMTPPool(
+    SMTP_HOST,
+    SMTP_PORT,
+    username=SENDER_EMAIL,
+    password=SENDER_PASSWORD,
+    use_ssl=SMTP_USE_SSL,
+    size=MAIL_SMTP_CONCURRENCY,
+    idle_timeout=SMTP_IDLE_TIMEOUT_SECONDS,
+    healthcheck_after=SMTP_HEALTHCHECK_AFTER_SECONDS,
+    timeout=SMTP_TIMEOUT_SECONDS,
+) if MAIL_ASYNC_TRANSPORTS and aiosmtplib is not None else None
 
-    if not text:
-        return ""
+async_gmail = AsyncGmailClient(
+    GMAIL_API_URL,
+    max_connections=GMAIL_ASYNC_MAX_CONNECTIONS,
+    timeout=SMTP_TIMEOUT_SECONDS,
+) if MAIL_ASYNC_TRANSPORTS and httpx is not None else None
 
-    # Normalize all line endings to \n
-    text = text.replace("\r\n", "\n").replace("\r", "\n")
+# Per-transport concurrency limits shared by API requests (threaded or on the
+# loop) and queue workers
+oauth_slots = SharedSlots(MAIL_OAUTH_CONCURRENCY)
+smtp_slots = SharedSlots(MAIL_SMTP_CONCURRENCY)
 
-    # Split paragraphs on blank lines (one or more empty lines)
-    paragraphs = re.split(r"\n\s*\n", text.strip())
+# Outcomes of one transport attempt
+SENT = "sent"
+FAILED = "failed"            # transport trouble: counts against its breaker
+UNAVAILABLE = "unavailable"  # no usable credentials: opens its breaker at once
+REJECTED = "rejected"        # this message was refused; the transport itself is fine
 
-    html_paragraphs = []
 
-    for p in paragraphs:
-        p = p.replace("\n", "<br>")  # single line break inside paragraph
-        html_paragraphs.append(f"<p>{p}</p>")
+def _on_breaker_transition(name, old_state, new_state, reason):
+    circuit_transitions.inc(name, old_state, new_state)
+    logging.getLogger(__name__).warning("%s transport circuit %s -> %s (%s)", name, old_state, new_state, reason)
 
-    html_body = "".join(html_paragraphs)
 
-    return f"""
-    <div style="font-family: sans-serif; line-height: 1.6; color: #333;">
-        {html_body}
-    </div>
-    """
+oauth_breaker = CircuitBreaker(
+    "oauth",
+    failure_threshold=MAIL_BREAKER_FAILURE_THRESHOLD,
+    recovery_seconds=MAIL_BREAKER_RECOVERY_SECONDS,
+    on_transition=_on_breaker_transition,
+)
+smtp_breaker = CircuitBreaker(
+    "smtp",
+    failure_threshold=MAIL_BREAKER_FAILURE_THRESHOLD,
+    recovery_seconds=MAIL_BREAKER_RECOVERY_SECONDS,
+    on_transition=_on_breaker_transition,
+)
+
 
-def send_mail_via_oauth(recipient_email, subject, body, attachment_path=None, cc_emails=None):
+def _gmail_error_outcome(status):
+    if status in (401, 403):
+        return UNAVAILABLE
+    if status < 500 and status != 429:
+        return REJECTED
+    return FAILED
+
+
+def _oauth_attempt(prepared):
     try:
         service = get_gmail_service()
 
         if service is None:
-            print("OAuth authentication failed — using SMTP fallback.")
-            return False
-        
-        message = EmailMessage()
-        message['To'] = recipient_email
-        message['From'] = SENDER_EMAIL
-        message['Subject'] = subject
-        # Convert plain text body to formatted HTML
-        # html_body = plain_text_to_html(body)
-        message.set_content(body, subtype="html")
-
-        print("=====html body====", body, "\n===================")
-
-        if cc_emails:
-            message['Cc'] = cc_emails
-
-        if attachment_path:
-            print(f"Attachment path provided: {attachment_path}")
-            if not os.path.exists(attachment_path):
-                print("Attachment file does not exist at that path.")
-            else:
-                file_size = os.path.getsize(attachment_path)
-                print(f"Attachment exists — size = {file_size} bytes")
-                if file_size > MAX_ATTACHMENT_SIZE:
-                    print("Attachment is larger than 25MB. Gmail may not attach this file directly.")
-                    # you can either skip attaching or handle uploading to cloud here
-                else:
-                    ctype, encoding = mimetypes.guess_type(attachment_path)
-                    if ctype is None:
-                        ctype = 'application/octet-stream'
-                    
-                    maintype, subtype = ctype.split('/', 1)
-                    with open(attachment_path, 'rb') as f:
-                        file_data = f.read()
-                        file_name = os.path.basename(attachment_path)
-                    
-                    message.add_attachment(file_data, maintype=maintype, subtype=subtype, filename=file_name)
-                    print(f"Attached file: {file_name} (MIME: {maintype}/{subtype})")
-
-        encodeed_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
-        create_message = {'raw': encodeed_message}
-
-        sent_message = service.users().messages().send(userId="me", body=create_message).execute()
-        print(f"Email sent successfully! Message ID: {sent_message['id']}")
-
-        return True
+            logger.warning("OAuth authentication failed — using SMTP fallback.")
+            return UNAVAILABLE
+
+        create_message = {'raw': prepared.gmail_raw}
+
+        sent_message = service.users().messages().send(userId="me", body=create_message).execute(http=gmail_holder.http())
+        logger.info("Email sent successfully! Message ID: %s", sent_message['id'])
+
+        return SENT
+    except RefreshError as error:
+        logger.warning("Gmail credentials could not be refreshed: %s", error)
+        gmail_holder.invalidate()
+        return UNAVAILABLE
     except HttpError as error:
-        print(f"Gmail API(OAuth) failed: {error}")
-        return False
+        logger.warning("Gmail API(OAuth) failed: %s", error)
+        return _gmail_error_outcome(error.resp.status)
     except Exception as e:
         # Catch anything unexpected
-        print(f"Unexpected error in OAuth mail sending: {e}")
-        return False
-
-# Fallback to SMTP if Gmail API fails
-def send_mail_via_smtp(recipient_email, subject, body, attachment_path=None, cc_emails=None):
-    msg = EmailMessage()
-    msg['From'] = SENDER_EMAIL
-    msg['To'] = recipient_email
-    msg['Subject'] = subject
-    
-    # Convert plain text body to formatted HTML
-    # html_body = plain_text_to_html(body)
-    msg.set_content(body, subtype="html")
-
-    print("=====html body====", body, "\n===================")
-
-    if cc_emails:
-        msg['Cc'] = cc_emails
-
-    if attachment_path:
-        print(f"Attachment path provided: {attachment_path}")
-        if not os.path.exists(attachment_path):
-            print("Attachment file does not exist at that path.")
-        else:
-            file_size = os.path.getsize(attachment_path)
-            print(f"Attachment exists — size = {file_size} bytes")
-            if file_size > MAX_ATTACHMENT_SIZE:
-                print("Attachment is larger than 25MB. Gmail may not attach this file directly.")
-                # you can either skip attaching or handle uploading to cloud here
-            else:
-                ctype, encoding = mimetypes.guess_type(attachment_path)
-                if ctype is None:
-                    ctype = 'application/octet-stream'
-                maintype, subtype = ctype.split('/', 1)
-                with open(attachment_path, 'rb') as f:
-                    file_data = f.read()
-                    file_name = os.path.basename(attachment_path)
-                msg.add_attachment(file_data, maintype=maintype, subtype=subtype, filename=file_name)
-                print(f"Attached file: {file_name} (MIME: {maintype}/{subtype})")
+        logger.warning("Unexpected error in OAuth mail sending: %s", e)
+        return FAILED
 
+
+def _smtp_attempt(prepared):
     try:
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp:
-            smtp.login(SENDER_EMAIL, SENDER_PASSWORD)
-            smtp.send_message(msg)
-        
-        print("Email sent successfully using SMTP fallback!")
-        return True
+        smtp_pool.send_raw(prepared.sender, prepared.envelope_recipients, prepared.raw)
+
+        logger.info("Email sent successfully using SMTP!")
+        return SENT
+    except smtplib.SMTPAuthenticationError as e:
+        logger.warning("SMTP login failed: %s", e)
+        return UNAVAILABLE
+    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused) as e:
+        logger.warning("SMTP server refused the message: %s", e)
+        return REJECTED
     except Exception as e:
-        print(f"SMTP fallback failed to send email: {e}")
-        return False
+        logger.warning("SMTP failed to send email: %s", e)
+        return FAILED
+
 
-def send_email(recipient_email, subject, body, attachment_path=None, cc_emails=None):
-    print("Attempting to send email via Gmail API...")
+# name -> (attempt function, breaker, concurrency slots, stage name)
+TRANSPORTS = {
+    "oauth": (_oauth_attempt, oauth_breaker, oauth_slots, "send_oauth"),
+    "smtp": (_smtp_attempt, smtp_breaker, smtp_slots, "send_smtp"),
+}
 
-    # First attempt: OAuth Gmail API
-    success = send_mail_via_oauth(recipient_email, subject, body, attachment_path, cc_emails)
 
-    if success:
-        print("Email sent via Gmail API")
-        return True
+def _attempt(name, prepared):
+    """One send over `name`, recorded in its breaker and the metrics."""
+    attempt, breaker, _, stage_name = TRANSPORTS[name]
+
+    start = time.perf_counter()
+    try:
+        with stage(stage_name):
+            outcome = attempt(prepared)
+    except BaseException:
+        # No outcome to record, but the probe try_acquire reserved must go back
+        breaker.release()
+        raise
+    return _record_outcome(name, outcome, time.perf_counter() - start)
 
-    # Fallback: SMTP
-    print("OAuth failed — falling back to SMTP...")
-    smtp_success = send_mail_via_smtp(recipient_email, subject, body, attachment_path, cc_emails)
 
-    if smtp_success:
-        print("Email sent via SMTP fallback")
-        return True
+def _record_outcome(name, outcome, elapsed):
+    breaker = TRANSPORTS[name][1]
+    if outcome in (SENT, REJECTED):
+        breaker.record_success(elapsed)
+    else:
+        # No latency: a failure (often instant, like missing credentials)
+        # says nothing about how long a send takes
+        breaker.record_failure(trip=outcome == UNAVAILABLE, reason=(
+            "credentials unavailable" if outcome == UNAVAILABLE else "failure threshold reached"
+        ))
+
+    mail_attempts.inc(name, outcome)
+    return outcome == SENT
+
+
+def transport_order():
+    """
+    Order to try the transports in: the Gmail API first, unless it is both
+    slow (average above MAIL_SLOW_SEND_SECONDS) and slower than SMTP, or SMTP
+    hasn't been tried yet. Transports whose breaker is open come last; they
+    are only attempted if the breaker admits a probe.
+
+    While SMTP goes first the Gmail API gets no sends to update its average,
+    so every MAIL_LATENCY_REPROBE_SECONDS one send tries it first again.
+    """
+    order = ["oauth", "smtp"]
+
+    oauth_latency = oauth_breaker.latency_ewma
+    smtp_latency = smtp_breaker.latency_ewma
+    if oauth_latency is not None and oauth_latency > MAIL_SLOW_SEND_SECONDS and \
+            (smtp_latency is None or smtp_latency < oauth_latency) and \
+            not oauth_breaker.latency_probe_due(MAIL_LATENCY_REPROBE_SECONDS):
+        order.reverse()
+
+    return sorted(order, key=lambda name: not TRANSPORTS[name][1].available())
+
+
+def transports_available():
+    """False while every transport's breaker is open (a send would be short-circuited)."""
+    return any(breaker.available() for _, breaker, _, _ in TRANSPORTS.values())
+
+
+def send_email(recipient_email, subject, body, attachment_path=None, cc_emails=None, attachment=None):
+    logger.debug("HTML body: %s", body)
+
+    # Compose once; both transports send the same prepared message
+    prepared = compose_message(SENDER_EMAIL, recipient_email, subject, body, cc_emails, attachment_path, attachment)
+
+    tried = []
+    for name in transport_order():
+        _, breaker, slots, _ = TRANSPORTS[name]
+        if not breaker.try_acquire():
+            logger.info("Skipping %s: circuit open", name)
+            continue
+
+        if tried:
+            mail_fallbacks.inc(tried[-1], name)
+        logger.info("Attempting to send email via %s...", name)
+
+        with slots:
+            if _attempt(name, prepared):
+                logger.info("Email sent via %s", name)
+                return True
+        tried.append(name)
 
     # Final failure
-    print("Both OAuth and SMTP failed — email not sent.")
+    if tried:
+        logger.error("Sending failed on %s — email not sent.", " and ".join(tried))
+    else:
+        logger.error("All transports are short-circuited — email not sent.")
+    return False
+
+
+# ---------- Async Transports ----------
+def _attempt_in_thread(name, prepared):
+    attempt, _, slots, _ = TRANSPORTS[name]
+    with slots:
+        return attempt(prepared)
+
+
+async def _gmail_access_token():
+    token = gmail_holder.bearer_token()
+    if token is None and await run_io(gmail_holder.get_service) is not None:
+        token = gmail_holder.bearer_token()
+    return token
+
+
+async def _oauth_attempt_async(prepared):
+    if async_gmail is None:
+        return await run_io(_attempt_in_thread, "oauth", prepared)
+
+    try:
+        token = await _gmail_access_token()
+
+        if token is None:
+            logger.warning("OAuth authentication failed — using SMTP fallback.")
+            return UNAVAILABLE
+
+        async with oauth_slots:
+            sent_message = await async_gmail.send_raw(prepared.gmail_raw, token)
+        logger.info("Email sent successfully! Message ID: %s", sent_message['id'])
+
+        return SENT
+    except RefreshError as error:
+        logger.warning("Gmail credentials could not be refreshed: %s", error)
+        gmail_holder.invalidate()
+        return UNAVAILABLE
+    except PoolSaturated:
+        # Our own backlog, not a Gmail failure: must not count against the breaker
+        raise
+    except GmailSendError as error:
+        logger.warning("Gmail API(OAuth) failed: %s", error)
+        return _gmail_error_outcome(error.status)
+    except Exception as e:
+        logger.warning("Unexpected error in OAuth mail sending: %s", e)
+        return FAILED
+
+
+async def _smtp_attempt_async(prepared):
+    if async_smtp_pool is None:
+        return await run_io(_attempt_in_thread, "smtp", prepared)
+
+    try:
+        async with smtp_slots:
+            await async_smtp_pool.send_raw(prepared.sender, prepared.envelope_recipients, prepared.raw)
+
+        logger.info("Email sent successfully using SMTP!")
+        return SENT
+    except aiosmtplib.SMTPAuthenticationError as e:
+        logger.warning("SMTP login failed: %s", e)
+        return UNAVAILABLE
+    except (aiosmtplib.SMTPRecipientsRefused, aiosmtplib.SMTPSenderRefused) as e:
+        logger.warning("SMTP server refused the message: %s", e)
+        return REJECTED
+    except Exception as e:
+        logger.warning("SMTP failed to send email: %s", e)
+        return FAILED
+
+
+ASYNC_ATTEMPTS = {
+    "oauth": _oauth_attempt_async,
+    "smtp": _smtp_attempt_async,
+}
+
+
+async def _attempt_async(name, prepared):
+    _, breaker, _, stage_name = TRANSPORTS[name]
+
+    start = time.perf_counter()
+    try:
+        with stage(stage_name):
+            outcome = await ASYNC_ATTEMPTS[name](prepared)
+    except BaseException:
+        # Cancelled with the request, or PoolSaturated from a threaded
+        # fallback: nothing was sent, so only the reserved probe goes back
+        breaker.release()
+        raise
+    return _record_outcome(name, outcome, time.perf_counter() - start)
+
+
+async def send_email_async(recipient_email, subject, body, attachment_path=None, cc_emails=None, attachment=None):
+    """
+    Event-loop counterpart of send_email, for API handlers: same transport
+    order, breakers and fallback, but a send in flight holds a socket on the
+    loop instead of a worker thread. Only composing the message (and the
+    threaded fallback clients) uses the I/O pool.
+    """
+    logger.debug("HTML body: %s", body)
+
+    prepared = await run_io(
+        compose_message, SENDER_EMAIL, recipient_email, subject, body, cc_emails, attachment_path, attachment
+    )
+
+    tried = []
+    for name in transport_order():
+        if not TRANSPORTS[name][1].try_acquire():
+            logger.info("Skipping %s: circuit open", name)
+            continue
+
+        if tried:
+            mail_fallbacks.inc(tried[-1], name)
+        logger.info("Attempting to send email via %s...", name)
+
+        if await _attempt_async(name, prepared):
+            logger.info("Email sent via %s", name)
+            return True
+        tried.append(name)
+
+    if tried:
+        logger.error("Sending failed on %s — email not sent.", " and ".join(tried))
+    else:
+        logger.error("All transports are short-circuited — email not sent.")
     return False
 
+
+async def close_async_transports():
+    if async_smtp_pool is not None:
+        await async_smtp_pool.close_all()
+    if async_gmail is not None:
+        await async_gmail.close()
+
+
+def threaded_fallback_transports():
+    """Transports that send_email_async runs on the I/O pool because their async client is unavailable."""
+    return [
+        name for name, client in (("oauth", async_gmail), ("smtp", async_smtp_pool)) if client is None
+    ]
+
+
+def async_transport_stats():
+    return {
+        "smtp": async_smtp_pool.stats() if async_smtp_pool is not None else None,
+        "gmail": async_gmail.stats() if async_gmail is not None else None,
+        "slots": {"oauth": oauth_slots.stats(), "smtp": smtp_slots.stats()},
+    }
+
+
+def transport_stats():
+    return {name: breaker.stats() for name, (_, breaker, _, _) in TRANSPORTS.items()}
+
 if __name__ == "__main__":
     send_email(
         recipient_email = "example@gmail.com",
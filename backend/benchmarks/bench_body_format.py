@@ -0,0 +1,94 @@
+"""
+Body formatting micro-benchmark.
+
+Times the previous per-call transforms (the "\\n" -> "<br>" rewrite and the
+uncompiled re.split in plain_text_to_html) against body_format, and
+format_body (sanitised HTML + plain-text alternative) on tag-dense editor-
+style HTML and on LLM-style text with <br> line breaks, from 1 KB to 1 MB.
+
+    cd backend && python benchmarks/bench_body_format.py [--sizes-kb 1 10 100 1024]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import body_format  # noqa: E402
+
+LINE = "Built a <b>Python</b> service handling 120k requests/day with FastAPI and Redis."
+
+
+def legacy_plain_text_to_html(text):
+    if not text:
+        return ""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    paragraphs = re.split(r"\n\s*\n", text.strip())
+    html_paragraphs = []
+    for p in paragraphs:
+        p = p.replace("\n", "<br>")
+        html_paragraphs.append(f"<p>{p}</p>")
+    return f'<div style="font-family: sans-serif; line-height: 1.6; color: #333;">{"".join(html_paragraphs)}</div>'
+
+
+def make_plain(size):
+    # paragraphs of four lines separated by a blank line
+    block = "\n".join([LINE] * 4) + "\n\n"
+    return (block * (size // len(block) + 1))[:size]
+
+
+def make_html(size):
+    para = f"<p>Hello <b>Team</b>,<br>{LINE}<br>{LINE} See <a href=\"https://github.com/jd\">GitHub</a>.</p>"
+    bullets = "<ul><li>Python</li><li>SQL &amp; Docker</li></ul>"
+    chunk = para + bullets
+    return (chunk * (size // len(chunk) + 1))[:size]
+
+
+def timed(fn, arg, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[1, 10, 100, 1024])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    results = []
+    for size_kb in args.sizes_kb:
+        size = size_kb * 1024
+        plain = make_plain(size)
+        rich = make_html(size)
+        llm = body_format.lines_to_br(plain)
+        runs = max(3, args.runs if size_kb < 512 else args.runs // 4)
+
+        row = {
+            "size_kb": size_kb,
+            "br_rewrite_legacy_ms": timed(lambda t: t.replace("\n", "<br>"), plain, runs),
+            "br_rewrite_ms": timed(body_format.lines_to_br, plain, runs),
+            "plain_to_html_legacy_ms": timed(legacy_plain_text_to_html, plain, runs),
+            "plain_to_html_ms": timed(body_format.plain_text_to_html, plain, runs),
+            "format_body_ms": timed(body_format.format_body, rich, runs),
+            "format_body_llm_ms": timed(body_format.format_body, llm, runs),
+        }
+        row["format_body_mb_per_s"] = round((size / 1024 / 1024) / (row["format_body_ms"] / 1000), 1)
+        row["format_body_llm_mb_per_s"] = round((len(llm) / 1024 / 1024) / (row["format_body_llm_ms"] / 1000), 1)
+        row["plain_to_html_matches"] = (
+            body_format.plain_text_to_html(plain) == legacy_plain_text_to_html(plain)
+        )
+        results.append(row)
+
+    print(json.dumps({"benchmark": "body_format", "runs": args.runs, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Campaign benchmark, with rendering and sending measured separately.
+
+  --mode render: renders N contacts with the precompiled mail_template.Template
+      and with a per-call re.sub over the template source (what rendering
+      without a compiled template costs), and checks both produce the same
+      output.
+  --mode send: runs a campaign of N contacts through campaigns.CampaignRunner
+      against the local Gmail API stand-in (fakes.FakeGmailHTTP, falling back
+      to fakes.FakeSMTPServer), with the given latency, error rate,
+      concurrency and throttle, and reports sends per second and the final
+      per-recipient counts.
+
+    cd backend && python benchmarks/bench_campaign.py --mode render --contacts 100000
+    cd backend && python benchmarks/bench_campaign.py --mode send --contacts 2000 \\
+        --concurrency 32 --gmail-latency 0.2
+"""
+import argparse
+import asyncio
+import html
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+SUBJECT = "{{ job_title | Software Engineer }} role at {{ company }}"
+BODY = (
+    "<p>Hi {{ first_name | there }},</p>"
+    "<p>I came across the {{ job_title | open }} position at <b>{{ company }}</b> and would love to "
+    "contribute. I have built Python services handling 120k requests/day with FastAPI and Redis, "
+    "and I think that experience maps well onto what {{ company }} is doing in {{ city | your region }}.</p>"
+    "<p>My resume is attached. Would you have 15 minutes this week?</p>"
+    "<p>Regards,<br>Jane</p>"
+)
+
+
+def make_contacts(count):
+    companies = ["Acme", "Globex", "Initech", "Umbrella & Co", "Hooli"]
+    return [
+        {
+            "email": f"contact{i}@example.com",
+            "first_name": f"Name{i}",
+            "company": companies[i % len(companies)],
+            "job_title": "Backend Engineer" if i % 3 else "",
+            "city": "Berlin" if i % 2 else "",
+        }
+        for i in range(count)
+    ]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=("render", "send"), default="render")
+    parser.add_argument("--contacts", type=int, default=None, help="default: 100000 (render), 1000 (send)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--sends-per-minute", type=int, default=0, help="0 = unthrottled")
+    parser.add_argument("--gmail-latency", type=float, default=0.1)
+    parser.add_argument("--gmail-error-rate", type=float, default=0.0)
+    parser.add_argument("--smtp-latency", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+# ---------- Render ----------
+_LEGACY_PLACEHOLDER = r"\{\{\s*([A-Za-z_][\w.-]*)\s*(?:\|\s*(.*?)\s*)?\}\}"
+
+
+def legacy_render(source, values, escape):
+    def replace(match):
+        value = values.get(match.group(1).lower())
+        if value:
+            return html.escape(value) if escape else value
+        default = match.group(2) or ""
+        return html.escape(default) if escape else default
+
+    return re.sub(_LEGACY_PLACEHOLDER, replace, source)
+
+
+def bench_render(args):
+    from mail_template import Template
+
+    contacts = make_contacts(args.contacts or 100000)
+
+    start = time.perf_counter()
+    subject, body = Template(SUBJECT), Template(BODY, escape=True)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    compiled = [(subject.render(c), body.render(c)) for c in contacts]
+    compiled_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy = [(legacy_render(SUBJECT, c, False), legacy_render(BODY, c, True)) for c in contacts]
+    legacy_sec = time.perf_counter() - start
+
+    return {
+        "benchmark": "campaign_render",
+        "contacts": len(contacts),
+        "compile_ms": round(compile_ms, 3),
+        "compiled_renders_per_s": round(len(contacts) / compiled_sec),
+        "re_sub_renders_per_s": round(len(contacts) / legacy_sec),
+        "speedup": round(legacy_sec / compiled_sec, 2),
+        "outputs_match": compiled == legacy,
+    }
+
+
+# ---------- Send ----------
+def isolate_state(tmp, args):
+    # Must run before the backend modules are imported: config reads these once
+    os.environ.update(
+        CAMPAIGN_DB_PATH=os.path.join(tmp, "campaigns.db"),
+        MAIL_QUEUE_PATH=os.path.join(tmp, "mail_queue.db"),
+        RESUME_STORE_DIR=os.path.join(tmp, "resumes"),
+        RESUME_CACHE_DIR="",
+        LLM_CACHE_DB="",
+        SHARED_CACHE_DB="",
+        LOG_LEVEL="WARNING",
+        sender_email="campaign@example.com",
+        CAMPAIGN_RETRY_SECONDS="1",
+    )
+
+
+def install_fakes(args, smtp_server):
+    import automate_mail
+    import gmail_auth
+    from fakes import Faults, FakeGmailService, FakeGmailHolder, FakeGmailHTTP
+
+    holder = FakeGmailHolder(FakeGmailService(Faults(args.gmail_latency, args.gmail_error_rate, args.seed)))
+    gmail_auth.gmail_holder = automate_mail.gmail_holder = holder
+
+    gmail_http = FakeGmailHTTP(Faults(args.gmail_latency, args.gmail_error_rate, args.seed + 1))
+    if automate_mail.async_gmail is not None:
+        automate_mail.async_gmail.transport = gmail_http.transport()
+
+    for pool in (automate_mail.smtp_pool, automate_mail.async_smtp_pool):
+        if pool is not None:
+            pool.host, pool.port, pool.use_ssl = smtp_server.host, smtp_server.port, False
+            pool.username = pool.password = None
+    return gmail_http
+
+
+async def run_campaign(args):
+    from campaigns import CampaignRunner, campaign_store
+    from metrics import stage_seconds
+
+    contacts = make_contacts(args.contacts or 1000)
+    campaign_id, _ = campaign_store.create("bench", SUBJECT, BODY, contacts)
+    runner = CampaignRunner(
+        campaign_store, concurrency=args.concurrency, sends_per_minute=args.sends_per_minute,
+        retry_sec=1, checkpoint_every=max(1, args.concurrency * 2),
+    )
+
+    start = time.perf_counter()
+    await runner.start(campaign_id)
+    await runner._tasks[campaign_id]
+    elapsed = time.perf_counter() - start
+
+    render_count, render_sec = stage_seconds.totals().get(("campaign_render",), (0, 0.0))
+    progress = campaign_store.progress(campaign_id)
+    return {
+        "benchmark": "campaign_send",
+        "contacts": len(contacts),
+        "concurrency": args.concurrency,
+        "sends_per_minute_limit": args.sends_per_minute or None,
+        "gmail_latency": args.gmail_latency,
+        "gmail_error_rate": args.gmail_error_rate,
+        "wall_seconds": round(elapsed, 2),
+        "sends_per_second": round(progress["counts"].get("sent", 0) / elapsed, 1),
+        "render_seconds_total": round(render_sec, 4),
+        "render_mean_us": round(render_sec / render_count * 1e6, 1) if render_count else None,
+        "status": progress["status"],
+        "counts": progress["counts"],
+    }
+
+
+def bench_send(args):
+    tmp = tempfile.mkdtemp(prefix="bench_campaign_")
+    isolate_state(tmp, args)
+
+    from fakes import Faults, FakeSMTPServer
+
+    with FakeSMTPServer(Faults(args.smtp_latency, 0.0, args.seed + 2)) as smtp_server:
+        gmail_http = install_fakes(args, smtp_server)
+        report = asyncio.run(run_campaign(args))
+        report["gmail_http"] = gmail_http.stats.snapshot()
+        report["smtp"] = smtp_server.stats.snapshot()
+    return report
+
+
+def main():
+    args = parse_args()
+    report = bench_render(args) if args.mode == "render" else bench_send(args)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+JD analyzer benchmark.
+
+Runs jd_analyzer.analyze_jd over a fixture set of JDs with hand-checked
+recipient, CC, subject, job title and company (benchmarks/fixtures/jds.json;
+fields listed under "ambiguous" are expected to be left to Gemini), and
+reports per-field accuracy, how many JDs were settled without the LLM, the
+analysis latency, and the prompt tokens saved by the body-only prompt.
+
+    cd backend && python benchmarks/bench_jd_analyzer.py [--fixtures path.json] [--runs 200] [--verbose]
+
+A field counts as correct when it matches the fixture, or when the fixture
+expects it to be ambiguous and the analyzer defers it. A field resolved to a
+wrong value is the failure that matters: it skips the LLM and is shown to
+the user as-is.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import gemini_ai_writer  # noqa: E402
+from jd_analyzer import analyze_jd, HEADER_FIELDS  # noqa: E402
+from prompt_prep import estimate_tokens  # noqa: E402
+
+FIELDS = HEADER_FIELDS + ("job_title", "company")
+RESUME = (
+    "Jane Doe\n+91 98765 43210 | jane@example.com\nGitHub: github.com/janedoe LinkedIn: linkedin.com/in/janedoe\n"
+    "Skills\nPython, FastAPI, SQL, Docker, AWS\nExperience\n"
+    + "Built a Python service handling 120k requests/day with FastAPI and Redis.\n" * 8
+)
+
+
+def normalize(field, value):
+    if value is None:
+        return None
+    if field in ("recipient", "cc"):
+        return sorted(part.strip().lower() for part in value.split(","))
+    return " ".join(value.split()).lower()
+
+
+def judge(fixture, analysis):
+    """{field: "correct" | "deferred" | "wrong" | "fallback"} for one JD."""
+    expected_ambiguous = set(fixture.get("ambiguous", ()))
+    verdicts = {}
+    for field in FIELDS:
+        deferred = field in analysis.ambiguous
+        if field in expected_ambiguous:
+            verdicts[field] = "deferred" if deferred else "wrong"
+        elif deferred:
+            verdicts[field] = "fallback"
+        else:
+            same = normalize(field, getattr(analysis, field)) == normalize(field, fixture["expected"][field])
+            verdicts[field] = "correct" if same else "wrong"
+    return verdicts
+
+
+def timed_runs(jds, runs):
+    per_jd = []
+    for jd in jds:
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            analyze_jd(jd)
+            samples.append(time.perf_counter() - start)
+        per_jd.append(statistics.median(samples))
+    per_jd.sort()
+    return {
+        "median_us": round(statistics.median(per_jd) * 1e6, 1),
+        "p95_us": round(per_jd[min(len(per_jd) - 1, int(len(per_jd) * 0.95))] * 1e6, 1),
+        "max_us": round(per_jd[-1] * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", default=os.path.join(BENCH_DIR, "fixtures", "jds.json"))
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--verbose", action="store_true", help="print every JD with a wrong field")
+    args = parser.parse_args()
+
+    with open(args.fixtures, encoding="utf-8") as f:
+        fixtures = json.load(f)
+
+    counts = {field: {"correct": 0, "deferred": 0, "fallback": 0, "wrong": 0} for field in FIELDS}
+    resolved = 0
+    full_tokens = body_tokens = 0
+    mistakes = []
+
+    for fixture in fixtures:
+        analysis = analyze_jd(fixture["jd"])
+        verdicts = judge(fixture, analysis)
+        for field, verdict in verdicts.items():
+            counts[field][verdict] += 1
+        if "wrong" in verdicts.values():
+            mistakes.append({
+                "jd": fixture["jd"][:80],
+                "wrong": {
+                    field: {"got": getattr(analysis, field), "expected": fixture["expected"][field]}
+                    for field, verdict in verdicts.items() if verdict == "wrong"
+                },
+            })
+
+        if analysis.resolved:
+            resolved += 1
+            full_tokens += estimate_tokens(gemini_ai_writer.build_mail_prompt(fixture["jd"], RESUME, None))
+            body_tokens += estimate_tokens(gemini_ai_writer.build_body_prompt(fixture["jd"], RESUME, None, analysis))
+
+    total = len(fixtures)
+    report = {
+        "benchmark": "jd_analyzer",
+        "fixtures": total,
+        "resolved_locally": resolved,
+        "llm_fallbacks": total - resolved,
+        "fields": {
+            field: {**c, "accuracy": round((c["correct"] + c["deferred"]) / total, 3)}
+            for field, c in counts.items()
+        },
+        "latency_per_jd": timed_runs([fixture["jd"] for fixture in fixtures], args.runs),
+        # Input tokens of the prompts Gemini would get for the locally settled JDs
+        "prompt_tokens_full": full_tokens,
+        "prompt_tokens_body_only": body_tokens,
+    }
+    if args.verbose:
+        report["mistakes"] = mistakes
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
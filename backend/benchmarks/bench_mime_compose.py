@@ -0,0 +1,106 @@
+"""
+MIME composition benchmark.
+
+Compares the old per-transport composition (each of OAuth and SMTP re-reads
+the attachment, re-encodes it and serializes the message, plus a base64 pass
+for Gmail) with compose_message(), which builds one PreparedMessage and
+reuses the serialized attachment part by content hash.
+
+    cd backend && python benchmarks/bench_mime_compose.py [--size-mb 5] [--runs 20]
+"""
+import argparse
+import base64
+import json
+import mimetypes
+import os
+import statistics
+import sys
+import tempfile
+import time
+from email.message import EmailMessage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mime_compose  # noqa: E402
+
+BODY = "<p>Hello,<br>I am interested in the <b>ML Engineer</b> role.</p>" * 5
+
+
+def legacy_build(attachment_path):
+    # Mirrors what the Gmail API and SMTP send paths each built per send before compose_message
+    message = EmailMessage()
+    message['To'] = "hr@example.com"
+    message['From'] = "me@example.com"
+    message['Subject'] = "Application"
+    message.set_content(BODY, subtype="html")
+
+    ctype, _ = mimetypes.guess_type(attachment_path)
+    maintype, subtype = ctype.split('/', 1)
+    with open(attachment_path, 'rb') as f:
+        file_data = f.read()
+    message.add_attachment(file_data, maintype=maintype, subtype=subtype,
+                           filename=os.path.basename(attachment_path))
+    return message
+
+
+def legacy_send_cost(attachment_path):
+    oauth_msg = legacy_build(attachment_path)
+    base64.urlsafe_b64encode(oauth_msg.as_bytes()).decode()
+    smtp_msg = legacy_build(attachment_path)
+    smtp_msg.as_bytes()
+
+
+def prepared_send_cost(attachment_path):
+    prepared = mime_compose.compose_message(
+        "me@example.com", "hr@example.com", "Application", BODY, attachment_path=attachment_path
+    )
+    prepared.gmail_raw
+    prepared.raw
+
+
+def timed(fn, arg, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    return {
+        "first_ms": round(samples[0] * 1000, 2),
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=float, default=5)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "resume.pdf")
+        with open(path, "wb") as f:
+            f.write(os.urandom(int(args.size_mb * 1024 * 1024)))
+
+        # load_attachment prints per call; keep the report readable
+        stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+        try:
+            before = timed(legacy_send_cost, path, args.runs)
+            after = timed(prepared_send_cost, path, args.runs)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    report = {
+        "benchmark": "mime_compose",
+        "attachment_mb": args.size_mb,
+        "runs": args.runs,
+        "before_oauth_then_smtp": before,
+        "after_prepared_message": after,
+        "median_speedup": round(before["median_ms"] / after["median_ms"], 2),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+PDF extraction benchmark.
+
+Generates synthetic resume-like PDFs (1-50 pages, a few lines of text and a
+link annotation per page) locally and times:
+
+  legacy       the previous serial pdfplumber loop (string concatenation,
+               page.annots read through pdfplumber on every page)
+  pdfplumber   extract_text_from_pdf with the pdfplumber backend
+  pypdfium2    extract_text_from_pdf with the pypdfium2 backend (if installed)
+  parallel     parse_pdf_file_async, i.e. page ranges split over the CPU pool
+  capped       pdfplumber backend with --max-pages
+
+Parallel speedup depends on CPU_POOL_WORKERS and the number of cores.
+
+    cd backend && python benchmarks/bench_pdf_extract.py [--pages 1 5 20 50] [--runs 3]
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import pdfplumber
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parse_resume_pdf  # noqa: E402
+from config import CPU_POOL_WORKERS  # noqa: E402
+from executor import shutdown_pools  # noqa: E402
+from resume_cache import parse_pdf_file_async  # noqa: E402
+
+LINES_PER_PAGE = 40
+LINE = "Built a Python FastAPI service handling {n}k requests/day with PostgreSQL and Redis"
+
+
+def make_pdf(pages):
+    """Minimal valid PDF: Helvetica text lines plus one URI link per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + i * 2} 0 R" for i in range(pages))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>")
+    font_id = 3 + pages * 2
+
+    for i in range(pages):
+        lines = [f"({LINE.format(n=i * LINES_PER_PAGE + j)}) Tj T*" for j in range(LINES_PER_PAGE)]
+        content = "BT /F1 10 Tf 12 TL 50 760 Td " + " ".join(lines) + " ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + i * 2} 0 R "
+            f"/Annots [<< /Type /Annot /Subtype /Link /Rect [50 20 200 40] "
+            f"/A << /S /URI /URI (https://github.com/janedoe/project{i}) >> >>] >>"
+        )
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode()
+
+    xref_at = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def legacy_extract(source):
+    full_text = ""
+    links = []
+    with pdfplumber.open(source) as pdf:
+        for page in pdf.pages:
+            full_text += (page.extract_text() or "") + "\n"
+            if page.annots:
+                for annot in page.annots:
+                    url = annot.get("uri")
+                    if not url and isinstance(annot.get("A"), dict):
+                        url = annot["A"].get("URI")
+                    if url:
+                        links.append({"url": url, "text": parse_resume_pdf.friendly_text_from_url(url)})
+    return full_text.strip(), links
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 20, 50])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-pages", type=int, default=3)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    results = []
+    tmp_dir = tempfile.TemporaryDirectory()
+    tmp = tmp_dir.name
+
+    try:
+        for pages in args.pages:
+            data = make_pdf(pages)
+            path = os.path.join(tmp, f"resume-{pages}.pdf")
+            with open(path, "wb") as f:
+                f.write(data)
+            baseline = legacy_extract(io.BytesIO(data))
+
+            row = {"pages": pages, "pdf_kb": round(len(data) / 1024, 1)}
+            row["legacy_ms"] = timed(lambda: legacy_extract(io.BytesIO(data)), args.runs)
+            row["pdfplumber_ms"] = timed(
+                lambda: parse_resume_pdf.extract_text_from_pdf(io.BytesIO(data), backend="pdfplumber"), args.runs
+            )
+            if parse_resume_pdf.pdfium is not None:
+                row["pypdfium2_ms"] = timed(
+                    lambda: parse_resume_pdf.extract_text_from_pdf(io.BytesIO(data), backend="pypdfium2"), args.runs
+                )
+            # first call also pays process start-up; not part of the steady state
+            loop.run_until_complete(parse_pdf_file_async(path))
+            row["parallel_ms"] = timed(lambda: loop.run_until_complete(parse_pdf_file_async(path)), args.runs)
+            row["capped_ms"] = timed(
+                lambda: parse_resume_pdf.extract_text_from_pdf(
+                    io.BytesIO(data), backend="pdfplumber", max_pages=args.max_pages
+                ),
+                args.runs,
+            )
+
+            text, links = parse_resume_pdf.extract_text_from_pdf(io.BytesIO(data), backend="pdfplumber")
+            row["matches_legacy"] = (text, links) == baseline
+            row["parallel_matches_legacy"] = tuple(loop.run_until_complete(parse_pdf_file_async(path))) == baseline
+            row["speedup_best"] = round(
+                row["legacy_ms"] / min(v for k, v in row.items() if k.endswith("_ms") and k not in ("legacy_ms", "capped_ms")),
+                2,
+            )
+            results.append(row)
+    finally:
+        loop.close()
+        shutdown_pools()
+        tmp_dir.cleanup()
+
+    report = {
+        "benchmark": "pdf_extract",
+        "cpu_pool_workers": CPU_POOL_WORKERS,
+        "cpu_count": os.cpu_count(),
+        "runs": args.runs,
+        "max_pages_cap": args.max_pages,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Prompt condensation benchmark.
+
+Builds /generate-email and /regenerate-body prompts for a synthetic corpus of
+resumes, JDs and editor bodies with condensation on and off, and reports
+estimated input tokens per prompt type. It then runs generate_mail_dict and
+regenerate_mail_body end to end (quota scheduler, JD analyzer, parsing)
+against fakes.FakeGenerativeModel, whose response time is a fixed latency plus
+a per-input-token cost, and reports the mean call latency with each setting.
+
+The end-to-end numbers are only as good as --seconds-per-1k-tokens, the
+assumed input processing cost; measure it against the real model before
+drawing conclusions from them. Only the resume and JD are condensed; the body
+a regenerate rewrites is always sent whole, so regenerate savings come from
+the resume alone.
+
+    cd backend && python benchmarks/bench_prompt_prep.py [--resumes 20] \\
+        [--gemini-latency 0.3] [--seconds-per-1k-tokens 0.05]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+# Read once by config on import: no quota waits and no cached responses
+os.environ.update(GEMINI_REQUESTS_PER_MINUTE="0", GEMINI_TOKENS_PER_MINUTE="0", LLM_CACHE_DB="", SHARED_CACHE_DB="")
+
+import google.generativeai as genai  # noqa: E402
+
+from fakes import Faults, FakeGenerativeModel  # noqa: E402
+
+genai.GenerativeModel = FakeGenerativeModel
+
+import prompt_prep  # noqa: E402
+import gemini_ai_writer  # noqa: E402
+from prompt_prep import estimate_tokens  # noqa: E402
+
+SKILLS = ["Python", "FastAPI", "PyTorch", "TensorFlow", "SQL", "Docker", "Kubernetes", "React", "AWS", "NLP"]
+VERBS = ["Built", "Designed", "Optimized", "Led", "Deployed", "Automated", "Maintained", "Migrated"]
+
+
+def make_resume(rng, pages):
+    header = [
+        "Curriculum Vitae",
+        "Jane Doe",
+        "+91 98765 43210 | jane@example.com",
+        "GitHub: github.com/janedoe LinkedIn: linkedin.com/in/janedoe",
+    ]
+    body = ["Summary", "Machine learning engineer with a focus on production NLP systems.   "]
+    body += ["Technical Skills", ", ".join(rng.sample(SKILLS, 6))]
+    body.append("Work Experience")
+    for i in range(6 * pages):
+        body.append(f"{rng.choice(VERBS)} a {rng.choice(SKILLS)} service handling {rng.randint(1, 900)}k requests/day   ")
+    body.append("Projects")
+    for i in range(4 * pages):
+        body.append(f"Project {i}: {rng.choice(VERBS).lower()} pipeline using {rng.choice(SKILLS)} and {rng.choice(SKILLS)}")
+    body += ["Education", "B.Tech Computer Science, 2022", "Hobbies", "Chess, hiking, photography"]
+    body += ["References available upon request", "I hereby declare that the above information is true."]
+
+    pages_text = []
+    per_page = -(-len(body) // pages)
+    for page in range(pages):
+        # pdfplumber output repeats headers/footers on every page
+        lines = body[page * per_page:(page + 1) * per_page]
+        pages_text.append("\n".join(header + lines + [f"Page {page + 1} of {pages}"]))
+    return "\n".join(pages_text)
+
+
+def make_jd(rng):
+    paragraphs = [
+        f"We are hiring a Junior {rng.choice(SKILLS)} developer at example.com.",
+        "About us: " + " ".join(["We value ownership, curiosity and kindness."] * rng.randint(5, 30)),
+        "Requirements: " + ", ".join(rng.sample(SKILLS, 5)),
+        "Benefits: " + " ".join(["Flexible hours, learning budget, health cover."] * rng.randint(5, 20)),
+        "Interested candidates mail at hr@example.com and keep ceo@example.com in cc",
+    ]
+    return "\n\n".join(paragraphs)
+
+
+def make_body(rng):
+    # An editor (TipTap) body: greeting, a few paragraphs, signature
+    paragraphs = [
+        f"I have {rng.randint(1, 6)} years of experience with <b>{rng.choice(SKILLS)}</b> and "
+        f"<b>{rng.choice(SKILLS)}</b>. " + " ".join(["I enjoy owning services end to end."] * rng.randint(2, 8))
+        for _ in range(rng.randint(2, 6))
+    ]
+    return "<p>Dear Hiring Manager,</p>" + "".join(f"<p>{p}</p>" for p in paragraphs) + \
+        "<p>Best regards,<br>Jane Doe<br>+91 98765 43210</p>"
+
+
+def prompt_tokens(corpus, condense):
+    prompt_prep.PROMPT_CONDENSE_ENABLED = condense
+    prompt_prep._condensed.clear()
+
+    tokens = {"generate": 0, "regenerate": 0}
+    for resume, jd, body in corpus:
+        tokens["generate"] += estimate_tokens(gemini_ai_writer.build_mail_prompt(jd, resume, None))
+        tokens["regenerate"] += estimate_tokens(gemini_ai_writer.build_regenerate_prompt(body, None, resume))
+    return tokens
+
+
+def end_to_end(corpus, condense):
+    prompt_prep.PROMPT_CONDENSE_ENABLED = condense
+    prompt_prep._condensed.clear()
+
+    latencies = {"generate": [], "regenerate": []}
+    for resume, jd, body in corpus:
+        start = time.perf_counter()
+        gemini_ai_writer.generate_mail_dict(jd, resume, None, use_cache=False)
+        latencies["generate"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        gemini_ai_writer.regenerate_mail_body(body, None, resume, use_cache=False)
+        latencies["regenerate"].append(time.perf_counter() - start)
+
+    return {name: round(statistics.mean(samples) * 1000, 1) for name, samples in latencies.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resumes", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--gemini-latency", type=float, default=0.3, help="fixed seconds per call")
+    parser.add_argument("--seconds-per-1k-tokens", type=float, default=0.05, help="assumed input processing cost")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [(make_resume(rng, rng.randint(1, 4)), make_jd(rng), make_body(rng)) for _ in range(args.resumes)]
+    FakeGenerativeModel.configure(Faults(args.gemini_latency, 0.0, args.seed), args.seconds_per_1k_tokens)
+
+    baseline = prompt_tokens(corpus, condense=False)
+    condensed = prompt_tokens(corpus, condense=True)
+    baseline_ms = end_to_end(corpus, condense=False)
+    condensed_ms = end_to_end(corpus, condense=True)
+
+    report = {
+        "benchmark": "prompt_prep",
+        "samples": len(corpus),
+        "gemini_latency": args.gemini_latency,
+        "seconds_per_1k_input_tokens": args.seconds_per_1k_tokens,
+        "prompts": {
+            name: {
+                "tokens_baseline": baseline[name],
+                "tokens_condensed": condensed[name],
+                "token_reduction": round(1 - condensed[name] / baseline[name], 4),
+                "mean_ms_baseline": baseline_ms[name],
+                "mean_ms_condensed": condensed_ms[name],
+            }
+            for name in baseline
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
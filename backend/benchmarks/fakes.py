@@ -0,0 +1,298 @@
+"""
+Local stand-ins for the external services, for benchmarks and load tests.
+
+  FakeGenerativeModel  drop-in for genai.GenerativeModel
+  FakeGmailService     the subset of the Gmail API client used by automate_mail
+  FakeGmailHTTP        Gmail's messages.send REST endpoint, as an httpx transport
+  FakeSMTPServer       aiosmtpd server on localhost
+
+Each takes a Faults(latency, error_rate) describing the injected delay (in
+seconds) and the fraction of calls that fail the way the real service would.
+"""
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass
+
+import httplib2
+import httpx
+from google.api_core import exceptions as google_exceptions
+from googleapiclient.errors import HttpError
+
+
+@dataclass
+class Faults:
+    latency: float = 0.0
+    error_rate: float = 0.0
+    seed: int | None = None
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    def should_fail(self):
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def record(self, failed):
+        with self._lock:
+            self.calls += 1
+            self.failures += int(failed)
+
+    def snapshot(self):
+        with self._lock:
+            return {"calls": self.calls, "failures": self.failures}
+
+
+# ---------- Gemini ----------
+MAIL_JSON = {
+    "recipient": "hr@example.com",
+    "cc": None,
+    "subject": "Application for Backend Engineer",
+    "body": "Dear Hiring Manager,\nI am excited to apply for the <b>Backend Engineer</b> role.\nRegards,\nJane",
+}
+REGENERATED_BODY = "Dear Hiring Manager,\nI would love to bring my <b>Python</b> experience to your team.\nRegards,\nJane"
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Answers mail-generation prompts with JSON and regenerate prompts with a
+    body. A response takes faults.latency plus `seconds_per_1k_input_tokens`
+    for every 1000 estimated prompt tokens (input processing time).
+    """
+
+    faults = Faults()
+    stats = _Stats()
+    stream_chunks = 4
+    seconds_per_1k_input_tokens = 0.0
+
+    def __init__(self, model_name, generation_config=None, **kwargs):
+        self.model_name = model_name
+        self.generation_config = generation_config
+
+    @classmethod
+    def configure(cls, faults, seconds_per_1k_input_tokens=0.0):
+        cls.faults = faults
+        cls.seconds_per_1k_input_tokens = seconds_per_1k_input_tokens
+        cls.stats = _Stats()
+
+    def _latency(self, prompt):
+        return self.faults.latency + self.seconds_per_1k_input_tokens * len(prompt) / 4 / 1000
+
+    def _answer(self, prompt):
+        if "ORIGINAL EMAIL BODY" in prompt:
+            return REGENERATED_BODY
+        if "--- ROLE ---" in prompt:
+            # body-only prompt (recipient/cc/subject found by jd_analyzer)
+            return json.dumps({"body": MAIL_JSON["body"]})
+        return json.dumps(MAIL_JSON)
+
+    def _maybe_fail(self):
+        failed = self.faults.should_fail()
+        self.stats.record(failed)
+        if failed:
+            raise google_exceptions.ServiceUnavailable("Injected Gemini failure")
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self._maybe_fail()
+        text = self._answer(prompt)
+
+        if not stream:
+            time.sleep(self._latency(prompt))
+            return _FakeResponse(text)
+
+        step = -(-len(text) // self.stream_chunks)
+        parts = [text[i:i + step] for i in range(0, len(text), step)]
+        return self._stream(parts, self._latency(prompt))
+
+    def _stream(self, parts, latency):
+        for part in parts:
+            time.sleep(latency / len(parts))
+            yield _FakeResponse(part)
+
+    def count_tokens(self, contents):
+        return {"total_tokens": len(str(contents)) // 4}
+
+
+# ---------- Gmail ----------
+class _FakeRequest:
+    def __init__(self, service):
+        self.service = service
+
+    def execute(self, http=None, num_retries=0):
+        faults = self.service.faults
+        time.sleep(faults.latency)
+
+        failed = faults.should_fail()
+        self.service.stats.record(failed)
+        if failed:
+            raise HttpError(httplib2.Response({"status": 503}), b'{"error": "Injected Gmail failure"}')
+
+        with self.service.lock:
+            self.service.sent += 1
+            return {"id": f"fake-{self.service.sent}"}
+
+
+class FakeGmailService:
+    """Mimics service.users().messages().send(userId=..., body=...).execute()."""
+
+    def __init__(self, faults=None):
+        self.faults = faults or Faults()
+        self.stats = _Stats()
+        self.lock = threading.Lock()
+        self.sent = 0
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def send(self, userId, body):
+        return _FakeRequest(self)
+
+
+class FakeGmailHolder:
+    """Stands in for gmail_auth.gmail_holder around FakeGmailService."""
+
+    interactive = True
+
+    def __init__(self, service):
+        self.service = service
+
+    def get_service(self):
+        return self.service
+
+    def http(self):
+        return None
+
+    def bearer_token(self):
+        return "fake-access-token"
+
+    def invalidate(self):
+        pass
+
+    def refresh_if_needed(self):
+        return True
+
+    def stats(self):
+        return self.service.stats.snapshot()
+
+
+class FakeGmailHTTP:
+    """
+    Answers POST /gmail/v1/users/{user}/messages/send like the Gmail REST API,
+    for async_transports.AsyncGmailClient(transport=fake.transport()).
+    """
+
+    def __init__(self, faults=None):
+        self.faults = faults or Faults()
+        self.stats = _Stats()
+        self.sent = 0
+
+    async def handle(self, request):
+        await asyncio.sleep(self.faults.latency)
+
+        if request.method != "POST" or not request.url.path.endswith("/messages/send"):
+            return httpx.Response(404, json={"error": {"code": 404, "message": "Not found"}})
+        if not request.headers.get("authorization", "").startswith("Bearer "):
+            return httpx.Response(401, json={"error": {"code": 401, "message": "Missing access token"}})
+        if "raw" not in json.loads(request.content or b"{}"):
+            return httpx.Response(400, json={"error": {"code": 400, "message": "Missing raw message"}})
+
+        failed = self.faults.should_fail()
+        self.stats.record(failed)
+        if failed:
+            return httpx.Response(503, json={"error": {"code": 503, "message": "Injected Gmail failure"}})
+
+        self.sent += 1
+        return httpx.Response(200, json={"id": f"fake-{self.sent}", "labelIds": ["SENT"]})
+
+    def transport(self):
+        return httpx.MockTransport(self.handle)
+
+
+# ---------- SMTP ----------
+class _SMTPHandler:
+    def __init__(self, faults):
+        self.faults = faults
+        self.stats = _Stats()
+        self.received = 0
+        self.connections = set()  # live aiosmtpd.smtp.SMTP protocol instances that sent mail
+        self.peers = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.connections.add(server)
+        self.peers.add(session.peer)
+        await asyncio.sleep(self.faults.latency)
+
+        failed = self.faults.should_fail()
+        self.stats.record(failed)
+        if failed:
+            return "451 4.3.0 Injected SMTP failure"
+
+        self.received += 1
+        return "250 Message accepted"
+
+
+class FakeSMTPServer:
+    """aiosmtpd server on localhost; use as a context manager."""
+
+    def __init__(self, faults=None, host="127.0.0.1", port=0):
+        from aiosmtpd.controller import Controller
+
+        self.handler = _SMTPHandler(faults or Faults())
+        self.host = host
+        self._controller = Controller(self.handler, hostname=host, port=port or free_port(host))
+
+    @property
+    def port(self):
+        return self._controller.port
+
+    @property
+    def stats(self):
+        return self.handler.stats
+
+    def __enter__(self):
+        self._controller.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._controller.stop()
+
+    def drop_connections(self, timeout=5):
+        """Closes every client connection from the server side, like an idle-timeout disconnect."""
+        done = threading.Event()
+
+        def close_all():
+            for server in self.handler.connections:
+                if server.transport is not None:
+                    server.transport.close()
+            self.handler.connections.clear()
+            done.set()
+
+        self._controller.loop.call_soon_threadsafe(close_all)
+        done.wait(timeout)
+
+
+def free_port(host="127.0.0.1"):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
@@ -0,0 +1,317 @@
+"""
+Load test for the API with local stand-ins for Gemini, Gmail and SMTP.
+
+Boots api.app under uvicorn on localhost with:
+  - genai.GenerativeModel replaced by fakes.FakeGenerativeModel
+  - the Gmail service replaced by fakes.FakeGmailService, and the async Gmail
+    client's HTTP transport by fakes.FakeGmailHTTP
+  - the SMTP pools pointed at a local aiosmtpd server (fakes.FakeSMTPServer)
+each with injected latency and error rate, then drives the chosen endpoints at
+a fixed concurrency and prints a JSON report (latency percentiles, requests
+per second, status codes, server-side stage timings, memory).
+
+    cd backend && python benchmarks/load_test.py --requests 200 --concurrency 16 \\
+        --gemini-latency 0.8 --gmail-error-rate 0.1 --output report.json
+
+Compare two reports (e.g. before/after a change) by diffing the
+"scenarios" entries; the "git_commit" field identifies the tree under test.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+SCENARIOS = ("generate", "regenerate", "send")
+
+JD_TEXT = (
+    "We are hiring a Backend Engineer (Python, FastAPI, PostgreSQL) at Example Corp.\n"
+    "Send your resume to careers@example.com with the subject 'Backend Engineer'.\n"
+) * 3
+ORIGINAL_BODY = "<p>Dear Hiring Manager,</p><p>I am applying for the <b>Backend Engineer</b> role.</p><p>Regards,<br>Jane</p>"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--cache", choices=("bypass", "default"), default="bypass",
+                        help="LLM cache mode sent with generate/regenerate requests")
+    parser.add_argument("--resume-pages", type=int, default=2)
+    parser.add_argument("--gemini-latency", type=float, default=0.2)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gmail-latency", type=float, default=0.1)
+    parser.add_argument("--gmail-error-rate", type=float, default=0.0)
+    parser.add_argument("--smtp-latency", type=float, default=0.05)
+    parser.add_argument("--smtp-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-rpm", type=int, default=0,
+                        help="client-side Gemini request quota (0 = unlimited)")
+    parser.add_argument("--gemini-tpm", type=int, default=0,
+                        help="client-side Gemini token quota (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    return parser.parse_args()
+
+
+def isolate_state(tmp, args):
+    # Must run before the backend modules are imported: config reads these once
+    os.environ.update(
+        MAIL_QUEUE_PATH=os.path.join(tmp, "mail_queue.db"),
+        MAIL_QUEUE_ATTACHMENT_DIR=os.path.join(tmp, "attachments"),
+        CAMPAIGN_DB_PATH=os.path.join(tmp, "campaigns.db"),
+        RESUME_STORE_DIR=os.path.join(tmp, "resumes"),
+        RESUME_CACHE_DIR="",
+        LLM_CACHE_DB="",
+        GEMINI_WARMUP_PING="false",
+        HOT_PATH_LOG_LEVEL="ERROR",
+        LOG_LEVEL="WARNING",
+        sender_email="loadtest@example.com",
+        GEMINI_REQUESTS_PER_MINUTE=str(args.gemini_rpm),
+        GEMINI_TOKENS_PER_MINUTE=str(args.gemini_tpm),
+    )
+
+
+def install_fakes(args, smtp_server):
+    import google.generativeai as genai
+
+    import api
+    import automate_mail
+    import gmail_auth
+    import model_registry
+    from fakes import Faults, FakeGenerativeModel, FakeGmailService, FakeGmailHolder, FakeGmailHTTP
+
+    FakeGenerativeModel.configure(Faults(args.gemini_latency, args.gemini_error_rate, args.seed))
+    genai.GenerativeModel = FakeGenerativeModel
+    model_registry._models.clear()
+
+    gmail = FakeGmailService(Faults(args.gmail_latency, args.gmail_error_rate, args.seed + 1))
+    holder = FakeGmailHolder(gmail)
+    gmail_auth.gmail_holder = automate_mail.gmail_holder = api.gmail_holder = holder
+
+    gmail_http = FakeGmailHTTP(Faults(args.gmail_latency, args.gmail_error_rate, args.seed + 3))
+    if automate_mail.async_gmail is not None:
+        automate_mail.async_gmail.transport = gmail_http.transport()
+
+    automate_mail.smtp_pool.close_all()
+    for pool in (automate_mail.smtp_pool, automate_mail.async_smtp_pool):
+        if pool is not None:
+            pool.host, pool.port, pool.use_ssl = smtp_server.host, smtp_server.port, False
+            pool.username = pool.password = None
+
+    return gmail, gmail_http
+
+
+class Server:
+    """uvicorn in a background thread."""
+
+    def __init__(self, app, port):
+        import uvicorn
+
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("API server did not start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=30)
+
+
+def request_for(scenario, resume_id, cache):
+    if scenario == "generate":
+        return "/generate-email", {"jd_text": JD_TEXT, "resume_id": resume_id, "cache": cache}
+    if scenario == "regenerate":
+        return "/regenerate-body", {
+            "original_body": ORIGINAL_BODY,
+            "instruction": "Make it shorter",
+            "resume_id": resume_id,
+            "cache": cache,
+        }
+    return "/send-email", {
+        "recipient": "hr@example.com",
+        "subject": "Application for Backend Engineer",
+        "body": ORIGINAL_BODY,
+        "resume_id": resume_id,
+    }
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def stage_totals():
+    from metrics import stage_seconds
+
+    return {labels[0]: totals for labels, totals in stage_seconds.totals().items()}
+
+
+def stage_delta(before, after):
+    delta = {}
+    for name, (count, total) in after.items():
+        prev_count, prev_total = before.get(name, (0, 0.0))
+        if count > prev_count:
+            delta[name] = {
+                "count": count - prev_count,
+                "mean_ms": round((total - prev_total) / (count - prev_count) * 1000, 2),
+            }
+    return delta
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def run_scenario(client, scenario, resume_id, args):
+    path, form = request_for(scenario, resume_id, args.cache)
+
+    for _ in range(args.warmup):
+        await client.post(path, data=form)
+
+    latencies = []
+    statuses = {}
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        async with slots:
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, data=form)
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    stages_before = stage_totals()
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ok = statuses.get("200", 0)
+    return {
+        "scenario": scenario,
+        "endpoint": path,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "wall_seconds": round(wall, 3),
+        "requests_per_second": round(args.requests / wall, 2),
+        "success_rate": round(ok / args.requests, 4),
+        "status_codes": statuses,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "mean": round(statistics.fmean(latencies) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2),
+        },
+        "server_stages": stage_delta(stages_before, stage_totals()),
+        "rss_mb": {"before": rss_before, "after": rss_mb()},
+    }
+
+
+async def drive(base_url, args, resume_pdf):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        response = await client.post("/resumes", files={"resume_file": ("resume.pdf", resume_pdf, "application/pdf")})
+        response.raise_for_status()
+        resume_id = response.json()["resume_id"]
+
+        return [await run_scenario(client, scenario, resume_id, args) for scenario in args.scenarios]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        isolate_state(tmp, args)
+
+        import api
+        from bench_pdf_extract import make_pdf
+        from fakes import FakeGenerativeModel, FakeSMTPServer, Faults, free_port
+
+        with FakeSMTPServer(Faults(args.smtp_latency, args.smtp_error_rate, args.seed + 2)) as smtp_server:
+            gmail, gmail_http = install_fakes(args, smtp_server)
+            port = free_port()
+
+            with Server(api.app, port):
+                scenarios = asyncio.run(drive(f"http://127.0.0.1:{port}", args, make_pdf(args.resume_pages)))
+
+            fake_calls = {
+                "gemini": FakeGenerativeModel.stats.snapshot(),
+                "gmail": gmail.stats.snapshot(),
+                "gmail_http": gmail_http.stats.snapshot(),
+                "smtp": smtp_server.stats.snapshot(),
+            }
+
+    report = {
+        "benchmark": "load_test",
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            key: value for key, value in vars(args).items() if key not in ("output", "scenarios")
+        },
+        "scenarios": scenarios,
+        "fake_backend_calls": fake_calls,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
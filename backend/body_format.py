@@ -0,0 +1,272 @@
+import html
+import re
+from dataclasses import dataclass
+
+# Blank line(s) between paragraphs, after line endings are normalised
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+# Everything not listed here is dropped; text inside a dropped element is
+# kept, except for the elements in _DROPPED_CONTENT
+_ALLOWED_TAGS = {
+    "a", "b", "strong", "i", "em", "u", "s", "sub", "sup", "small", "span", "font", "code",
+    "p", "div", "br", "hr", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre",
+    "ul", "ol", "li", "table", "thead", "tbody", "tfoot", "tr", "td", "th", "img",
+}
+_DROPPED_CONTENT = {
+    "script", "style", "head", "title", "iframe", "object", "noscript", "template", "textarea", "select",
+}
+_COMMON_ATTRS = {"style", "title", "align", "dir"}
+_ALLOWED_ATTRS = {
+    "a": {"href", "target"},
+    "img": {"src", "alt", "width", "height"},
+    "font": {"color", "face", "size"},
+    "td": {"colspan", "rowspan", "width", "valign"},
+    "th": {"colspan", "rowspan", "width", "valign"},
+    "table": {"width", "border", "cellpadding", "cellspacing"},
+    "ol": {"start", "type"},
+}
+_URL_ATTRS = {"href", "src"}
+_SAFE_SCHEMES = {"http", "https", "mailto", "cid"}
+
+# Any markup token except an allowed tag written plainly as <tag> or </tag>,
+# which is already in its sanitised form and is left where it is: a comment,
+# a declaration / processing instruction / bogus end tag, a start or end tag,
+# or a "<" that starts none of these (text). Quoted attribute values may hold
+# ">", and an unterminated tag or comment runs to the end like in a browser.
+_TOKEN = re.compile(
+    r"<(?!/?(?:{})>)".format("|".join(sorted(_ALLOWED_TAGS, key=len, reverse=True)))
+    + r"(?:!--.*?(?:--!?>|\Z)"
+    r"|(?:[!?]|/(?![a-zA-Z]))[^>]*(?:>|\Z)"
+    r"|(/?)([a-zA-Z][^\t\n\r\f />]*)((?:[^>\"']+|\"[^\"]*\"?|'[^']*'?)*)(?:>|\Z)"
+    r"|)",
+    re.DOTALL,
+)
+_ATTR = re.compile(r"""([^\s"'/>=]+)(?:\s*=\s*(?:"([^"]*)"?|'([^']*)'?|([^\s>]+)))?""")
+
+# A dropped element up to its end tag (or the end of the body)
+_DROPPED_ELEMENT = re.compile(
+    r"<({})(?=[\s/>]|\Z)(?:[^>\"']+|\"[^\"]*\"?|'[^']*'?)*(?:>|\Z).*?(?:</\1(?=[\s/>])[^>]*>?|\Z)".format(
+        "|".join(_DROPPED_CONTENT)
+    ),
+    re.IGNORECASE | re.DOTALL,
+)
+# Stands in for a dropped element's start tag until its content is cut out
+_DROPPED_MARK = "\0"
+
+# Browsers ignore whitespace and control characters anywhere in a URL scheme
+_URL_IGNORED = re.compile(r"[\x00-\x20\x7f]+")
+_URL_SCHEME = re.compile(r"^([^/?#]*?):")
+
+# Inline styles keep only plain declarations: no url(), expression(),
+# escapes or comments, which is where script gets smuggled into CSS
+_STYLE_PROPERTIES = {
+    "color", "background-color", "font-family", "font-size", "font-style", "font-weight",
+    "text-align", "text-decoration", "line-height", "margin", "margin-top", "margin-bottom",
+    "margin-left", "margin-right", "padding", "padding-top", "padding-bottom", "padding-left",
+    "padding-right", "border", "width", "vertical-align",
+}
+_STYLE_VALUE = re.compile(r"^(?:[\w\s#%.,'\"-]|rgba?\([\d\s.,%]*\))*$")
+
+# Plain-text rendering of the sanitised HTML (see _render_text), which only
+# holds tags the way _clean_token writes them
+_LINK = re.compile(r"<a([^>]*)>(.*?)</a>", re.DOTALL)
+_HREF = re.compile(r' href="([^"]*)"')
+_TAG = re.compile(r"<[^>]*>")
+_TAG_WITH_ATTRS = re.compile(r"<([a-z0-9]+) [^>]*>")
+
+# Line break markers, turned into newlines once whitespace has collapsed
+_BR, _PARA = "\x01", "\x02"
+_BLOCK_TAGS = ("p", "div", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "table", "tr", "blockquote", "pre")
+_OPEN_BREAKS = {**dict.fromkeys(_BLOCK_TAGS, _PARA), "hr": _PARA, "br": _BR, "li": _BR + "- "}
+_CLOSE_BREAKS = {**dict.fromkeys(_BLOCK_TAGS, _PARA), "td": "\t", "th": "\t"}
+# The same for tags without attributes, matched as literal strings
+_TAG_MARKS = {
+    **{f"<{tag}>": mark for tag, mark in _OPEN_BREAKS.items()},
+    **{f"</{tag}>": mark for tag, mark in _CLOSE_BREAKS.items()},
+}
+_PLAIN_BREAK_TAG = re.compile("|".join(sorted(_TAG_MARKS, key=len, reverse=True)))
+# Frequent enough in LLM and editor output to be worth a str.replace first
+_COMMON_TAGS = ("<br>", "<p>", "</p>", "<div>", "</div>", "<li>")
+
+HTML_WRAPPER = '<div style="font-family: sans-serif; line-height: 1.6; color: #333;">{}</div>'
+
+
+@dataclass(frozen=True)
+class FormattedBody:
+    """Sanitised HTML body and its plain-text rendering (for multipart/alternative)."""
+    html: str
+    text: str
+
+
+def lines_to_br(text):
+    """Turns every line ending (\\n, \\r\\n, \\r) into <br>."""
+    if not text:
+        return ""
+    # The "\r" scan is far cheaper than the two replaces it usually saves
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text.replace("\n", "<br>")
+
+
+def plain_text_to_html(text):
+    """
+    Converts plain text with line breaks to clean HTML.
+    Blank lines start a new paragraph; single line breaks become <br>.
+    Handles Windows/Mac/Linux line endings.
+    """
+    if not text:
+        return ""
+
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    paragraphs = _PARAGRAPH_BREAK.split(text.strip())
+    html_body = "</p><p>".join(p.replace("\n", "<br>") for p in paragraphs)
+    return HTML_WRAPPER.format(f"<p>{html_body}</p>")
+
+
+def _safe_url(value):
+    # Checked on the entity-decoded value, so "java&#115;cript:" is seen
+    # as "javascript:"
+    match = _URL_SCHEME.match(_URL_IGNORED.sub("", value))
+    if match and match.group(1).lower() not in _SAFE_SCHEMES:
+        return None
+    return value.strip()
+
+
+def _safe_style(value):
+    declarations = []
+    for declaration in value.split(";"):
+        prop, sep, val = declaration.partition(":")
+        prop = prop.strip().lower()
+        if sep and prop in _STYLE_PROPERTIES and _STYLE_VALUE.match(val):
+            declarations.append(f"{prop}: {val.strip()}")
+    return "; ".join(declarations) or None
+
+
+def _attrs(tag, source):
+    allowed = _ALLOWED_ATTRS.get(tag, ())
+    seen = set()
+    out = []
+    for name, double, single, bare in _ATTR.findall(source):
+        name = name.lower()
+        if name in seen or (name not in _COMMON_ATTRS and name not in allowed):
+            continue
+        # Like a browser, the first occurrence of an attribute wins
+        seen.add(name)
+
+        value = double or single or bare
+        if "&" in value:
+            value = html.unescape(value)
+        if name in _URL_ATTRS:
+            value = _safe_url(value)
+        elif name == "style":
+            value = _safe_style(value)
+        if value is not None:
+            out.append(f' {name}="{html.escape(value)}"')
+    return "".join(out)
+
+
+def _clean_token(match):
+    closing, tag, attr_source = match.groups()
+    if tag is None:
+        # Comments and declarations go; a lone "<" is text
+        return "&lt;" if match.end() - match.start() == 1 else ""
+
+    tag = tag.lower()
+    if tag not in _ALLOWED_TAGS:
+        return _DROPPED_MARK if tag in _DROPPED_CONTENT and not closing else ""
+    if closing:
+        return f"</{tag}>"
+    if attr_source:
+        return f"<{tag}{_attrs(tag, attr_source)}>"
+    return f"<{tag}>"
+
+
+def _sanitize(body):
+    """
+    Rebuilds every tag that is not already a plain allowed <tag> / </tag>:
+    only allowlisted tags and attributes are written back, with quoted and
+    escaped values, and every other "<" is dropped or escaped. Text is left
+    as it is, since nothing in it can start markup any more.
+    """
+    body = body.replace(_DROPPED_MARK, "")
+    sanitized = _TOKEN.sub(_clean_token, body)
+    if _DROPPED_MARK not in sanitized:
+        return sanitized
+
+    # Script-like elements are cut out by position and the body is read
+    # again, so their content is never taken for markup. Cutting one can
+    # join the two halves of a tag around it ("<scr<script></script>ipt>"),
+    # hence the repeat until nothing changes.
+    while True:
+        stripped = _DROPPED_ELEMENT.sub("", body)
+        if stripped == body:
+            break
+        body = stripped
+    return _TOKEN.sub(_clean_token, body).replace(_DROPPED_MARK, "")
+
+
+def _link_text(match):
+    href = _HREF.search(match.group(1))
+    label = match.group(2)
+    if href:
+        url = href.group(1).removeprefix("mailto:")
+        if url != "#" and not _TAG.sub("", label).strip().endswith(url):
+            return f"{label} ({url})"
+    return label
+
+
+def _tag_break(match):
+    return _OPEN_BREAKS.get(match.group(1), "")
+
+
+def _tag_mark(match):
+    return _TAG_MARKS[match.group()]
+
+
+def _render_text(sanitized):
+    # Source whitespace collapses like it does in a browser; only the break
+    # markers emitted for tags become real line breaks
+    text = " ".join(sanitized.split())
+    if "<a" in text:
+        text = _LINK.sub(_link_text, text)
+
+    # Tags are written the way _clean_token does it, so a tag with
+    # attributes is the only kind that needs more than a literal match
+    for tag in _COMMON_TAGS:
+        if tag in text:
+            text = text.replace(tag, _TAG_MARKS[tag])
+    if "<" in text:
+        text = _PLAIN_BREAK_TAG.sub(_tag_mark, text)
+        if "=" in text:
+            text = _TAG_WITH_ATTRS.sub(_tag_break, text)
+        text = _TAG.sub("", text)
+    if "&" in text:
+        text = html.unescape(text)
+
+    # After the collapse at most one space sits on either side of a marker
+    for mark in (_BR, _PARA, "\t"):
+        text = text.replace(f" {mark}", mark).replace(f"{mark} ", mark)
+    text = text.replace("\t" + _PARA, _PARA).replace(_BR, "\n").replace(_PARA, "\n\n")
+    while "\n\n\n" in text:
+        text = text.replace("\n\n\n", "\n\n")
+    return text.strip()
+
+
+def format_body(body):
+    """
+    Sanitised HTML and a plain-text version of an (editor or LLM) HTML
+    body. Only allowlisted tags and attributes survive; URLs must use a safe
+    scheme and inline styles are reduced to plain declarations.
+
+    This is two passes over the body, not one: _sanitize rewrites the tags
+    (and reads the body again if a script-like element had to be cut out),
+    then _render_text turns the sanitised markup into text with a chain of
+    literal replaces. Plain <p>, <br>, <b>, ... tags are already safe, so
+    the sanitise pass leaves them where they are.
+    """
+    if not body:
+        return FormattedBody("", "")
+
+    sanitized = _sanitize(body) if "<" in body else body
+    return FormattedBody(sanitized, _render_text(sanitized))
@@ -0,0 +1,607 @@
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from email_validator import validate_email, EmailNotValidError
+
+from automate_mail import SENDER_EMAIL, send_email_async, transports_available
+from executor import run_io
+from mail_template import Template, normalize_field
+from metrics import stage, campaign_sends
+from config import (
+    CAMPAIGN_DB_PATH,
+    CAMPAIGN_MAX_CONTACTS,
+    CAMPAIGN_CONCURRENCY,
+    CAMPAIGN_SENDS_PER_MINUTE,
+    CAMPAIGN_MAX_ATTEMPTS,
+    CAMPAIGN_RETRY_SECONDS,
+    CAMPAIGN_LEASE_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    status TEXT NOT NULL,
+    subject_template TEXT NOT NULL,
+    body_template TEXT NOT NULL,
+    attachment_path TEXT,
+    total INTEGER NOT NULL,
+    runner_id TEXT,
+    heartbeat_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS campaign_recipients (
+    campaign_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    email TEXT NOT NULL,
+    fields TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (campaign_id, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_recipients_status ON campaign_recipients (campaign_id, status, seq);
+
+CREATE TABLE IF NOT EXISTS send_quota (
+    provider TEXT PRIMARY KEY,
+    level REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Campaign lifecycle: draft -> running <-> paused -> completed
+CAMPAIGN_DRAFT = "draft"
+CAMPAIGN_RUNNING = "running"
+CAMPAIGN_PAUSED = "paused"
+CAMPAIGN_COMPLETED = "completed"
+
+# Recipient lifecycle: pending -> sending -> sent | retry -> ... | failed; invalid never sends
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+RETRY = "retry"
+FAILED = "failed"
+INVALID = "invalid"
+RECIPIENT_STATUSES = (PENDING, SENDING, SENT, RETRY, FAILED, INVALID)
+
+EMAIL_FIELDS = ("email", "email_address", "e_mail", "recipient", "mail")
+
+
+# ---------- Contacts ----------
+def parse_contacts(data: bytes, filename=None):
+    """
+    Contacts from a CSV file (header row) or a JSON array of objects, as dicts
+    with normalized field names (see mail_template.normalize_field) and
+    string values. A `first_name` is derived from `name` when missing.
+    Raises ValueError for unreadable input.
+    """
+    text = data.decode("utf-8-sig")
+    name = (filename or "").lower()
+
+    if name.endswith(".json") or text.lstrip().startswith(("[", "{")):
+        rows = json.loads(text)
+        if isinstance(rows, dict):
+            rows = rows.get("contacts")
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("JSON contacts must be an array of objects")
+    else:
+        sample = text[:4096]
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        rows = list(csv.DictReader(io.StringIO(text), dialect=dialect))
+
+    contacts = []
+    for row in rows:
+        contact = {
+            normalize_field(key): "" if value is None else str(value).strip()
+            for key, value in row.items()
+            if key is not None
+        }
+        if contact.get("name") and not contact.get("first_name"):
+            contact["first_name"] = contact["name"].split()[0]
+        contacts.append(contact)
+    return contacts
+
+
+def contact_email(contact):
+    for field in EMAIL_FIELDS:
+        if contact.get(field):
+            return contact[field]
+    return None
+
+
+def checked_email(address):
+    """Normalized address, or None if it is not a valid email address."""
+    if not address:
+        return None
+    try:
+        return validate_email(address, check_deliverability=False).normalized
+    except EmailNotValidError:
+        return None
+
+
+# ---------- Store ----------
+class CampaignStore:
+    """
+    SQLite-backed campaigns and per-recipient send status. Every result is
+    checkpointed here, so a campaign interrupted by a restart (or paused)
+    resumes with only the recipients that were not sent yet. A campaign is
+    run by one process at a time: its runner holds a lease renewed by each
+    checkpoint. The database is created on first use, not on import.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _conn(self):
+        # sqlite3 connections must not be shared across threads or forked processes
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _immediate(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def create(self, name, subject_template, body_template, contacts, attachment_path=None):
+        """Stores the campaign as a draft; returns (campaign_id, number of invalid addresses)."""
+        campaign_id = uuid.uuid4().hex
+        now = time.time()
+        rows = []
+        invalid = 0
+
+        for seq, contact in enumerate(contacts):
+            email = checked_email(contact_email(contact))
+            if email is None:
+                invalid += 1
+            rows.append((
+                campaign_id, seq, email or contact_email(contact) or "", json.dumps(contact),
+                INVALID if email is None else PENDING,
+                "Invalid email address" if email is None else None, now,
+            ))
+
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """INSERT INTO campaigns (id, name, status, subject_template, body_template,
+                                          attachment_path, total, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (campaign_id, name, CAMPAIGN_DRAFT, subject_template, body_template,
+                 attachment_path, len(rows), now, now),
+            )
+            conn.executemany(
+                """INSERT INTO campaign_recipients (campaign_id, seq, email, fields, status, last_error, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                rows,
+            )
+        return campaign_id, invalid
+
+    def campaign(self, campaign_id):
+        row = self._conn().execute("SELECT * FROM campaigns WHERE id = ?", (campaign_id,)).fetchone()
+        return dict(row) if row else None
+
+    def progress(self, campaign_id):
+        campaign = self.campaign(campaign_id)
+        if campaign is None:
+            return None
+
+        rows = self._conn().execute(
+            "SELECT status, COUNT(*) AS n FROM campaign_recipients WHERE campaign_id = ? GROUP BY status",
+            (campaign_id,),
+        ).fetchall()
+        counts = {row["status"]: row["n"] for row in rows}
+        total = campaign["total"]
+        done = counts.get(SENT, 0) + counts.get(FAILED, 0) + counts.get(INVALID, 0)
+
+        rate = None
+        if campaign["started_at"] and counts.get(SENT):
+            elapsed = (campaign["finished_at"] or time.time()) - campaign["started_at"]
+            rate = round(counts[SENT] / elapsed * 60, 1) if elapsed > 0 else None
+
+        return {
+            "campaign_id": campaign_id,
+            "name": campaign["name"],
+            "status": campaign["status"],
+            "total": total,
+            "counts": counts,
+            "progress": done / total if total else 1.0,
+            "sends_per_minute": rate,
+            "created_at": campaign["created_at"],
+            "started_at": campaign["started_at"],
+            "finished_at": campaign["finished_at"],
+        }
+
+    def recipients(self, campaign_id, status=None, offset=0, limit=100):
+        query = """SELECT seq, email, status, attempts, last_error, updated_at
+                   FROM campaign_recipients WHERE campaign_id = ?"""
+        params = [campaign_id]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY seq LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        return [dict(row) for row in self._conn().execute(query, params).fetchall()]
+
+    def claim(self, campaign_id, runner_id, lease_sec):
+        """
+        Marks the campaign running under `runner_id` unless another live
+        runner holds it or it is already completed. Recipients left in
+        "sending" by an interrupted run go back to pending.
+        """
+        now = time.time()
+        conn = self._immediate()
+        try:
+            campaign = conn.execute("SELECT * FROM campaigns WHERE id = ?", (campaign_id,)).fetchone()
+            claimable = campaign is not None and campaign["status"] != CAMPAIGN_COMPLETED and not (
+                campaign["status"] == CAMPAIGN_RUNNING and campaign["runner_id"] not in (None, runner_id)
+                and (campaign["heartbeat_at"] or 0) > now - lease_sec
+            )
+            if claimable:
+                conn.execute(
+                    """UPDATE campaigns SET status = ?, runner_id = ?, heartbeat_at = ?, updated_at = ?,
+                                            started_at = COALESCE(started_at, ?), finished_at = NULL
+                       WHERE id = ?""",
+                    (CAMPAIGN_RUNNING, runner_id, now, now, now, campaign_id),
+                )
+                conn.execute(
+                    "UPDATE campaign_recipients SET status = ?, updated_at = ? WHERE campaign_id = ? AND status = ?",
+                    (PENDING, now, campaign_id, SENDING),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return claimable
+
+    def interrupted(self, lease_sec):
+        """Running campaigns whose runner stopped renewing its lease."""
+        rows = self._conn().execute(
+            "SELECT id FROM campaigns WHERE status = ? AND COALESCE(heartbeat_at, 0) <= ?",
+            (CAMPAIGN_RUNNING, time.time() - lease_sec),
+        ).fetchall()
+        return [row["id"] for row in rows]
+
+    def set_status(self, campaign_id, status):
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE campaigns SET status = ?, updated_at = ? WHERE id = ? AND status != ?",
+                (status, time.time(), campaign_id, CAMPAIGN_COMPLETED),
+            )
+        return cursor.rowcount > 0
+
+    def take_batch(self, campaign_id, limit):
+        """Next recipients due for a send, marked "sending"."""
+        now = time.time()
+        conn = self._immediate()
+        try:
+            rows = conn.execute(
+                """SELECT seq, email, fields, attempts FROM campaign_recipients
+                   WHERE campaign_id = ? AND (status = ? OR (status = ? AND next_attempt_at <= ?))
+                   ORDER BY seq LIMIT ?""",
+                (campaign_id, PENDING, RETRY, now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE campaign_recipients SET status = ?, updated_at = ? WHERE campaign_id = ? AND seq = ?",
+                [(SENDING, now, campaign_id, row["seq"]) for row in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [dict(row) for row in rows]
+
+    def release(self, campaign_id, seqs):
+        """Returns claimed-but-unsent recipients to pending (e.g. on pause)."""
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "UPDATE campaign_recipients SET status = ? WHERE campaign_id = ? AND seq = ? AND status = ?",
+                [(PENDING, campaign_id, seq, SENDING) for seq in seqs],
+            )
+
+    def take_send(self, provider, per_minute, burst_sec=1):
+        """
+        Token bucket of `provider`'s sending rate, kept in the database so all
+        campaigns in all worker processes share it. Takes one send and
+        returns 0, or returns the seconds until one is available.
+        """
+        rate = per_minute / 60.0
+        capacity = max(1.0, rate * burst_sec)
+        now = time.time()
+
+        conn = self._immediate()
+        try:
+            row = conn.execute("SELECT level, updated_at FROM send_quota WHERE provider = ?", (provider,)).fetchone()
+            level = capacity if row is None else min(capacity, row["level"] + (now - row["updated_at"]) * rate)
+            wait = 0.0 if level >= 1 else (1 - level) / rate
+            if not wait:
+                level -= 1
+            conn.execute(
+                "INSERT OR REPLACE INTO send_quota (provider, level, updated_at) VALUES (?, ?, ?)",
+                (provider, level, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def checkpoint(self, campaign_id, runner_id, results, max_attempts, retry_sec):
+        """
+        Records send results [(seq, attempts, error or None)] and renews the
+        lease. Returns the campaign status, or None if this runner no longer
+        holds the campaign.
+        """
+        now = time.time()
+        updates = []
+        for seq, attempts, error in results:
+            if error is None:
+                updates.append((SENT, attempts, now, None, now, campaign_id, seq))
+            elif attempts < max_attempts:
+                updates.append((RETRY, attempts, now + retry_sec * 2 ** (attempts - 1), error, now, campaign_id, seq))
+            else:
+                updates.append((FAILED, attempts, now, error, now, campaign_id, seq))
+
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                """UPDATE campaign_recipients SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?,
+                                                  updated_at = ?
+                   WHERE campaign_id = ? AND seq = ?""",
+                updates,
+            )
+            conn.execute(
+                "UPDATE campaigns SET heartbeat_at = ?, updated_at = ? WHERE id = ? AND runner_id = ?",
+                (now, now, campaign_id, runner_id),
+            )
+            row = conn.execute(
+                "SELECT status, runner_id FROM campaigns WHERE id = ?", (campaign_id,)
+            ).fetchone()
+        return row["status"] if row and row["runner_id"] == runner_id else None
+
+    def next_retry_at(self, campaign_id):
+        row = self._conn().execute(
+            "SELECT MIN(next_attempt_at) FROM campaign_recipients WHERE campaign_id = ? AND status = ?",
+            (campaign_id, RETRY),
+        ).fetchone()
+        return row[0]
+
+    def finish(self, campaign_id, runner_id):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """UPDATE campaigns SET status = ?, runner_id = NULL, finished_at = ?, updated_at = ?
+                   WHERE id = ? AND runner_id = ? AND status = ?""",
+                (CAMPAIGN_COMPLETED, now, now, campaign_id, runner_id, CAMPAIGN_RUNNING),
+            )
+
+    def release_lease(self, campaign_id, runner_id):
+        """Lets another process resume the campaign right away (graceful shutdown)."""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE campaigns SET runner_id = NULL, heartbeat_at = NULL WHERE id = ? AND runner_id = ?",
+                (campaign_id, runner_id),
+            )
+
+
+# ---------- Runner ----------
+class CampaignRunner:
+    """
+    Sends campaigns on the event loop: recipients are read from the store in
+    small batches, rendered from the precompiled templates just before their
+    send, and sent with at most `concurrency` in flight. All campaigns that
+    send through `provider` (in every process) share its `sends_per_minute`.
+    Results are checkpointed every `checkpoint_every` sends (and at least
+    once a second).
+    """
+
+    def __init__(self, store, send_fn=send_email_async, concurrency=8, sends_per_minute=60,
+                 max_attempts=3, retry_sec=60, lease_sec=30, checkpoint_every=50, provider="mail"):
+        self.store = store
+        self.send_fn = send_fn
+        self.concurrency = concurrency
+        self.sends_per_minute = sends_per_minute
+        self.provider = provider
+        self.max_attempts = max_attempts
+        self.retry_sec = retry_sec
+        self.lease_sec = lease_sec
+        self.checkpoint_every = checkpoint_every
+        self.runner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks = {}
+
+    async def start(self, campaign_id):
+        """Claims and starts the campaign in the background; False if it is not claimable."""
+        task = self._tasks.get(campaign_id)
+        if task is not None and not task.done():
+            return True
+
+        if not await run_io(self.store.claim, campaign_id, self.runner_id, self.lease_sec):
+            return False
+
+        self._tasks[campaign_id] = asyncio.create_task(self._run(campaign_id))
+        return True
+
+    async def pause(self, campaign_id):
+        """Stops scheduling sends; the runner (in any process) notices at its next checkpoint."""
+        return await run_io(self.store.set_status, campaign_id, CAMPAIGN_PAUSED)
+
+    async def resume_interrupted(self):
+        for campaign_id in await run_io(self.store.interrupted, self.lease_sec):
+            if await self.start(campaign_id):
+                logger.info("Resuming interrupted campaign %s", campaign_id)
+
+    async def stop_all(self, timeout=10):
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+    async def _send_wait(self):
+        """Seconds until the next send may start; 0 means it may start now (and was counted)."""
+        # Both transports short-circuited: wait rather than burn attempts
+        if not transports_available():
+            return 1.0
+        if self.sends_per_minute <= 0:
+            return 0.0
+        return await run_io(self.store.take_send, self.provider, self.sends_per_minute)
+
+    async def _send_one(self, recipient, subject_template, body_template, attachment_path):
+        fields = json.loads(recipient["fields"])
+        with stage("campaign_render"):
+            subject = subject_template.render(fields)
+            body = body_template.render(fields)
+
+        try:
+            ok = await self.send_fn(
+                recipient_email=recipient["email"],
+                subject=subject,
+                body=body,
+                attachment_path=attachment_path,
+            )
+            error = None if ok else "All transports failed"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        campaign_sends.inc("sent" if error is None else "failed")
+        return recipient["seq"], recipient["attempts"] + 1, error
+
+    async def _run(self, campaign_id):
+        campaign = await run_io(self.store.campaign, campaign_id)
+        subject_template = Template(campaign["subject_template"])
+        body_template = Template(campaign["body_template"], escape=True)
+        attachment_path = campaign["attachment_path"]
+
+        slots = asyncio.Semaphore(self.concurrency)
+        in_flight = set()
+        results = []
+        claimed = []
+        last_checkpoint = time.monotonic()
+        status = CAMPAIGN_RUNNING
+
+        async def checkpoint():
+            nonlocal results, last_checkpoint
+            batch, results = results, []
+            last_checkpoint = time.monotonic()
+            return await run_io(
+                self.store.checkpoint, campaign_id, self.runner_id, batch, self.max_attempts, self.retry_sec
+            )
+
+        def collect(task):
+            in_flight.discard(task)
+            slots.release()
+            if not task.cancelled():
+                results.append(task.result())
+
+        try:
+            while status == CAMPAIGN_RUNNING:
+                claimed = await run_io(self.store.take_batch, campaign_id, self.concurrency * 2)
+
+                if not claimed:
+                    if in_flight:
+                        await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                        status = await checkpoint()
+                        continue
+
+                    status = await checkpoint()
+                    retry_at = await run_io(self.store.next_retry_at, campaign_id)
+                    if retry_at is None:
+                        break
+                    await asyncio.sleep(min(max(0.0, retry_at - time.time()), self.lease_sec / 3))
+                    continue
+
+                while claimed and status == CAMPAIGN_RUNNING:
+                    wait = await self._send_wait()
+                    if wait > 0:
+                        await asyncio.sleep(min(wait, self.lease_sec / 3))
+                        # A breaker outage can outlast the lease: keep renewing it
+                        if time.monotonic() - last_checkpoint >= self.lease_sec / 3:
+                            status = await checkpoint()
+                        continue
+
+                    await slots.acquire()
+                    recipient = claimed.pop(0)
+                    task = asyncio.create_task(
+                        self._send_one(recipient, subject_template, body_template, attachment_path)
+                    )
+                    in_flight.add(task)
+                    task.add_done_callback(collect)
+
+                    if len(results) >= self.checkpoint_every or time.monotonic() - last_checkpoint >= 1:
+                        status = await checkpoint()
+
+            if in_flight:
+                await asyncio.wait(in_flight)
+            status = await checkpoint()
+            if claimed:
+                await run_io(self.store.release, campaign_id, [r["seq"] for r in claimed])
+
+            if status == CAMPAIGN_RUNNING:
+                await run_io(self.store.finish, campaign_id, self.runner_id)
+                logger.info("Campaign %s completed", campaign_id)
+            else:
+                logger.info("Campaign %s stopped (%s)", campaign_id, status or "lease lost")
+        except asyncio.CancelledError:
+            # Shutdown: let in-flight sends land, record them, hand the campaign back
+            if in_flight:
+                await asyncio.wait(in_flight, timeout=self.lease_sec / 3)
+            await run_io(self.store.checkpoint, campaign_id, self.runner_id, results,
+                         self.max_attempts, self.retry_sec)
+            await run_io(self.store.release, campaign_id, [r["seq"] for r in claimed])
+            await run_io(self.store.release_lease, campaign_id, self.runner_id)
+            raise
+        except Exception:
+            logger.exception("Campaign %s runner failed", campaign_id)
+            raise
+        finally:
+            self._tasks.pop(campaign_id, None)
+
+    def stats(self):
+        return {
+            "runner_id": self.runner_id,
+            # list() snapshots the loop-owned dict: /stats reads it from a pool thread
+            "active": sorted(cid for cid, task in list(self._tasks.items()) if not task.done()),
+        }
+
+
+campaign_store = CampaignStore(CAMPAIGN_DB_PATH)
+campaign_runner = CampaignRunner(
+    campaign_store,
+    concurrency=CAMPAIGN_CONCURRENCY,
+    sends_per_minute=CAMPAIGN_SENDS_PER_MINUTE,
+    max_attempts=CAMPAIGN_MAX_ATTEMPTS,
+    retry_sec=CAMPAIGN_RETRY_SECONDS,
+    lease_sec=CAMPAIGN_LEASE_SECONDS,
+    provider=SENDER_EMAIL or "mail",
+)
@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Per-dependency circuit breaker.
+
+    CLOSED: calls go through; `failure_threshold` consecutive failures open it.
+    OPEN: calls are short-circuited until `recovery_seconds` have passed.
+    HALF_OPEN: up to `half_open_probes` calls are let through; a success
+    closes the breaker, a failure opens it again.
+
+    It also keeps an exponentially weighted moving average of call latency
+    so callers can route around a dependency that is up but slow, and
+    latency_probe_due() tells them when that average is too old to trust.
+    """
+
+    def __init__(self, name, failure_threshold=3, recovery_seconds=30, half_open_probes=1,
+                 latency_alpha=0.2, history=20, on_transition=None, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.half_open_probes = half_open_probes
+        self.latency_alpha = latency_alpha
+        self.on_transition = on_transition
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._transitions = deque(maxlen=history)
+        self.consecutive_failures = 0
+        self.latency_ewma = None
+        self._latency_at = None
+        self.successes = 0
+        self.failures = 0
+        self.short_circuited = 0
+
+    def _transition(self, new_state, reason):
+        # Caller must hold self._lock
+        old_state, self._state = self._state, new_state
+        if new_state == OPEN:
+            self._opened_at = self._clock()
+        if new_state != HALF_OPEN:
+            self._probes = 0
+        self._transitions.append({
+            "from": old_state,
+            "to": new_state,
+            "reason": reason,
+            "at": time.time(),
+        })
+        return old_state
+
+    def _notify(self, old_state, new_state, reason):
+        if self.on_transition is not None and old_state != new_state:
+            self.on_transition(self.name, old_state, new_state, reason)
+
+    def _maybe_half_open(self):
+        # Caller must hold self._lock
+        if self._state == OPEN and self._clock() - self._opened_at >= self.recovery_seconds:
+            return self._transition(HALF_OPEN, "recovery timeout elapsed")
+        return None
+
+    @property
+    def state(self):
+        with self._lock:
+            old_state = self._maybe_half_open()
+            state = self._state
+        if old_state is not None:
+            self._notify(old_state, HALF_OPEN, "recovery timeout elapsed")
+        return state
+
+    def available(self):
+        """True if a call would currently be admitted (does not reserve a probe)."""
+        state = self.state
+        if state == HALF_OPEN:
+            with self._lock:
+                return self._probes < self.half_open_probes
+        return state == CLOSED
+
+    def try_acquire(self):
+        """Admits one call, reserving a probe slot when half-open."""
+        notify = None
+        with self._lock:
+            old_state = self._maybe_half_open()
+            if old_state is not None:
+                notify = (old_state, HALF_OPEN, "recovery timeout elapsed")
+
+            if self._state == CLOSED:
+                admitted = True
+            elif self._state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                admitted = True
+            else:
+                self.short_circuited += 1
+                admitted = False
+
+        if notify:
+            self._notify(*notify)
+        return admitted
+
+    def release(self):
+        """
+        Returns the probe slot try_acquire reserved, for a call that ended
+        without an outcome (cancelled, or never got to the dependency).
+        Without it a half-open breaker would wait for that probe forever.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def _observe_latency(self, seconds):
+        # Caller must hold self._lock
+        if seconds is None:
+            return
+        if self.latency_ewma is None:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma += self.latency_alpha * (seconds - self.latency_ewma)
+        self._latency_at = self._clock()
+
+    def latency_probe_due(self, max_age):
+        """
+        True for one caller once the latency average is `max_age` seconds old,
+        so a dependency routed around for being slow gets a call now and then
+        to measure it again. The next one is due `max_age` seconds later.
+        """
+        with self._lock:
+            now = self._clock()
+            if self._latency_at is None or now - self._latency_at < max_age:
+                return False
+            self._latency_at = now
+            return True
+
+    def record_success(self, seconds=None):
+        notify = None
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self._observe_latency(seconds)
+            if self._state != CLOSED:
+                notify = (self._transition(CLOSED, "probe succeeded"), CLOSED, "probe succeeded")
+        if notify:
+            self._notify(*notify)
+
+    def record_failure(self, seconds=None, trip=False, reason="failure threshold reached"):
+        """
+        Counts a failed call. trip=True opens the breaker immediately, for
+        failures that will not go away on retry (e.g. missing credentials).
+        """
+        notify = None
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self._observe_latency(seconds)
+
+            if self._state == HALF_OPEN:
+                reason = "probe failed"
+            elif not trip and self.consecutive_failures < self.failure_threshold:
+                reason = None
+
+            if reason is not None and self._state != OPEN:
+                notify = (self._transition(OPEN, reason), OPEN, reason)
+            elif reason is not None:
+                # Already open (e.g. a call admitted before it opened): restart the timer
+                self._opened_at = self._clock()
+        if notify:
+            self._notify(*notify)
+
+    def stats(self):
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "state_code": STATE_CODES[state],
+                "consecutive_failures": self.consecutive_failures,
+                "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+                "successes": self.successes,
+                "failures": self.failures,
+                "short_circuited": self.short_circuited,
+                "retry_in_seconds": (
+                    round(max(0.0, self.recovery_seconds - (self._clock() - self._opened_at)), 1)
+                    if state == OPEN else 0
+                ),
+                "transitions": list(self._transitions),
+            }
@@ -0,0 +1,251 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _get_int(name, default):
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return int(value)
+
+
+def _get_float(name, default):
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return float(value)
+
+
+def _get_bool(name, default):
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# ---------- Shared State (multi-worker) ----------
+# SQLite file (WAL mode) holding the caches shared by all API worker
+# processes: parsed resumes, attachment MIME parts and, unless LLM_CACHE_DB
+# says otherwise, Gemini responses. Leave empty for per-process caches.
+SHARED_CACHE_DB = os.getenv("SHARED_CACHE_DB") or None
+# Rows kept per cache (oldest evicted first) and how long they live.
+SHARED_CACHE_MAX_ROWS = _get_int("SHARED_CACHE_MAX_ROWS", 5000)
+SHARED_CACHE_TTL_SECONDS = _get_int("SHARED_CACHE_TTL_SECONDS", 7 * 24 * 60 * 60)
+# serve.py: bind address and worker processes (0 = one per CPU core).
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = _get_int("API_PORT", 8000)
+API_WORKERS = _get_int("API_WORKERS", 0)
+
+# ---------- Resume Parse Cache ----------
+# Max number of parsed resumes kept in memory (LRU).
+RESUME_CACHE_SIZE = _get_int("RESUME_CACHE_SIZE", 128)
+# Directory for the on-disk tier. Leave empty to keep the cache in memory only.
+RESUME_CACHE_DIR = os.getenv("RESUME_CACHE_DIR") or None
+
+# ---------- PDF Extraction ----------
+# Text backend: "pdfplumber" (default) or "pypdfium2" (much faster, optional install).
+PDF_BACKEND = os.getenv("PDF_BACKEND", "pdfplumber").strip().lower()
+# Stop after this many pages (0 = no limit). Resumes rarely need more than a few.
+PDF_MAX_PAGES = _get_int("PDF_MAX_PAGES", 0)
+# PDFs with at least this many pages are split across the CPU pool by page range.
+PDF_PARALLEL_MIN_PAGES = _get_int("PDF_PARALLEL_MIN_PAGES", 8)
+
+# ---------- Execution Pools ----------
+# Thread pool for blocking I/O (Gemini, Gmail API, SMTP).
+IO_POOL_WORKERS = _get_int("IO_POOL_WORKERS", 16)
+# Max I/O jobs allowed in flight (running + queued) before returning 503.
+IO_POOL_MAX_PENDING = _get_int("IO_POOL_MAX_PENDING", 64)
+# Process pool for CPU-bound work (PDF parsing).
+CPU_POOL_WORKERS = _get_int("CPU_POOL_WORKERS", min(4, os.cpu_count() or 1))
+CPU_POOL_MAX_PENDING = _get_int("CPU_POOL_MAX_PENDING", 16)
+
+# ---------- Gmail OAuth ----------
+# Refresh the cached access token this many seconds before it expires.
+GMAIL_REFRESH_MARGIN_SECONDS = _get_int("GMAIL_REFRESH_MARGIN_SECONDS", 300)
+# "interactive" (desktop: a missing token opens the browser login) or "server"
+# (requests never start the login flow; provision with `python gmail_auth.py provision`).
+GMAIL_AUTH_MODE = os.getenv("GMAIL_AUTH_MODE", "interactive").strip().lower()
+GMAIL_TOKEN_PATH = os.getenv("GMAIL_TOKEN_PATH", "token.json")
+GMAIL_CREDENTIALS_PATH = os.getenv("GMAIL_CREDENTIALS_PATH", "credentials.json")
+# Port of the local redirect listener used by the browser login flow.
+GMAIL_OAUTH_PORT = _get_int("GMAIL_OAUTH_PORT", 8080)
+# How often the server-mode background task checks the token for expiry.
+GMAIL_REFRESH_INTERVAL_SECONDS = _get_int("GMAIL_REFRESH_INTERVAL_SECONDS", 60)
+# Shared secret for the /admin endpoints (X-Admin-Token header). Unset = disabled.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or None
+
+# ---------- SMTP Fallback ----------
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = _get_int("SMTP_PORT", 465)
+# Set to false for a plain (non-TLS) server such as a local test stand-in.
+SMTP_USE_SSL = _get_bool("SMTP_USE_SSL", True)
+SMTP_TIMEOUT_SECONDS = _get_int("SMTP_TIMEOUT_SECONDS", 30)
+# Max authenticated connections kept open to the SMTP server.
+SMTP_POOL_SIZE = _get_int("SMTP_POOL_SIZE", 4)
+# Idle connections older than this are closed instead of reused.
+SMTP_IDLE_TIMEOUT_SECONDS = _get_int("SMTP_IDLE_TIMEOUT_SECONDS", 60)
+# Connections idle longer than this are probed with NOOP before reuse.
+SMTP_HEALTHCHECK_AFTER_SECONDS = _get_int("SMTP_HEALTHCHECK_AFTER_SECONDS", 5)
+
+# ---------- Outbound Mail Queue ----------
+MAIL_QUEUE_PATH = os.getenv("MAIL_QUEUE_PATH", "mail_queue.db")
+# Directory where attachments of queued mails are stored (content-addressed).
+MAIL_QUEUE_ATTACHMENT_DIR = os.getenv("MAIL_QUEUE_ATTACHMENT_DIR", "mail_queue_attachments")
+MAIL_QUEUE_WORKERS = _get_int("MAIL_QUEUE_WORKERS", 4)
+# Attempts before a job is moved to the dead-letter table.
+MAIL_QUEUE_MAX_ATTEMPTS = _get_int("MAIL_QUEUE_MAX_ATTEMPTS", 5)
+# Retry delay is BACKOFF * 2^(attempt - 1), capped at BACKOFF_MAX.
+MAIL_QUEUE_BACKOFF_SECONDS = _get_int("MAIL_QUEUE_BACKOFF_SECONDS", 2)
+MAIL_QUEUE_BACKOFF_MAX_SECONDS = _get_int("MAIL_QUEUE_BACKOFF_MAX_SECONDS", 300)
+# Stored attachments no unfinished job uses are deleted once they are older
+# than this.
+MAIL_QUEUE_ATTACHMENT_GRACE_SECONDS = _get_int("MAIL_QUEUE_ATTACHMENT_GRACE_SECONDS", 3600)
+# Sent and dead jobs are deleted this long after they finished, so the jobs
+# table (and the counts behind /stats) stays bounded. Dead letters are kept.
+MAIL_QUEUE_RETENTION_SECONDS = _get_int("MAIL_QUEUE_RETENTION_SECONDS", 7 * 24 * 3600)
+# A job left in "sending" whose process has not renewed its lease for this
+# long (crashed or killed) is put back in the queue.
+MAIL_QUEUE_LEASE_SECONDS = _get_int("MAIL_QUEUE_LEASE_SECONDS", 30)
+
+# Max concurrent sends per transport, shared by the API and queue workers.
+MAIL_OAUTH_CONCURRENCY = _get_int("MAIL_OAUTH_CONCURRENCY", 4)
+MAIL_SMTP_CONCURRENCY = _get_int("MAIL_SMTP_CONCURRENCY", SMTP_POOL_SIZE)
+
+# Per-transport circuit breakers: consecutive failures before a transport is
+# skipped, and how long it is skipped before a single probe send is allowed.
+MAIL_BREAKER_FAILURE_THRESHOLD = _get_int("MAIL_BREAKER_FAILURE_THRESHOLD", 3)
+MAIL_BREAKER_RECOVERY_SECONDS = _get_int("MAIL_BREAKER_RECOVERY_SECONDS", 30)
+# If the Gmail API's average send latency exceeds this (and SMTP is faster or
+# untried), SMTP is tried first.
+MAIL_SLOW_SEND_SECONDS = _get_float("MAIL_SLOW_SEND_SECONDS", 10.0)
+# While SMTP goes first, one send per interval tries the Gmail API first again
+# to refresh its average (it would otherwise never recover).
+MAIL_LATENCY_REPROBE_SECONDS = _get_int("MAIL_LATENCY_REPROBE_SECONDS", 60)
+
+# ---------- Async Transports ----------
+# API sends run on the event loop (aiosmtplib, and httpx for the Gmail API)
+# instead of holding a thread each. Either transport falls back to its
+# threaded client (with a warning at startup) if its package is not installed.
+# Queue workers stay threaded.
+MAIL_ASYNC_TRANSPORTS = _get_bool("MAIL_ASYNC_TRANSPORTS", True)
+GMAIL_API_URL = os.getenv("GMAIL_API_URL", "https://gmail.googleapis.com")
+# Pooled Gmail API connections on the event loop; concurrent sends are capped
+# by MAIL_OAUTH_CONCURRENCY, shared with the threaded senders.
+GMAIL_ASYNC_MAX_CONNECTIONS = _get_int("GMAIL_ASYNC_MAX_CONNECTIONS", 20)
+
+# ---------- Campaigns ----------
+CAMPAIGN_DB_PATH = os.getenv("CAMPAIGN_DB_PATH", "campaigns.db")
+# Max contacts per campaign upload.
+CAMPAIGN_MAX_CONTACTS = _get_int("CAMPAIGN_MAX_CONTACTS", 10000)
+# Sends in flight per running campaign.
+CAMPAIGN_CONCURRENCY = _get_int("CAMPAIGN_CONCURRENCY", 8)
+# Sends per minute through the sender account, shared by all campaigns in all
+# worker processes, to stay under the provider's sending limits
+# (0 = unthrottled).
+CAMPAIGN_SENDS_PER_MINUTE = _get_int("CAMPAIGN_SENDS_PER_MINUTE", 60)
+# Attempts per recipient; retry delay is RETRY * 2^(attempt - 1).
+CAMPAIGN_MAX_ATTEMPTS = _get_int("CAMPAIGN_MAX_ATTEMPTS", 3)
+CAMPAIGN_RETRY_SECONDS = _get_int("CAMPAIGN_RETRY_SECONDS", 60)
+# A running campaign whose runner has not checkpointed for this long is
+# considered interrupted and may be resumed by another worker.
+CAMPAIGN_LEASE_SECONDS = _get_int("CAMPAIGN_LEASE_SECONDS", 30)
+
+# ---------- Batch Generation ----------
+# Max JDs accepted by /generate-email/batch and how many run concurrently.
+GENERATE_BATCH_MAX_ITEMS = _get_int("GENERATE_BATCH_MAX_ITEMS", 100)
+GENERATE_BATCH_CONCURRENCY = _get_int("GENERATE_BATCH_CONCURRENCY", 8)
+
+# ---------- LLM Response Cache ----------
+LLM_CACHE_SIZE = _get_int("LLM_CACHE_SIZE", 256)
+LLM_CACHE_TTL_SECONDS = _get_int("LLM_CACHE_TTL_SECONDS", 24 * 60 * 60)
+# SQLite file for the persistent tier (defaults to SHARED_CACHE_DB). Leave both
+# empty to keep the cache in memory only.
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB") or SHARED_CACHE_DB
+LLM_CACHE_DB_MAX_ROWS = _get_int("LLM_CACHE_DB_MAX_ROWS", 10000)
+
+# ---------- Gemini Models ----------
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+# Per-endpoint overrides. Unset temperature / max tokens use the model defaults.
+GENERATE_MODEL = os.getenv("GENERATE_MODEL", GEMINI_MODEL)
+GENERATE_TEMPERATURE = _get_float("GENERATE_TEMPERATURE", None)
+GENERATE_MAX_OUTPUT_TOKENS = _get_int("GENERATE_MAX_OUTPUT_TOKENS", None)
+REGENERATE_MODEL = os.getenv("REGENERATE_MODEL", GEMINI_MODEL)
+REGENERATE_TEMPERATURE = _get_float("REGENERATE_TEMPERATURE", None)
+REGENERATE_MAX_OUTPUT_TOKENS = _get_int("REGENERATE_MAX_OUTPUT_TOKENS", None)
+# On startup, open the connection to Gemini with a free count_tokens call.
+GEMINI_WARMUP_PING = _get_bool("GEMINI_WARMUP_PING", True)
+
+# ---------- Gemini Quota ----------
+# Client-side budget in front of every Gemini call; set to the project's
+# quota (0 = unlimited). Calls over budget queue instead of failing.
+GEMINI_REQUESTS_PER_MINUTE = _get_int("GEMINI_REQUESTS_PER_MINUTE", 60)
+GEMINI_TOKENS_PER_MINUTE = _get_int("GEMINI_TOKENS_PER_MINUTE", 250000)
+# Burst allowance: each bucket holds this many seconds' worth of quota.
+GEMINI_BURST_SECONDS = _get_float("GEMINI_BURST_SECONDS", 10)
+# Tokens reserved for the response when the model has no max_output_tokens;
+# corrected from the reported usage once the call finishes.
+GEMINI_OUTPUT_TOKEN_ESTIMATE = _get_int("GEMINI_OUTPUT_TOKEN_ESTIMATE", 1024)
+# Max seconds a call waits for quota before the request fails with 429.
+GEMINI_QUEUE_TIMEOUT_SECONDS = _get_float("GEMINI_QUEUE_TIMEOUT_SECONDS", 60)
+# Retries for 429 / 5xx responses, with full-jitter exponential backoff.
+GEMINI_MAX_RETRIES = _get_int("GEMINI_MAX_RETRIES", 3)
+GEMINI_RETRY_BASE_SECONDS = _get_float("GEMINI_RETRY_BASE_SECONDS", 1.0)
+GEMINI_RETRY_MAX_SECONDS = _get_float("GEMINI_RETRY_MAX_SECONDS", 20.0)
+
+# ---------- Prompt Budgeting ----------
+# Condense resume/JD text before it is pasted into Gemini prompts.
+PROMPT_CONDENSE_ENABLED = _get_bool("PROMPT_CONDENSE_ENABLED", True)
+# Estimated-token budget per prompt section (see prompt_prep.estimate_tokens).
+# Only context is condensed; the body a regenerate rewrites is sent whole.
+PROMPT_RESUME_TOKEN_BUDGET = _get_int("PROMPT_RESUME_TOKEN_BUDGET", 900)
+PROMPT_JD_TOKEN_BUDGET = _get_int("PROMPT_JD_TOKEN_BUDGET", 800)
+# Condensed resumes kept in memory, keyed by hash of the resume text.
+PROMPT_CONDENSE_CACHE_SIZE = _get_int("PROMPT_CONDENSE_CACHE_SIZE", 128)
+
+# ---------- Speculative Regenerate ----------
+# After a draft is generated, regenerate it in the background with the
+# instructions users most often pick next, so a matching /regenerate-body is
+# answered from memory. Off by default: it spends Gemini quota on variants
+# that may never be asked for.
+REGENERATE_SPECULATION_ENABLED = _get_bool("REGENERATE_SPECULATION_ENABLED", False)
+# Instructions to precompute, separated by "|" (matched ignoring case,
+# surrounding whitespace and trailing punctuation).
+REGENERATE_SPECULATIVE_INSTRUCTIONS = [
+    instruction.strip()
+    for instruction in os.getenv(
+        "REGENERATE_SPECULATIVE_INSTRUCTIONS",
+        "Make it shorter|Make it more formal|Emphasize my technical skills",
+    ).split("|")
+    if instruction.strip()
+]
+# How long a draft's variants are kept, and how many drafts at most.
+REGENERATE_SPECULATION_TTL_SECONDS = _get_int("REGENERATE_SPECULATION_TTL_SECONDS", 15 * 60)
+REGENERATE_SPECULATION_MAX_SESSIONS = _get_int("REGENERATE_SPECULATION_MAX_SESSIONS", 500)
+# Speculative Gemini calls in flight at once (each holds an I/O thread).
+REGENERATE_SPECULATION_CONCURRENCY = _get_int("REGENERATE_SPECULATION_CONCURRENCY", 2)
+# Spend cap: estimated Gemini tokens (prompt + output) per hour; 0 = no cap.
+REGENERATE_SPECULATION_TOKENS_PER_HOUR = _get_int("REGENERATE_SPECULATION_TOKENS_PER_HOUR", 200000)
+
+# ---------- JD Analyzer ----------
+# Find recipient, CC and subject in the JD locally; Gemini then only writes
+# the body, unless the JD is ambiguous (see jd_analyzer).
+JD_ANALYZER_ENABLED = _get_bool("JD_ANALYZER_ENABLED", True)
+
+# ---------- Resume Store ----------
+# Content-addressed storage for resumes uploaded once via POST /resumes.
+RESUME_STORE_DIR = os.getenv("RESUME_STORE_DIR", "resume_store")
+
+# ---------- Uploads ----------
+# Largest attachment Gmail accepts; uploads above this are rejected with 413.
+MAX_ATTACHMENT_SIZE = 25 * 1024 * 1024
+# Slack on top of MAX_ATTACHMENT_SIZE for the other multipart form fields.
+MAX_REQUEST_OVERHEAD = _get_int("MAX_REQUEST_OVERHEAD", 2 * 1024 * 1024)
+
+# ---------- Logging ----------
+# Root log level for the API process.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").strip().upper()
+# Level for per-request ("hotpath.*") logs: bodies, attachment details and
+# per-send progress. DEBUG shows everything, WARNING keeps only failures.
+HOT_PATH_LOG_LEVEL = os.getenv("HOT_PATH_LOG_LEVEL", "WARNING").strip().upper()
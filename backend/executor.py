@@ -0,0 +1,167 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from config import (
+    IO_POOL_WORKERS,
+    IO_POOL_MAX_PENDING,
+    CPU_POOL_WORKERS,
+    CPU_POOL_MAX_PENDING,
+)
+
+
+class PoolSaturated(Exception):
+    """Raised when a pool already has max_pending jobs in flight."""
+
+    def __init__(self, pool_name):
+        super().__init__(f"{pool_name} pool is saturated")
+        self.pool_name = pool_name
+
+
+class BoundedPool:
+    """
+    Wraps a concurrent.futures executor with an admission limit so callers get
+    an immediate PoolSaturated instead of an unbounded queue.
+    """
+
+    def __init__(self, name, executor_factory, workers, max_pending, copy_context=False):
+        self.name = name
+        # Thread pools can run calls in a copy of the caller's contextvars
+        # (request tracing); process pools can't pickle a Context
+        self.copy_context = copy_context
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor_factory = executor_factory
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        # Pools are created lazily so importing the module never forks/spawns
+        if self._executor is None:
+            self._executor = self._executor_factory(max_workers=self.workers)
+        return self._executor
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolSaturated(self.name)
+            self._pending += 1
+            return self._get_executor()
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Admits the call immediately (raising PoolSaturated if full) and returns
+        an asyncio future. The slot is released when the call itself finishes.
+        """
+        executor = self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            call = functools.partial(fn, *args, **kwargs)
+            if self.copy_context:
+                call = functools.partial(contextvars.copy_context().run, call)
+            future = loop.run_in_executor(executor, call)
+        except Exception:
+            self._release()
+            raise
+
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        return await self.submit(fn, *args, **kwargs)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "in_flight": self._pending,
+                "queue_depth": max(0, self._pending - self.workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+io_pool = BoundedPool(
+    "io",
+    functools.partial(ThreadPoolExecutor, thread_name_prefix="io"),
+    IO_POOL_WORKERS,
+    IO_POOL_MAX_PENDING,
+    copy_context=True,
+)
+cpu_pool = BoundedPool("cpu", ProcessPoolExecutor, CPU_POOL_WORKERS, CPU_POOL_MAX_PENDING)
+
+
+async def run_io(fn, *args, **kwargs):
+    """Runs a blocking I/O call on the thread pool."""
+    return await io_pool.run(fn, *args, **kwargs)
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """Runs a CPU-bound, picklable callable on the process pool."""
+    return await cpu_pool.run(fn, *args, **kwargs)
+
+
+async def iterate_io(gen_fn, *args, **kwargs):
+    """
+    Drives a blocking generator on the thread pool and yields its items on the
+    event loop as they are produced. Holds one I/O slot for the whole run.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+    cancelled = threading.Event()
+
+    def produce():
+        try:
+            for item in gen_fn(*args, **kwargs):
+                if cancelled.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, (done, e))
+            return
+        loop.call_soon_threadsafe(queue.put_nowait, (done, None))
+
+    producer = io_pool.submit(produce)
+
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                break
+            yield item
+        await producer
+    finally:
+        cancelled.set()
+
+
+def shutdown_pools():
+    io_pool.shutdown()
+    cpu_pool.shutdown()
+
+
+def pool_stats():
+    return {
+        "io": io_pool.stats(),
+        "cpu": cpu_pool.stats(),
+    }
@@ -1,19 +1,220 @@
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv
+import itertools
 import json
+import logging
+import re
+import time
 
-load_dotenv()
+from google.api_core import exceptions as google_exceptions
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+from llm_cache import llm_cache, prompt_key
+from model_registry import get_model, get_spec
+from prompt_prep import condense_resume, condense_jd, estimate_tokens
+from body_format import lines_to_br
+from jd_analyzer import analyze_jd, HEADER_FIELDS
+from metrics import stage, record_stage, timed_stage, gemini_queue_wait, gemini_retries
+from rate_limiter import QuotaScheduler, INTERACTIVE, PRIORITY_NAMES, backoff_delay
+from config import (
+    GEMINI_REQUESTS_PER_MINUTE,
+    GEMINI_TOKENS_PER_MINUTE,
+    GEMINI_BURST_SECONDS,
+    GEMINI_OUTPUT_TOKEN_ESTIMATE,
+    GEMINI_QUEUE_TIMEOUT_SECONDS,
+    GEMINI_MAX_RETRIES,
+    GEMINI_RETRY_BASE_SECONDS,
+    GEMINI_RETRY_MAX_SECONDS,
+    JD_ANALYZER_ENABLED,
+)
 
-def generate_mail_dict(jd_text, resume_text=None, resume_links=None):
+logger = logging.getLogger(f"hotpath.{__name__}")
+
+RATE_LIMITED = (google_exceptions.TooManyRequests, google_exceptions.ResourceExhausted)
+SERVER_ERRORS = (
+    google_exceptions.InternalServerError,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+)
+
+
+def _record_queue_wait(priority, waited):
+    gemini_queue_wait.observe(waited, PRIORITY_NAMES.get(priority, str(priority)))
+    if waited >= 0.001:
+        record_stage("gemini_queue", waited)
+
+
+gemini_quota = QuotaScheduler(
+    "gemini",
+    requests_per_minute=GEMINI_REQUESTS_PER_MINUTE,
+    tokens_per_minute=GEMINI_TOKENS_PER_MINUTE,
+    burst_seconds=GEMINI_BURST_SECONDS,
+    timeout=GEMINI_QUEUE_TIMEOUT_SECONDS,
+    on_wait=_record_queue_wait,
+)
+
+
+def _reserved_tokens(prompt, spec):
+    return estimate_tokens(prompt) + (spec.generation_config.get("max_output_tokens") or GEMINI_OUTPUT_TOKEN_ESTIMATE)
+
+
+def _usage_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) or None
+
+
+def call_gemini(call, reserved, priority=INTERACTIVE):
     """
-    Generates structured email data (recipient, subject, body)
-    based on JD and optional resume.
+    Runs call() once quota for one request and `reserved` tokens is free,
+    retrying 429 and 5xx responses with jittered backoff. Every attempt
+    queues for its own quota; a 429 also pauses the other queued calls.
+    """
+    for attempt in itertools.count():
+        gemini_quota.acquire(reserved, priority)
+        try:
+            return call()
+        except RATE_LIMITED:
+            gemini_quota.throttle()
+            reason = "rate_limited"
+            if attempt >= GEMINI_MAX_RETRIES:
+                raise
+        except SERVER_ERRORS:
+            reason = "server_error"
+            if attempt >= GEMINI_MAX_RETRIES:
+                raise
+
+        # The rejected call consumed no tokens
+        gemini_quota.settle(reserved, 0)
+        gemini_retries.inc(reason)
+        delay = backoff_delay(attempt, GEMINI_RETRY_BASE_SECONDS, GEMINI_RETRY_MAX_SECONDS)
+        logger.warning("Gemini call failed (%s), retry %d in %.1fs", reason, attempt + 1, delay)
+        time.sleep(delay)
+
+# A complete `"key": "string"` or `"key": null` pair inside partial JSON
+_JSON_FIELD = re.compile(r'"(?P<key>[A-Za-z_]+)"\s*:\s*(?:null|"(?P<value>(?:[^"\\]|\\.)*)")')
+
+
+class PartialJsonFields:
+    """
+    Incrementally scans streamed JSON text and reports top-level string fields
+    once their closing quote has arrived, so they can be shown before the
+    whole object is done.
     """
 
-    prompt = f"""
+    def __init__(self, fields):
+        self.pending = set(fields)
+        self.buffer = ""
+        self.scanned_to = 0
+
+    def feed(self, text):
+        self.buffer += text
+        found = []
+
+        for match in _JSON_FIELD.finditer(self.buffer, self.scanned_to):
+            self.scanned_to = match.end()
+            key = match.group("key")
+            if key not in self.pending:
+                continue
+
+            self.pending.discard(key)
+            value = match.group("value")
+            found.append((key, json.loads(f'"{value}"') if value is not None else None))
+
+        return found
+
+
+def generate_text(prompt, purpose, use_cache=True, accept=None, priority=INTERACTIVE):
+    """
+    Single Gemini completion, served from llm_cache when possible. With
+    use_cache=False the lookup is skipped but the fresh result still replaces
+    the cached one. `accept(text)` can veto caching of unusable responses.
+    `purpose` selects the model and generation config from model_registry;
+    `priority` orders the call in the Gemini quota queue.
+    """
+    spec = get_spec(purpose)
+    key = prompt_key(spec.name, prompt, spec.generation_config)
+
+    if use_cache:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached
+    else:
+        llm_cache.record_bypass()
+
+    def call():
+        with stage("gemini"):
+            start = time.perf_counter()
+            response = get_model(purpose).generate_content(prompt)
+            return response, response.text, time.perf_counter() - start
+
+    reserved = _reserved_tokens(prompt, spec)
+    response, text, elapsed = call_gemini(call, reserved, priority)
+    gemini_quota.settle(reserved, _usage_tokens(response))
+
+    if accept is None or accept(text):
+        llm_cache.put(key, text, elapsed)
+    return text
+
+
+def stream_text(prompt, purpose, use_cache=True, accept=None, priority=INTERACTIVE):
+    """Streaming counterpart of generate_text; a cache hit is yielded as one chunk."""
+    spec = get_spec(purpose)
+    key = prompt_key(spec.name, prompt, spec.generation_config)
+
+    if use_cache:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+    else:
+        llm_cache.record_bypass()
+
+    def open_stream():
+        # Errors before the first chunk are retried like non-streaming calls
+        start = time.perf_counter()
+        response = iter(get_model(purpose).generate_content(prompt, stream=True))
+        first = next(response, None)
+        record_stage("gemini_first_chunk", time.perf_counter() - start)
+        return start, itertools.chain(() if first is None else (first,), response)
+
+    reserved = _reserved_tokens(prompt, spec)
+    start, response = call_gemini(open_stream, reserved, priority)
+    chunks = []
+    usage = None
+
+    try:
+        for chunk in response:
+            usage = _usage_tokens(chunk) or usage
+            if chunk.text:
+                chunks.append(chunk.text)
+                yield chunk.text
+    finally:
+        # Also when the stream fails or the client goes away (GeneratorExit):
+        # a stream cut short has no usage yet, so it is charged for what it
+        # used and the rest of the reservation goes back
+        if usage is None:
+            usage = estimate_tokens(prompt) + estimate_tokens("".join(chunks))
+        gemini_quota.settle(reserved, usage)
+
+    # Includes time the consumer spent between chunks
+    record_stage("gemini_stream", time.perf_counter() - start)
+    text = "".join(chunks)
+    if accept is None or accept(text):
+        llm_cache.put(key, text, time.perf_counter() - start)
+
+
+def _is_mail_json(text):
+    return "error" not in parse_mail_json(text)
+
+
+def _is_non_empty(text):
+    return bool(text and text.strip())
+
+
+@timed_stage("prompt_build")
+def build_mail_prompt(jd_text, resume_text=None, resume_links=None):
+    jd_text = condense_jd(jd_text)
+    resume_text = condense_resume(resume_text)
+
+    return f"""
     You are an intelligent assistant that writes professional emails.
 
     --- JOB DESCRIPTION ---
@@ -50,38 +251,141 @@ def generate_mail_dict(jd_text, resume_text=None, resume_links=None):
     NOTE: Maintain the format, professionalism, greet initially, spacing, line change and data you are generating is inserted into the text editor, so if require highlight/bold the important text/details (like skills, experience) also using html <b> tag.
     """
 
-    model = genai.GenerativeModel("gemini-2.5-flash")
-    response = model.generate_content(prompt)
 
-    text = response.text.strip()
+def parse_mail_json(raw_text):
+    text = raw_text.strip()
     if text.startswith("```"):
         text = text.strip("`")
         text = text.replace("json", "", 1).strip()
 
     try:
         data = json.loads(text)
-        print("\n=============\n", repr(data["body"]), "\n=============\n")
+        logger.debug("Generated body: %r", data["body"])
         if "body" in data:
-            data["body"] = data["body"].replace("\n", "<br>")
-
-        print("\n======AFTER BR TAG=======\n", repr(data["body"]), "\n=============\n")
+            data["body"] = lines_to_br(data["body"])
 
         return data
     except Exception:
-        return {"error": "Invalid AI JSON format", "raw": response.text}
+        return {"error": "Invalid AI JSON format", "raw": raw_text}
+
+
+@timed_stage("prompt_build")
+def build_body_prompt(jd_text, resume_text=None, resume_links=None, analysis=None):
+    """Prompt for the body alone, once recipient, CC and subject are settled locally."""
+    jd_text = condense_jd(jd_text)
+    resume_text = condense_resume(resume_text)
+
+    role = analysis.job_title if analysis and analysis.job_title else "See job description."
+    if analysis and analysis.company:
+        role = f"{role} at {analysis.company}"
+
+    return f"""
+    You are an intelligent assistant that writes professional emails.
 
-def regenerate_mail_body(original_body: str, instruction: str | None = None, resume_text: str | None = None):
+    --- JOB DESCRIPTION ---
+    {jd_text}
+
+    --- ROLE ---
+    {role}
+
+    --- RESUME ---
+    {resume_text if resume_text else "Resume data not available. Use job description only."}
+    --- RESUME LINKS ---
+    {json.dumps(resume_links) if resume_links else "No links available."}
+
+    --- TASK ---
+    1. Write a short, professional, personalized email body (2–5 lines i.e. not more than a paragraph) applying for the role, using resume if available.
+    2. Do not use a template tone or cliché language.
+    3. Ending of the mail should look like this (keep it compact with NO space between lines):
+       Best Regards,
+       Muskan Mulyan
+       [Phone number]
+       GitHub: [Github link] 
+       LinkedIn:[Linkedin link]
+
+    You will find phone number, github and linkedin links in the resume if provided. Don't mention if not available. Returns lines immediately one after another without empty lines in between for the signature.
+
+    4. Output ONLY valid JSON in the following format:
+    {{
+        "body": "mail body here"
+    }}
+
+    NOTE: Maintain the format, professionalism, greet initially, spacing, line change and data you are generating is inserted into the text editor, so if require highlight/bold the important text/details (like skills, experience) also using html <b> tag.
     """
-    Regenerates ONLY the email body based on a user instruction.
+
+
+def _mail_prompt(jd_text, resume_text, resume_links):
+    """
+    (prompt, analysis). When the JD analyzer settles recipient, CC and
+    subject, Gemini is only asked for the body; otherwise it gets the full
+    prompt and the analysis is applied to its answer afterwards.
+    """
+    analysis = analyze_jd(jd_text) if JD_ANALYZER_ENABLED else None
+
+    if analysis is not None and analysis.resolved:
+        return build_body_prompt(jd_text, resume_text, resume_links, analysis), analysis
+    return build_mail_prompt(jd_text, resume_text, resume_links), analysis
+
+
+def generate_mail_dict(jd_text, resume_text=None, resume_links=None, use_cache=True, priority=INTERACTIVE):
+    """
+    Generates structured email data (recipient, subject, body)
+    based on JD and optional resume.
+    """
+
+    prompt, analysis = _mail_prompt(jd_text, resume_text, resume_links)
+
+    data = parse_mail_json(generate_text(prompt, "generate", use_cache, accept=_is_mail_json, priority=priority))
+    return analysis.merge(data) if analysis is not None else data
+
+
+def stream_mail_dict(jd_text, resume_text=None, resume_links=None, use_cache=True):
+    """
+    Streaming variant of generate_mail_dict. Yields ("field", name, value) as
+    soon as recipient/cc/subject are known (up front when the JD analyzer
+    settles them, else once complete in the partial JSON), then a final
+    ("done", data) with the same dict generate_mail_dict returns.
     """
-    
-    final_instruction = (
-        instruction.strip()
-        if instruction and instruction.strip()
-        else "Rewrite the email to be clearer and more concise while keeping the same intent."
-    )
 
-    prompt = f"""
+    prompt, analysis = _mail_prompt(jd_text, resume_text, resume_links)
+
+    pending = HEADER_FIELDS
+    if analysis is not None:
+        pending = analysis.ambiguous
+        for name in HEADER_FIELDS:
+            if name not in pending:
+                yield ("field", name, getattr(analysis, name))
+
+    parser = PartialJsonFields(pending)
+    chunks = []
+
+    for text in stream_text(prompt, "generate", use_cache, accept=_is_mail_json):
+        chunks.append(text)
+        for name, value in parser.feed(text):
+            if analysis is not None and name != "subject":
+                value = analysis.grounded(value)
+            yield ("field", name, value)
+
+    data = parse_mail_json("".join(chunks))
+    yield ("done", analysis.merge(data) if analysis is not None else data)
+
+DEFAULT_REGENERATE_INSTRUCTION = "Rewrite the email to be clearer and more concise while keeping the same intent."
+
+
+def regenerate_instruction(instruction: str | None = None):
+    """The instruction a regenerate request runs with; a blank one means the default rewrite."""
+    return instruction.strip() if instruction and instruction.strip() else DEFAULT_REGENERATE_INSTRUCTION
+
+
+@timed_stage("prompt_build")
+def build_regenerate_prompt(original_body: str, instruction: str | None = None, resume_text: str | None = None):
+    # Only the resume is condensed: the body is what the model rewrites, and
+    # cutting it would drop its ending (and the signature it must keep)
+    resume_text = condense_resume(resume_text)
+
+    final_instruction = regenerate_instruction(instruction)
+
+    return f"""
     You are an intelligent assistant helping refine professional emails.
 
     --- ORIGINAL EMAIL BODY ---
@@ -103,8 +407,34 @@ def regenerate_mail_body(original_body: str, instruction: str | None = None, res
     NOTE: Maintain the format, professionalism, greet initially, spacing, line change and data you are generating is inserted into the text editor, so if require highlight/bold the important text/details (like skills, experience) also using html <b> tag.
     """
 
-    model = genai.GenerativeModel("gemini-2.5-flash")
-    response = model.generate_content(prompt)
 
-    print("=====================^^^^^^^^^^^^^^^^^^^^^^^^^^^^^================\n\n", response.text.strip())
-    return response.text.strip()
\ No newline at end of file
+def regenerate_mail_body(original_body: str, instruction: str | None = None, resume_text: str | None = None,
+                         use_cache: bool = True, priority: int = INTERACTIVE):
+    """
+    Regenerates ONLY the email body based on a user instruction.
+    """
+
+    prompt = build_regenerate_prompt(original_body, instruction, resume_text)
+
+    text = generate_text(prompt, "regenerate", use_cache, accept=_is_non_empty, priority=priority)
+
+    text = text.strip()
+    logger.debug("Regenerated body: %r", text)
+    return text
+
+
+def regenerate_cost(original_body: str, instruction: str | None = None, resume_text: str | None = None):
+    """Estimated tokens (prompt + output) one regenerate_mail_body call reserves."""
+    return _reserved_tokens(build_regenerate_prompt(original_body, instruction, resume_text), get_spec("regenerate"))
+
+
+def stream_mail_body(original_body: str, instruction: str | None = None, resume_text: str | None = None,
+                     use_cache: bool = True):
+    """
+    Streaming variant of regenerate_mail_body. Yields text chunks as Gemini
+    produces them; the caller joins and strips them for the final body.
+    """
+
+    prompt = build_regenerate_prompt(original_body, instruction, resume_text)
+
+    yield from stream_text(prompt, "regenerate", use_cache, accept=_is_non_empty)
@@ -3,11 +3,31 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from google.auth.exceptions import RefreshError
 from googleapiclient.discovery import build
+from google_auth_httplib2 import AuthorizedHttp
+from datetime import datetime, timedelta, timezone
+import httplib2
 import os, threading
 
+from config import (
+    GMAIL_REFRESH_MARGIN_SECONDS,
+    GMAIL_AUTH_MODE,
+    GMAIL_TOKEN_PATH,
+    GMAIL_CREDENTIALS_PATH,
+    GMAIL_OAUTH_PORT,
+)
+from shared_state import FileLock, atomic_write
+
 SCOPES = ["https://www.googleapis.com/auth/gmail.send"]
-TOKEN_PATH = "token.json"
-CRED_PATH = "credentials.json"
+TOKEN_PATH = GMAIL_TOKEN_PATH
+CRED_PATH = GMAIL_CREDENTIALS_PATH
+
+# Serialises token refreshes across worker processes
+token_lock = FileLock(f"{TOKEN_PATH}.lock")
+
+# "interactive": a missing/revoked token starts the local browser OAuth flow
+# (desktop use). "server": requests never start it; credentials are
+# provisioned out of band (CLI or admin endpoint) and refreshed in background.
+AUTH_MODES = ("interactive", "server")
 
 
 def run_oauth_with_timeout(timeout_sec=60):
@@ -21,7 +41,7 @@ def run_oauth_with_timeout(timeout_sec=60):
         try:
             flow = InstalledAppFlow.from_client_secrets_file(CRED_PATH, SCOPES)
             creds_container["creds"] = flow.run_local_server(
-            port=8080,
+            port=GMAIL_OAUTH_PORT,
             access_type="offline",
             prompt="consent"
             )
@@ -40,8 +60,49 @@ def run_oauth_with_timeout(timeout_sec=60):
     return creds_container["creds"]
 
 
-def get_gmail_service():
-    """Authenticate with Gmail. If OAuth login is required but user does not authenticate within timeout → return None."""
+def save_token(creds):
+    # Atomic, so another worker never reads a half-written token.json
+    atomic_write(TOKEN_PATH, creds.to_json())
+
+
+def refresh_credentials(creds, margin_sec=0):
+    """
+    Refreshes `creds` in place under the token file lock. If another worker
+    already refreshed (token.json holds a token valid for at least
+    `margin_sec` more seconds) that token is adopted instead of spending a
+    refresh. Returns True if a refresh was made. Raises RefreshError.
+    """
+    with token_lock:
+        stored = read_token()
+        if stored is not None and stored.valid and stored.refresh_token == creds.refresh_token \
+                and not _expires_soon(stored, margin_sec):
+            creds.token = stored.token
+            creds.expiry = stored.expiry
+            return False
+
+        creds.refresh(Request())
+        save_token(creds)
+        return True
+
+
+def read_token():
+    """Credentials from token.json, or None if missing/corrupt. Never prompts."""
+    if not os.path.exists(TOKEN_PATH):
+        return None
+    try:
+        return Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
+    except Exception:
+        print("⚠ token.json is corrupt — provision a new token.")
+        return None
+
+
+def load_credentials(interactive=True):
+    """
+    Load (and if needed refresh) credentials. If OAuth login is required but user does not authenticate within timeout → return None.
+    With interactive=False the browser flow is never started; None is returned instead.
+    """
+    if not interactive:
+        return _load_credentials_non_interactive()
 
     creds = None
 
@@ -62,34 +123,339 @@ def get_gmail_service():
             print("OAuth login not completed — fallback required.")
             return None
 
-        with open(TOKEN_PATH, "w") as f:
-            f.write(creds.to_json())
-        return build("gmail", "v1", credentials=creds)
+        save_token(creds)
+        return creds
 
     # Case 2: Token exists but expired
     if not creds.valid:
         if creds.refresh_token:
             try:
                 print("Refreshing token...")
-                creds.refresh(Request())
-                with open(TOKEN_PATH, "w") as f:
-                    f.write(creds.to_json())
+                refresh_credentials(creds)
             except RefreshError:
                 print("Refresh token invalid — OAuth required")
                 creds = run_oauth_with_timeout()
                 if not creds:
                     print("OAuth login not completed — fallback required.")
                     return None
-                with open(TOKEN_PATH, "w") as f:
-                    f.write(creds.to_json())
+                save_token(creds)
         else:
             print("⚠ No refresh token — OAuth required")
             creds = run_oauth_with_timeout()
             if not creds:
                 print("OAuth login not completed — fallback required.")
                 return None
-            with open(TOKEN_PATH, "w") as f:
-                f.write(creds.to_json())
+            save_token(creds)
 
     print("Gmail API authenticated successfully.")
-    return build("gmail", "v1", credentials=creds)
\ No newline at end of file
+    return creds
+
+
+def _load_credentials_non_interactive():
+    creds = read_token()
+    if creds is None:
+        print("No Gmail token provisioned — run `python gmail_auth.py provision`.")
+        return None
+
+    if not creds.valid:
+        if not creds.refresh_token:
+            print("⚠ Gmail token expired and has no refresh token — provision a new one.")
+            return None
+        try:
+            refresh_credentials(creds)
+        except RefreshError:
+            print("Refresh token invalid — provision a new Gmail token.")
+            return None
+
+    return creds
+
+
+def credentials_from_info(info):
+    """
+    Authorized-user credentials from a parsed token.json (as written by
+    `python gmail_auth.py provision`), refreshed if the access token has
+    expired. Raises ValueError if they cannot be used to send mail.
+    """
+    try:
+        creds = Credentials.from_authorized_user_info(info, SCOPES)
+    except (ValueError, TypeError, AttributeError) as e:
+        raise ValueError(f"Not an authorized-user token: {e}") from None
+
+    if creds.scopes and not set(SCOPES) <= set(creds.scopes):
+        raise ValueError(f"Token is missing the {', '.join(SCOPES)} scope")
+
+    if not creds.valid:
+        if not creds.refresh_token:
+            raise ValueError("Token has expired and has no refresh token")
+        try:
+            creds.refresh(Request())
+        except RefreshError as e:
+            raise ValueError(f"Token refresh failed: {e}") from None
+    return creds
+
+
+def _expires_soon(creds, margin_sec):
+    return _expires_within(creds.expiry, margin_sec)
+
+
+def _expires_within(expiry, margin_sec):
+    if not expiry:
+        return False
+    # google-auth stores expiry as naive UTC
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return expiry - timedelta(seconds=margin_sec) <= now
+
+
+# A bearer token handed to the async client must outlive the request
+BEARER_MIN_TTL_SECONDS = 60
+
+
+class GmailServiceHolder:
+    """
+    Process-wide cache of Gmail credentials and the discovery-built service.
+
+    The service is built once and reused; credentials are refreshed under a
+    lock shortly before they expire, so concurrent senders never race on the
+    refresh or on writing token.json. httplib2 is not thread-safe, so each
+    thread gets its own AuthorizedHttp bound to the shared credentials.
+    bearer_token() reads a snapshot published under the lock instead, so the
+    event loop never waits behind a refresh. The interactive OAuth flow runs
+    outside the lock, one caller at a time; the others get None meanwhile.
+    """
+
+    def __init__(self, refresh_margin_sec=300, interactive=True):
+        self.refresh_margin_sec = refresh_margin_sec
+        # False in server mode: get_service() only uses the cached service or
+        # token.json, and refreshing is left to refresh_if_needed()
+        self.interactive = interactive
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._creds = None
+        self._service = None
+        # (token, expiry, refreshable) of the cached credentials, replaced
+        # whole under self._lock and read without it by bearer_token()
+        self._bearer = None
+        # True while one get_service() call runs load_credentials()
+        self._logging_in = False
+        self.hits = 0
+        self.bearer_hits = 0
+        self.builds = 0
+        self.refreshes = 0
+        self.adopted = 0
+        self.refresh_failures = 0
+
+    def _refresh(self):
+        # Caller must hold self._lock
+        try:
+            print("Refreshing token ahead of expiry...")
+            if refresh_credentials(self._creds, self.refresh_margin_sec):
+                self.refreshes += 1
+            else:
+                self.adopted += 1
+            self._publish()
+            return True
+        except RefreshError:
+            print("Refresh token invalid — dropping cached Gmail service.")
+            self.refresh_failures += 1
+            self._creds = None
+            self._service = None
+            self._publish()
+            return False
+
+    def _publish(self):
+        # Caller must hold self._lock
+        creds = self._creds
+        if self._service is None or creds is None:
+            self._bearer = None
+        else:
+            self._bearer = (creds.token, creds.expiry, bool(creds.refresh_token))
+
+    def get_service(self):
+        with self._lock:
+            if not self.interactive:
+                return self._get_service_fail_fast()
+
+            if self._service is not None and self._creds.refresh_token and \
+                    (not self._creds.valid or _expires_soon(self._creds, self.refresh_margin_sec)):
+                self._refresh()
+
+            if self._service is not None and self._creds.valid:
+                self.hits += 1
+                # Credentials may also be refreshed in place by AuthorizedHttp
+                self._publish()
+                return self._service
+
+            if self._logging_in:
+                # Another thread is in the browser login (up to a minute):
+                # fail fast so this send can fall back to SMTP
+                return None
+            self._logging_in = True
+
+        # Outside the lock: the OAuth flow must not hold up bearer_token(),
+        # stats() or the threads that fall back to SMTP meanwhile
+        try:
+            creds = load_credentials()
+            with self._lock:
+                return self._install(creds) if creds is not None else None
+        finally:
+            with self._lock:
+                self._logging_in = False
+
+    def _install(self, creds):
+        # Caller must hold self._lock
+        self._creds = creds
+        self._service = build("gmail", "v1", credentials=creds, cache_discovery=False)
+        self.builds += 1
+        self._publish()
+        return self._service
+
+    def _get_service_fail_fast(self):
+        # Caller must hold self._lock. Never refreshes or prompts: the request
+        # path only takes credentials that are already valid.
+        if self._service is not None and self._creds.valid:
+            self.hits += 1
+            self._publish()
+            return self._service
+
+        # Picks up a token provisioned by the CLI or refreshed by another process
+        creds = read_token()
+        if creds is None or not creds.valid:
+            return None
+        return self._install(creds)
+
+    def refresh_if_needed(self):
+        """
+        Loads token.json if nothing is cached and refreshes credentials that
+        expire within the margin. Run periodically by the server-mode
+        background task; never starts the browser login. Returns True if
+        valid credentials are cached afterwards.
+        """
+        with self._lock:
+            if self._creds is None:
+                creds = read_token()
+                if creds is None:
+                    return False
+                self._creds = creds
+                self._service = None
+                self._publish()
+
+            if self._creds.refresh_token and \
+                    (not self._creds.valid or _expires_soon(self._creds, self.refresh_margin_sec)):
+                if not self._refresh():
+                    return False
+
+            if not self._creds.valid:
+                return False
+            if self._service is None:
+                self._install(self._creds)
+            return True
+
+    def provision(self, creds):
+        """Stores freshly authorized credentials and swaps them in."""
+        save_token(creds)
+        with self._lock:
+            self._install(creds)
+
+    def status(self):
+        with self._lock:
+            creds = self._creds
+        if creds is None:
+            creds = read_token()
+        return {
+            "mode": "interactive" if self.interactive else "server",
+            "has_credentials": creds is not None,
+            "valid": bool(creds and creds.valid),
+            "has_refresh_token": bool(creds and creds.refresh_token),
+            "expiry": creds.expiry.isoformat() + "Z" if creds and creds.expiry else None,
+            "scopes": list(creds.scopes or []) if creds else [],
+        }
+
+    def bearer_token(self):
+        """
+        Access token of the cached credentials, or None if there are none or
+        they need a refresh (then call get_service() from a worker thread).
+        Lock-free, so it never waits behind a refresh or the OAuth flow and
+        is safe to call on the event loop.
+        """
+        snapshot = self._bearer
+        if snapshot is None:
+            return None
+        token, expiry, refreshable = snapshot
+        if not token or _expires_within(expiry, BEARER_MIN_TTL_SECONDS):
+            return None
+        if self.interactive and refreshable and _expires_within(expiry, self.refresh_margin_sec):
+            return None
+        # Only the event loop calls this, so the counter needs no lock
+        self.bearer_hits += 1
+        return token
+
+    def http(self):
+        """Thread-local authorized transport for service requests' execute(http=...)."""
+        with self._lock:
+            creds = self._creds
+
+        local_http = getattr(self._local, "http", None)
+        if local_http is None or local_http.credentials is not creds:
+            local_http = AuthorizedHttp(creds, http=httplib2.Http())
+            self._local.http = local_http
+        return local_http
+
+    def invalidate(self):
+        with self._lock:
+            self._creds = None
+            self._service = None
+            self._publish()
+
+    def stats(self):
+        with self._lock:
+            hits = self.hits + self.bearer_hits
+            lookups = hits + self.builds
+            return {
+                "hits": hits,
+                "builds": self.builds,
+                "refreshes": self.refreshes,
+                "adopted_refreshes": self.adopted,
+                "refresh_failures": self.refresh_failures,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+
+if GMAIL_AUTH_MODE not in AUTH_MODES:
+    raise ValueError(f"GMAIL_AUTH_MODE must be one of {AUTH_MODES}, got {GMAIL_AUTH_MODE!r}")
+
+gmail_holder = GmailServiceHolder(
+    refresh_margin_sec=GMAIL_REFRESH_MARGIN_SECONDS,
+    interactive=GMAIL_AUTH_MODE == "interactive",
+)
+
+
+def get_gmail_service():
+    """Authenticate with Gmail. If OAuth login is required but user does not authenticate within timeout → return None."""
+    return gmail_holder.get_service()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Provision or inspect the Gmail OAuth token.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    provision = commands.add_parser("provision", help="run the browser login and write the token file")
+    provision.add_argument("--timeout", type=int, default=300, help="seconds to wait for the login")
+    commands.add_parser("status", help="show the stored token's state")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        import json
+        print(json.dumps(gmail_holder.status(), indent=2))
+        return
+
+    print(f"Open the printed URL and approve access (listening on port {GMAIL_OAUTH_PORT})...")
+    creds = run_oauth_with_timeout(args.timeout)
+    if creds is None:
+        raise SystemExit("OAuth login not completed.")
+    save_token(creds)
+    print(f"Token written to {TOKEN_PATH}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+import re
+import threading
+from dataclasses import dataclass
+
+from email_validator import validate_email, EmailNotValidError
+
+from metrics import timed_stage
+
+HEADER_FIELDS = ("recipient", "cc", "subject")
+
+# ---------- Emails ----------
+_EMAIL = re.compile(r"(?<![\w.+-])[A-Za-z0-9][\w.+-]*@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+# hr [at] example [dot] com, hr(at)example(dot)com, hr at example dot com
+_OBFUSCATED_EMAIL = re.compile(
+    r"\b([\w.+-]+)\s*(?:\[at\]|\(at\)|\s+at\s+)\s*([\w-]+(?:\s*(?:\[dot\]|\(dot\)|\s+dot\s+)\s*[\w-]+)+)\b",
+    re.IGNORECASE,
+)
+_OBFUSCATED_DOT = re.compile(r"\s*(?:\[dot\]|\(dot\)|\s+dot\s+)\s*", re.IGNORECASE)
+_NO_REPLY = re.compile(r"^(?:no-?reply|do-?not-?reply)", re.IGNORECASE)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_CLAUSE_BREAK = re.compile(r"\s*(?:[,;()]|\band\b|\bor\b)\s*", re.IGNORECASE)
+_CC_MARKER = re.compile(r"\bc\.?c\.?\b|\bcc'?d\b|\bcop(?:y|ied)\b|\bin\s+(?:the\s+)?loop\b", re.IGNORECASE)
+_TO_MARKER = re.compile(
+    r"\b(?:send|sent|mail|e-?mail|apply|share|forward|submit|write|reach|contact|drop|to)\b|:",
+    re.IGNORECASE,
+)
+_APPLY_MARKER = re.compile(
+    r"\b(?:resumes?|cvs?|c\.v\.|applications?|apply|applying|portfolio|candidates?|interested)\b",
+    re.IGNORECASE,
+)
+_QUERY_MARKER = re.compile(
+    r"\b(?:quer(?:y|ies)|questions?|doubts?|support|help|feedback|complaints?|unsubscribe|privacy|press|media)\b",
+    re.IGNORECASE,
+)
+# More addresses than this in the To role is a list of contacts, not a recipient
+MAX_RECIPIENTS = 3
+
+# ---------- Subject ----------
+_QUOTED = r"""(?:"(?P<d>[^"\n]{2,150})"|“(?P<c>[^”\n]{2,150})”|'(?P<s>[^'\n]{2,150})'|‘(?P<q>[^’\n]{2,150})’)"""
+_SUBJECT_INSTRUCTIONS = (
+    # subject line should be "X" / with the subject 'X' / subject: "X"
+    re.compile(
+        r"\bsubject(?:\s+line)?\s*(?:(?:should|must|shall|has\s+to|needs?\s+to|will)\s+)?"
+        r"(?:be|read|say|state|contain|mention|as|like|of|:|-|–|=)?\s*(?:as\s+|like\s+)?" + _QUOTED,
+        re.IGNORECASE,
+    ),
+    # mention "X" in the subject (line)
+    re.compile(
+        r"\b(?:mention|write|use|put|add|include|keep|mark)\s+(?:the\s+)?(?:text\s+)?" + _QUOTED +
+        r"\s+(?:in|as)\s+(?:the\s+)?(?:e-?mail\s+|mail\s+)?subject",
+        re.IGNORECASE,
+    ),
+    # Subject: X / subject line should be X (rest of the sentence)
+    re.compile(
+        r"\bsubject(?:\s+line)?\s*(?::|-|–|\s(?:should|must)\s+(?:be|read))\s*(?P<u>[^\n\"“'‘]{2,120}?)\s*(?:\.(?:\s|$)|$)",
+        re.IGNORECASE | re.MULTILINE,
+    ),
+)
+# Placeholders the candidate is meant to fill in: [Your Name], <Role>, {name}
+_SUBJECT_PLACEHOLDER = re.compile(
+    r"[\[<{][^\]>}]*[\]>}]|\b(?:your|candidate'?s?|applicant'?s?)\s+(?:full\s+)?name\b|\bx{3,}\b",
+    re.IGNORECASE,
+)
+MAX_SUBJECT_WORDS = 7
+
+# ---------- Job title ----------
+_TITLE_NOUNS = (
+    r"engineer|developer|analyst|scientist|architect|designer|manager|intern|consultant|specialist"
+    r"|administrator|programmer|tester|lead|director|officer|associate|executive|coordinator|researcher"
+    r"|writer|trainee|strategist|accountant|recruiter|sde|sre"
+)
+# Up to four leading words that start with (or contain) a capital or digit, then the role noun
+_TITLE = re.compile(
+    r"(?P<title>(?:[a-z]*[A-Z0-9][\w+#./&-]*\s+){0,4}(?i:" + _TITLE_NOUNS + r"))"
+    r"(?i:s)?(?P<level>\s+(?:I{1,3}|IV|[1-3]))?(?![\w])"
+)
+_TITLE_LABEL = re.compile(
+    r"^\s*(?:job\s+title|position|role|designation|title|opening|vacancy|post)\s*[:\-–|]\s*(?P<title>.+)$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_TITLE_CUT = re.compile(r"\s+[-–|@(]|\s*[,(]|\s+at\s+|\s+in\s+")
+_HIRING = re.compile(
+    r"\b(?:hiring|looking\s+for|seeking|searching\s+for|in\s+search\s+of|opening\s+for|vacancy\s+for"
+    r"|position\s+of|role\s+of|join\s+(?:us|our\s+team)\s+as|apply\s+for)\b",
+    re.IGNORECASE,
+)
+_TITLE_LEADING_WORDS = {
+    "hiring", "urgent", "urgently", "now", "job", "jobs", "opening", "openings", "position", "role", "vacancy",
+    "we", "we're", "are", "is", "for", "the", "a", "an", "looking", "seeking", "wanted", "our", "join", "as",
+    "immediate", "new", "exciting",
+}
+_NOT_TITLES = {"hiring manager", "manager", "recruiter", "hr manager", "lead"}
+# Lines searched for a headline title when no label or hiring sentence names one
+HEADLINE_LINES = 3
+
+# ---------- Company ----------
+_NAME = r"[A-Z0-9][\w&'.-]*(?:[ \t]+(?:&[ \t]+)?[A-Z0-9][\w&'.-]*){0,3}"
+_COMPANY_PATTERNS = (
+    re.compile(
+        r"^\s*(?:company(?:\s+name)?|organi[sz]ation|employer|client)\s*[:\-–|]\s*(?P<company>[^\n|,(]{2,60})",
+        re.IGNORECASE | re.MULTILINE,
+    ),
+    re.compile(r"\b(?:hiring|looking|seeking|[Oo]pening|[Vv]acancy)\b[^.\n]{0,80}?\s(?:at|@)\s+(?P<company>" + _NAME + r")"),
+    re.compile(r"\b(?:[Jj]oin|[Aa]bout)\s+(?P<company>" + _NAME + r")"),
+    re.compile(r"(?P<company>" + _NAME + r")\s+is\s+(?:hiring|looking|seeking)\b"),
+)
+_NOT_COMPANIES = {"we", "us", "our", "the", "this", "company", "team", "our team", "the team", "you", "it"}
+
+
+@dataclass(frozen=True)
+class JDAnalysis:
+    """
+    Header fields found in a JD without the LLM. `ambiguous` names the
+    header fields (recipient, cc, subject) the patterns could not settle;
+    those are left to the LLM. `emails` holds every valid address in the JD.
+    """
+    recipient: str | None
+    cc: str | None
+    subject: str | None
+    job_title: str | None
+    company: str | None
+    emails: frozenset
+    ambiguous: tuple
+
+    @property
+    def resolved(self):
+        return not self.ambiguous
+
+    def grounded(self, value):
+        """Addresses in `value` (comma separated) that actually occur in the JD."""
+        if not value:
+            return None
+        found = [email for email in _split_addresses(value) if email.lower() in self.emails]
+        return ", ".join(found) or None
+
+    def merge(self, data):
+        """
+        Applies the settled fields to an LLM result. For ambiguous
+        recipient/cc the LLM's addresses are kept only if they occur in the
+        JD, so an invented address never reaches the send form.
+        """
+        if data.get("error"):
+            return data
+
+        merged = {name: data.get(name) for name in HEADER_FIELDS}
+        for name in HEADER_FIELDS:
+            if name not in self.ambiguous:
+                merged[name] = getattr(self, name)
+            elif name != "subject":
+                merged[name] = self.grounded(data.get(name))
+                dropped = len(_split_addresses(data.get(name) or "")) - len(_split_addresses(merged[name] or ""))
+                if dropped:
+                    analyzer_stats.record_dropped(dropped)
+        merged["body"] = data.get("body")
+        return merged
+
+
+class AnalyzerStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.analyzed = 0
+        self.resolved = 0
+        self.ambiguous = dict.fromkeys(HEADER_FIELDS, 0)
+        self.dropped_addresses = 0
+
+    def record(self, analysis):
+        with self._lock:
+            self.analyzed += 1
+            self.resolved += analysis.resolved
+            for name in analysis.ambiguous:
+                self.ambiguous[name] += 1
+
+    def record_dropped(self, count):
+        with self._lock:
+            self.dropped_addresses += count
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "analyzed": self.analyzed,
+                "resolved_locally": self.resolved,
+                "llm_fallbacks": self.analyzed - self.resolved,
+                "ambiguous": dict(self.ambiguous),
+                "dropped_llm_addresses": self.dropped_addresses,
+            }
+
+
+analyzer_stats = AnalyzerStats()
+
+
+def _split_addresses(value):
+    return [part.strip() for part in re.split(r"[,;\s]+", value) if "@" in part]
+
+
+def _valid_email(address):
+    try:
+        return validate_email(address, check_deliverability=False).normalized
+    except EmailNotValidError:
+        return None
+
+
+def _deobfuscate(text):
+    def replace(match):
+        return f"{match.group(1)}@{_OBFUSCATED_DOT.sub('.', match.group(2))}"
+
+    return _OBFUSCATED_EMAIL.sub(replace, text)
+
+
+def _find_addresses(text):
+    """
+    (recipients, cc, every valid address, ambiguous). Each clause of a
+    sentence takes the role of its marker (cc / copy vs send / mail / to);
+    a clause without one continues the previous clause's role.
+    """
+    to, cc = [], []
+    sentences = {}  # To address -> (sentence index, mentions applying, is about queries)
+    emails = set()
+
+    for index, sentence in enumerate(
+        sentence for line in text.splitlines() for sentence in _SENTENCE_END.split(line)
+    ):
+        if "@" not in sentence:
+            continue
+
+        applying = bool(_APPLY_MARKER.search(sentence))
+        query = bool(_QUERY_MARKER.search(sentence))
+        role = "to"
+        for clause in _CLAUSE_BREAK.split(sentence):
+            if _CC_MARKER.search(clause):
+                role = "cc"
+            elif _TO_MARKER.search(clause):
+                role = "to"
+
+            for match in _EMAIL.finditer(clause):
+                address = _valid_email(match.group())
+                if address is None:
+                    continue
+                emails.add(address.lower())
+                if _NO_REPLY.match(address):
+                    continue
+                if role == "cc":
+                    if address not in cc:
+                        cc.append(address)
+                elif address not in to:
+                    to.append(address)
+                    sentences[address] = (index, applying, query)
+
+    cc = [address for address in cc if address not in to]
+    ambiguous = []
+
+    if len({sentences[address][0] for address in to}) > 1:
+        # Addresses from different sentences: keep the ones about applying,
+        # else drop the ones for queries/support
+        applying = [address for address in to if sentences[address][1]]
+        not_queries = [address for address in to if not sentences[address][2]]
+        if applying:
+            to = applying
+        elif len({sentences[address][0] for address in not_queries}) == 1:
+            to = not_queries
+        else:
+            ambiguous.append("recipient")
+
+    if (cc and not to) or len(to) > MAX_RECIPIENTS:
+        ambiguous.append("recipient")
+
+    return to, cc, emails, ambiguous
+
+
+def _clean_title(title):
+    words = title.split()
+    while words and words[0].lower() in _TITLE_LEADING_WORDS:
+        words.pop(0)
+    title = " ".join(word.capitalize() if word.islower() else word for word in words)
+    if not title or title.lower() in _NOT_TITLES:
+        return None
+    return title
+
+
+def _title_in(text):
+    match = _TITLE.search(text)
+    if match is None:
+        return None
+    return _clean_title(match.group("title") + (match.group("level") or ""))
+
+
+def find_job_title(text):
+    """(title or None, ambiguous) from a 'Role:' label, the hiring sentence(s), or the headline."""
+    for match in _TITLE_LABEL.finditer(text):
+        title = _clean_title(_TITLE_CUT.split(match.group("title"), 1)[0].strip(" .:-"))
+        if title:
+            return title, False
+
+    titles = []
+    for match in _HIRING.finditer(text):
+        window = text[match.end():match.end() + 80].split("\n", 1)[0]
+        for found in _TITLE.finditer(window):
+            title = _clean_title(found.group("title") + (found.group("level") or ""))
+            if title and title.lower() not in (t.lower() for t in titles):
+                titles.append(title)
+    if titles:
+        # Several roles in one JD: the LLM picks the subject
+        return titles[0], len(titles) > 1
+
+    for line in [line for line in text.splitlines() if line.strip()][:HEADLINE_LINES]:
+        title = _title_in(line)
+        if title:
+            return title, False
+    return None, False
+
+
+def find_company(text):
+    for pattern in _COMPANY_PATTERNS:
+        for match in pattern.finditer(text):
+            company = match.group("company").strip(" .:-")
+            if company and company.lower() not in _NOT_COMPANIES and not _TITLE.fullmatch(company):
+                return company
+    return None
+
+
+def find_subject_instruction(text):
+    for pattern in _SUBJECT_INSTRUCTIONS:
+        match = pattern.search(text)
+        if match:
+            subject = next(value for value in match.groupdict().values() if value)
+            return subject.strip(" .\"'“”‘’")
+    return None
+
+
+@timed_stage("jd_analyze")
+def analyze_jd(jd_text):
+    """
+    Finds recipient, CC, subject, job title and company in a JD with
+    precompiled patterns. Fields the patterns cannot settle are listed in
+    `ambiguous` and left to the LLM.
+    """
+    text = _deobfuscate(jd_text or "")
+    ambiguous = []
+
+    to, cc, emails, address_ambiguity = _find_addresses(text)
+    ambiguous += address_ambiguity
+
+    job_title, several_titles = find_job_title(text)
+    company = find_company(text)
+
+    subject = find_subject_instruction(text)
+    if subject is not None:
+        if _SUBJECT_PLACEHOLDER.search(subject):
+            ambiguous.append("subject")
+    elif job_title and not several_titles and len(job_title.split()) <= MAX_SUBJECT_WORDS - 2:
+        subject = f"Application for {job_title}"
+        if company and len(subject.split()) + 1 + len(company.split()) <= MAX_SUBJECT_WORDS:
+            subject = f"{subject} at {company}"
+    else:
+        ambiguous.append("subject")
+
+    analysis = JDAnalysis(
+        recipient=", ".join(to) or None,
+        cc=", ".join(cc) or None,
+        subject=subject,
+        job_title=job_title,
+        company=company,
+        emails=frozenset(emails),
+        ambiguous=tuple(dict.fromkeys(ambiguous)),
+    )
+    analyzer_stats.record(analysis)
+    return analysis
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import LLM_CACHE_SIZE, LLM_CACHE_TTL_SECONDS, LLM_CACHE_DB, LLM_CACHE_DB_MAX_ROWS
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def prompt_key(model_name, prompt, settings=None):
+    """
+    Cache key for a generation request. Whitespace in the prompt is collapsed
+    so indentation differences in the f-string templates don't split entries.
+    """
+    normalized = _WHITESPACE.sub(" ", prompt).strip()
+    payload = json.dumps(
+        {"model": model_name, "prompt": normalized, "settings": settings or {}},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryTier:
+    """Bounded LRU with per-entry expiry."""
+
+    def __init__(self, max_entries, ttl_sec):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._entries = OrderedDict()  # key -> (expires_at, text, latency)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1], entry[2]
+
+    def put(self, key, text, latency):
+        self._entries[key] = (time.time() + self.ttl_sec, text, latency)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteTier:
+    """Persistent tier; expired rows are skipped on read and pruned on write."""
+
+    def __init__(self, db_path, max_rows, ttl_sec):
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self.ttl_sec = ttl_sec
+        self._local = threading.local()
+
+        with self._conn() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS llm_cache (
+                       key TEXT PRIMARY KEY,
+                       text TEXT NOT NULL,
+                       latency REAL NOT NULL,
+                       expires_at REAL NOT NULL,
+                       created_at REAL NOT NULL
+                   )"""
+            )
+
+    def _conn(self):
+        # Also per process: a connection inherited across fork is unusable
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT text, latency FROM llm_cache WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def put(self, key, text, latency):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, text, latency, expires_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, text, latency, now + self.ttl_sec, now),
+            )
+            conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+            conn.execute(
+                """DELETE FROM llm_cache WHERE key IN (
+                       SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_rows,),
+            )
+
+
+class LLMResponseCache:
+    """
+    Caches raw Gemini response text keyed by prompt_key(). Tracks hit ratio and
+    how much generation time the hits saved, using the latency recorded when
+    each entry was first generated.
+    """
+
+    def __init__(self, max_entries=256, ttl_sec=86400, db_path=None, db_max_rows=10000):
+        self.memory = MemoryTier(max_entries, ttl_sec)
+        self.disk = SQLiteTier(db_path, db_max_rows, ttl_sec) if db_path else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.saved_seconds = 0.0
+
+    def get(self, key):
+        with self._lock:
+            found = self.memory.get(key)
+
+        if found is None and self.disk is not None:
+            try:
+                found = self.disk.get(key)
+            except sqlite3.Error as e:
+                print(f"LLM cache read failed: {e}")
+            if found is not None:
+                with self._lock:
+                    self.memory.put(key, *found)
+
+        with self._lock:
+            if found is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += found[1]
+            return found[0]
+
+    def put(self, key, text, latency):
+        with self._lock:
+            self.memory.put(key, text, latency)
+
+        if self.disk is not None:
+            try:
+                self.disk.put(key, text, latency)
+            except sqlite3.Error as e:
+                print(f"LLM cache write failed: {e}")
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypasses += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.memory),
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+            }
+
+
+llm_cache = LLMResponseCache(
+    max_entries=LLM_CACHE_SIZE,
+    ttl_sec=LLM_CACHE_TTL_SECONDS,
+    db_path=LLM_CACHE_DB,
+    db_max_rows=LLM_CACHE_DB_MAX_ROWS,
+)
@@ -0,0 +1,466 @@
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from automate_mail import send_email, transports_available
+from config import (
+    MAIL_QUEUE_PATH,
+    MAIL_QUEUE_ATTACHMENT_DIR,
+    MAIL_QUEUE_WORKERS,
+    MAIL_QUEUE_MAX_ATTEMPTS,
+    MAIL_QUEUE_BACKOFF_SECONDS,
+    MAIL_QUEUE_BACKOFF_MAX_SECONDS,
+    MAIL_QUEUE_ATTACHMENT_GRACE_SECONDS,
+    MAIL_QUEUE_RETENTION_SECONDS,
+    MAIL_QUEUE_LEASE_SECONDS,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    batch_id TEXT,
+    status TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    cc TEXT,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    attachment_path TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    owner TEXT,
+    heartbeat_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs (batch_id);
+
+CREATE TABLE IF NOT EXISTS dead_letters (
+    job_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    error TEXT,
+    failed_at REAL NOT NULL
+);
+"""
+
+# Columns added after the first release, for databases created before them
+MIGRATIONS = {
+    "owner": "ALTER TABLE jobs ADD COLUMN owner TEXT",
+    "heartbeat_at": "ALTER TABLE jobs ADD COLUMN heartbeat_at REAL",
+}
+
+# Job lifecycle: queued -> sending -> sent | queued (retry) | dead
+STATUS_QUEUED = "queued"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_DEAD = "dead"
+
+
+class MailQueue:
+    """
+    Durable outbound mail queue backed by SQLite, drained by a pool of worker
+    threads. Failed sends are retried with exponential backoff and moved to
+    the dead_letters table once max_attempts is reached. Stored attachments
+    are deleted once no unfinished job uses them and they have not been
+    stored again for `attachment_grace_sec`, and finished jobs are deleted
+    `retention_sec` after they finished. While every transport's breaker is
+    open, workers do not claim jobs, so an outage does not use up attempts.
+
+    A job being sent belongs to the process that claimed it, which renews a
+    lease on it every `lease_sec` / 3 seconds. Jobs left in "sending" by a
+    process that crashed are requeued once their lease expires, by whichever
+    process notices first; jobs of the other live processes are left alone.
+
+    The database and attachment directory are created on first use, not on
+    import.
+    """
+
+    def __init__(self, db_path, attachment_dir, workers=4, max_attempts=5,
+                 backoff_sec=2, backoff_max_sec=300, attachment_grace_sec=3600, retention_sec=7 * 24 * 3600,
+                 lease_sec=30, send_fn=send_email, available_fn=transports_available):
+        self.db_path = db_path
+        self.attachment_dir = attachment_dir
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_sec = backoff_sec
+        self.backoff_max_sec = backoff_max_sec
+        self.attachment_grace_sec = attachment_grace_sec
+        self.retention_sec = retention_sec
+        self.lease_sec = lease_sec
+        self.send_fn = send_fn
+        self.available_fn = available_fn
+        # Set by start(), so every (forked) worker process gets its own
+        self.owner_id = None
+
+        self._local = threading.local()
+        self._claim_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        # Separate from _stopping so leases are still renewed while stop()
+        # waits for the workers to finish their current send
+        self._heartbeat_stop = threading.Event()
+        self._threads = []
+        self._heartbeat = None
+        self._next_sweep = 0.0
+
+    def _conn(self):
+        # sqlite3 connections must not be shared across threads or forked processes
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _migrate(conn):
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column, statement in MIGRATIONS.items():
+            if column not in columns:
+                try:
+                    conn.execute(statement)
+                except sqlite3.OperationalError:
+                    # Added by another process in the meantime
+                    pass
+
+    # ---------- Producer side ----------
+
+    def store_attachment(self, data: bytes, filename: str):
+        """Stores attachment bytes once per content hash and returns its path."""
+        digest = hashlib.sha256(data).hexdigest()
+        folder = os.path.join(self.attachment_dir, digest)
+        path = os.path.join(folder, os.path.basename(filename or "") or "attachment.pdf")
+
+        if os.path.exists(path):
+            # Restarts the cleanup grace period (see _sweep_attachments)
+            os.utime(path)
+        else:
+            os.makedirs(folder, exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        return path
+
+    def enqueue_batch(self, messages, attachment_path=None):
+        """
+        messages: iterable of dicts with recipient, subject, body and optional cc
+        (recipient/cc as comma separated strings, like send_email expects).
+        Returns (batch_id, job_ids).
+        """
+        batch_id = uuid.uuid4().hex
+        now = time.time()
+        rows = []
+
+        for msg in messages:
+            rows.append((
+                uuid.uuid4().hex, batch_id, STATUS_QUEUED,
+                msg["recipient"], msg.get("cc"), msg["subject"], msg["body"],
+                attachment_path, now, now, now,
+            ))
+
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                """INSERT INTO jobs (id, batch_id, status, recipient, cc, subject, body,
+                                     attachment_path, next_attempt_at, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                rows,
+            )
+
+        self._wakeup.set()
+        return batch_id, [row[0] for row in rows]
+
+    # ---------- Status ----------
+
+    def get_job(self, job_id):
+        row = self._conn().execute(
+            """SELECT id, batch_id, status, recipient, cc, subject, attempts,
+                      next_attempt_at, last_error, created_at, updated_at
+               FROM jobs WHERE id = ?""",
+            (job_id,),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get_batch(self, batch_id):
+        rows = self._conn().execute(
+            "SELECT status, COUNT(*) AS n FROM jobs WHERE batch_id = ? GROUP BY status",
+            (batch_id,),
+        ).fetchall()
+        if not rows:
+            return None
+
+        counts = {row["status"]: row["n"] for row in rows}
+        total = sum(counts.values())
+        done = counts.get(STATUS_SENT, 0) + counts.get(STATUS_DEAD, 0)
+        return {
+            "batch_id": batch_id,
+            "total": total,
+            "counts": counts,
+            "progress": done / total,
+        }
+
+    def stats(self):
+        rows = self._conn().execute(
+            "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"
+        ).fetchall()
+        dead_letters = self._conn().execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+        return {
+            "workers": len(self._threads),
+            "jobs": {row["status"]: row["n"] for row in rows},
+            "dead_letters": dead_letters,
+        }
+
+    # ---------- Worker side ----------
+
+    def _claim(self):
+        now = time.time()
+        conn = self._conn()
+
+        with self._claim_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    """SELECT * FROM jobs
+                       WHERE status = ? AND next_attempt_at <= ?
+                       ORDER BY next_attempt_at LIMIT 1""",
+                    (STATUS_QUEUED, now),
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        """UPDATE jobs SET status = ?, attempts = attempts + 1, owner = ?, heartbeat_at = ?,
+                                            updated_at = ?
+                           WHERE id = ?""",
+                        (STATUS_SENDING, self.owner_id, now, now, row["id"]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        return row
+
+    def _backoff(self, attempts):
+        return min(self.backoff_max_sec, self.backoff_sec * (2 ** (attempts - 1)))
+
+    def _finish(self, job, error=None):
+        now = time.time()
+        attempts = job["attempts"] + 1
+        conn = self._conn()
+
+        # Only while this process still holds the job: once its lease expired
+        # it may have been requeued and claimed by another one
+        owned = "WHERE id = ? AND status = ? AND owner = ?"
+        key = (job["id"], STATUS_SENDING, self.owner_id)
+
+        with conn:
+            if error is None:
+                cursor = conn.execute(
+                    f"UPDATE jobs SET status = ?, last_error = NULL, owner = NULL, updated_at = ? {owned}",
+                    (STATUS_SENT, now, *key),
+                )
+            elif attempts < self.max_attempts:
+                cursor = conn.execute(
+                    f"""UPDATE jobs SET status = ?, last_error = ?, next_attempt_at = ?, owner = NULL,
+                                        updated_at = ?
+                        {owned}""",
+                    (STATUS_QUEUED, error, now + self._backoff(attempts), now, *key),
+                )
+            else:
+                cursor = conn.execute(
+                    f"UPDATE jobs SET status = ?, last_error = ?, owner = NULL, updated_at = ? {owned}",
+                    (STATUS_DEAD, error, now, *key),
+                )
+                if cursor.rowcount:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO dead_letters (job_id, payload, error, failed_at) VALUES (?, ?, ?, ?)",
+                        (job["id"], json.dumps(dict(job)), error, now),
+                    )
+
+        if not cursor.rowcount:
+            print(f"Mail queue lost the lease on job {job['id']}; outcome not recorded")
+
+    def _give_back(self, job):
+        # Not sent and not an attempt: the job goes back as it was claimed
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """UPDATE jobs SET status = ?, attempts = attempts - 1, owner = NULL, updated_at = ?
+                   WHERE id = ? AND status = ? AND owner = ?""",
+                (STATUS_QUEUED, time.time(), job["id"], STATUS_SENDING, self.owner_id),
+            )
+
+    def _process(self, job):
+        # Breakers may have opened since the claim: send_email would fail
+        # without trying anything
+        if not self.available_fn():
+            self._give_back(job)
+            return
+
+        try:
+            success = self.send_fn(
+                recipient_email=job["recipient"],
+                subject=job["subject"],
+                body=job["body"],
+                attachment_path=job["attachment_path"],
+                cc_emails=job["cc"],
+            )
+            error = None if success else "All transports failed"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        self._finish(job, error)
+
+    def _sweep_attachments(self):
+        """
+        Deletes stored attachments that no queued or sending job refers to.
+        Files stored (or re-stored) within the grace period are kept, so an
+        attachment is never removed between store_attachment and
+        enqueue_batch.
+        """
+        if not os.path.isdir(self.attachment_dir):
+            return
+
+        rows = self._conn().execute(
+            "SELECT DISTINCT attachment_path FROM jobs WHERE status IN (?, ?) AND attachment_path IS NOT NULL",
+            (STATUS_QUEUED, STATUS_SENDING),
+        ).fetchall()
+        in_use = {os.path.abspath(row[0]) for row in rows}
+        cutoff = time.time() - self.attachment_grace_sec
+
+        for digest in os.listdir(self.attachment_dir):
+            folder = os.path.join(self.attachment_dir, digest)
+            try:
+                names = os.listdir(folder)
+                for name in names:
+                    path = os.path.join(folder, name)
+                    if os.path.abspath(path) not in in_use and os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                if not os.listdir(folder):
+                    os.rmdir(folder)
+            except OSError:
+                # Another worker (or process) got there first
+                continue
+
+    def _prune_finished(self):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (STATUS_SENT, STATUS_DEAD, time.time() - self.retention_sec),
+            )
+
+    def _requeue_expired(self):
+        """Puts jobs back in the queue whose sender stopped renewing their lease (crash or kill)."""
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                """UPDATE jobs SET status = ?, owner = NULL, updated_at = ?
+                   WHERE status = ? AND COALESCE(heartbeat_at, 0) <= ?""",
+                (STATUS_QUEUED, time.time(), STATUS_SENDING, time.time() - self.lease_sec),
+            )
+        if cursor.rowcount:
+            print(f"Mail queue requeued {cursor.rowcount} interrupted job(s)")
+            self._wakeup.set()
+
+    def _heartbeat_loop(self):
+        while not self._heartbeat_stop.wait(self.lease_sec / 3):
+            try:
+                conn = self._conn()
+                with conn:
+                    conn.execute(
+                        "UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND owner = ?",
+                        (time.time(), STATUS_SENDING, self.owner_id),
+                    )
+            except sqlite3.Error as e:
+                print(f"Mail queue heartbeat failed: {e}")
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        with self._claim_lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + min(60, self.attachment_grace_sec)
+
+        try:
+            self._requeue_expired()
+            self._prune_finished()
+            self._sweep_attachments()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Mail queue cleanup failed: {e}")
+
+    def _worker_loop(self):
+        while not self._stopping.is_set():
+            # Every transport short-circuited: wait rather than burn attempts
+            if not self.available_fn():
+                self._stopping.wait(1.0)
+                continue
+
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                print(f"Mail queue claim failed: {e}")
+                job = None
+
+            if job is None:
+                self._maybe_sweep()
+                self._wakeup.wait(timeout=1.0)
+                self._wakeup.clear()
+                continue
+
+            self._process(job)
+
+    def start(self):
+        if self._threads:
+            return
+
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Jobs left in "sending" by a crashed process; those of live worker
+        # processes keep their lease renewed and are not touched
+        self._requeue_expired()
+
+        self._stopping.clear()
+        self._heartbeat_stop.clear()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="mail-queue-heartbeat", daemon=True)
+        self._heartbeat.start()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"mail-queue-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=10):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        # Only now, so jobs being sent while the workers wound down kept their lease
+        self._heartbeat_stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join(timeout)
+            self._heartbeat = None
+
+
+mail_queue = MailQueue(
+    MAIL_QUEUE_PATH,
+    MAIL_QUEUE_ATTACHMENT_DIR,
+    workers=MAIL_QUEUE_WORKERS,
+    max_attempts=MAIL_QUEUE_MAX_ATTEMPTS,
+    backoff_sec=MAIL_QUEUE_BACKOFF_SECONDS,
+    backoff_max_sec=MAIL_QUEUE_BACKOFF_MAX_SECONDS,
+    attachment_grace_sec=MAIL_QUEUE_ATTACHMENT_GRACE_SECONDS,
+    retention_sec=MAIL_QUEUE_RETENTION_SECONDS,
+    lease_sec=MAIL_QUEUE_LEASE_SECONDS,
+)
@@ -0,0 +1,72 @@
+import html
+import re
+
+# {{ field }} or {{ field | fallback text }}
+_PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][\w.-]*)\s*(?:\|\s*(.*?)\s*)?\}\}")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_field(name):
+    """'First Name' / 'first-name' / 'FIRST_NAME' -> 'first_name'."""
+    return _NON_WORD.sub("_", str(name).strip().lower()).strip("_")
+
+
+class Template:
+    """
+    A mail-merge template compiled once into alternating literal text and
+    field slots, so rendering a contact is a dict lookup per field and one
+    join, with no parsing. With escape=True values are HTML-escaped (for
+    bodies); subjects are rendered as-is.
+    """
+
+    __slots__ = ("source", "fields", "escape", "_head", "_parts")
+
+    def __init__(self, source, escape=False):
+        self.source = source
+        self.escape = escape
+
+        parts = []
+        fields = []
+        position = 0
+        head = None
+
+        for match in _PLACEHOLDER.finditer(source):
+            literal = source[position:match.start()]
+            if head is None:
+                head = literal
+            else:
+                parts[-1][2] = literal
+
+            name = normalize_field(match.group(1))
+            parts.append([name, match.group(2) or "", ""])
+            if name not in fields:
+                fields.append(name)
+            position = match.end()
+
+        if head is None:
+            head = source
+        else:
+            parts[-1][2] = source[position:]
+
+        self._head = head
+        self._parts = tuple((name, html.escape(default) if escape else default, tail)
+                            for name, default, tail in parts)
+        self.fields = tuple(fields)
+
+    def render(self, values):
+        """`values` maps normalized field names to strings; missing/empty ones use the fallback."""
+        out = [self._head]
+        escape = self.escape
+        for name, default, tail in self._parts:
+            value = values.get(name)
+            if value:
+                out.append(html.escape(value) if escape else value)
+            else:
+                out.append(default)
+            out.append(tail)
+        return "".join(out)
+
+    def missing_fields(self, available):
+        """Fields used without a fallback that `available` (field names) does not provide."""
+        available = set(available)
+        return sorted({name for name, default, _ in self._parts if not default and name not in available})
@@ -0,0 +1,226 @@
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers cache hits (sub-ms) up to slow Gemini calls and SMTP sends
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Stage timings of the current request, read by the tracing middleware
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value):
+    return repr(value) if isinstance(value, float) else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield self.name, _format_labels(self.label_names, label_values), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics) with label names."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def totals(self):
+        """{label values: (count, sum)} for every series."""
+        with self._lock:
+            return {labels: (series[-1], series[-2]) for labels, series in self._series.items()}
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+
+        names = self.label_names + ("le",)
+        for label_values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket", _format_labels(names, label_values + (bound,)), cumulative
+            yield f"{self.name}_bucket", _format_labels(names, label_values + ("+Inf",)), series[-1]
+            yield f"{self.name}_sum", _format_labels(self.label_names, label_values), series[-2]
+            yield f"{self.name}_count", _format_labels(self.label_names, label_values), series[-1]
+
+
+class Gauge:
+    """Gauge whose samples are produced on scrape by a callback."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels, collect):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._collect = collect
+
+    def samples(self):
+        for label_values, value in self._collect():
+            yield self.name, _format_labels(self.label_names, label_values), value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name, help_text, labels, collect):
+        return self.register(Gauge(name, help_text, labels, collect))
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics)
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status")
+)
+stage_seconds = registry.histogram(
+    "pipeline_stage_duration_seconds", "Time spent in each request pipeline stage.", ("stage",)
+)
+mail_attempts = registry.counter(
+    "mail_send_attempts_total", "Send attempts per transport and outcome.", ("transport", "outcome")
+)
+mail_fallbacks = registry.counter(
+    "mail_fallbacks_total", "Sends that fell back from one transport to the other.", ("from_transport", "to_transport")
+)
+gemini_queue_wait = registry.histogram(
+    "gemini_queue_wait_seconds", "Time Gemini calls waited for request/token quota.", ("priority",)
+)
+gemini_retries = registry.counter(
+    "gemini_retries_total", "Gemini calls retried after a 429 or 5xx response.", ("reason",)
+)
+speculation_events = registry.counter(
+    "regenerate_speculation_total", "Speculative regenerate variants by outcome.", ("outcome",)
+)
+campaign_sends = registry.counter(
+    "campaign_sends_total", "Campaign send attempts by outcome.", ("outcome",)
+)
+circuit_transitions = registry.counter(
+    "circuit_breaker_transitions_total", "Circuit breaker state changes.", ("breaker", "from_state", "to_state")
+)
+
+
+@contextmanager
+def stage(name):
+    """
+    Times a pipeline stage: recorded in the stage histogram and, when running
+    inside a traced request, in that request's Server-Timing header.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def record_stage(name, elapsed):
+    stage_seconds.observe(elapsed, name)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append((name, elapsed))
+
+
+def timed_stage(name):
+    """Decorator form of stage()."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_trace():
+    """Starts collecting stage timings for the current request context."""
+    trace = []
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+
+def server_timing(trace):
+    """Server-Timing header value; repeated stages are summed."""
+    totals = {}
+    for name, elapsed in trace:
+        totals[name] = totals.get(name, 0.0) + elapsed
+    return ", ".join(f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in totals.items())
@@ -0,0 +1,211 @@
+import base64
+import hashlib
+import logging
+import mimetypes
+import os
+import secrets
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.message import EmailMessage, MIMEPart
+from email.policy import SMTP
+from email.utils import getaddresses
+from functools import cached_property
+
+from body_format import format_body
+from config import MAX_ATTACHMENT_SIZE
+from metrics import timed_stage
+from shared_state import shared_cache
+
+logger = logging.getLogger(f"hotpath.{__name__}")
+
+# Encoded attachment parts kept for reuse (the same resume on every send)
+ATTACHMENT_PART_CACHE_SIZE = 16
+
+
+@dataclass(frozen=True)
+class PreparedMessage:
+    """
+    A fully composed message, shared by the OAuth and SMTP transports. `raw`
+    is the serialized RFC 5322 message; the Gmail API form is derived from it
+    lazily and only once.
+    """
+    sender: str
+    recipient: str
+    cc: str | None
+    subject: str
+    raw: bytes
+
+    @cached_property
+    def gmail_raw(self):
+        return base64.urlsafe_b64encode(self.raw).decode()
+
+    @cached_property
+    def envelope_recipients(self):
+        headers = [self.recipient] + ([self.cc] if self.cc else [])
+        return [address for _, address in getaddresses(headers) if address]
+
+
+class AttachmentPartCache:
+    """
+    LRU of serialized (base64-encoded, header-included) attachment parts keyed
+    by content hash + filename, optionally backed by a store shared with the
+    other worker processes (shared_state.SharedNamespace).
+    """
+
+    def __init__(self, max_entries, shared=None):
+        self.max_entries = max_entries
+        self.shared = shared
+        self._parts = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get_or_build(self, file_name, file_data, digest=None):
+        digest = digest or hashlib.sha256(file_data).hexdigest()
+        key = (digest, file_name)
+
+        with self._lock:
+            part = self._parts.get(key)
+            if part is not None:
+                self._parts.move_to_end(key)
+                self.hits += 1
+                return part
+
+        shared_key = f"{digest}:{file_name}"
+        part = self.shared.get(shared_key) if self.shared is not None else None
+
+        with self._lock:
+            if part is None:
+                self.misses += 1
+            else:
+                self.shared_hits += 1
+
+        if part is None:
+            part = build_attachment_part(file_name, file_data)
+            if self.shared is not None:
+                self.shared.put(shared_key, part)
+
+        with self._lock:
+            self._parts[key] = part
+            while len(self._parts) > self.max_entries:
+                self._parts.popitem(last=False)
+        return part
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._parts),
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+            }
+
+
+def build_attachment_part(file_name, file_data):
+    ctype, encoding = mimetypes.guess_type(file_name)
+    if ctype is None:
+        ctype = 'application/octet-stream'
+    maintype, subtype = ctype.split('/', 1)
+
+    part = MIMEPart()
+    part.set_content(file_data, maintype=maintype, subtype=subtype, filename=file_name)
+    return part.as_bytes(policy=SMTP)
+
+
+attachment_parts = AttachmentPartCache(
+    ATTACHMENT_PART_CACHE_SIZE,
+    shared=shared_cache.namespace("mime_part") if shared_cache else None,
+)
+
+
+def load_attachment(attachment_path=None, attachment=None):
+    """
+    Returns (file_name, data) for a path on disk or an in-memory
+    (filename, data) pair, or None if there is nothing (valid) to attach.
+    """
+    if attachment is not None:
+        file_name, file_data = attachment
+        file_size = len(file_data)
+        logger.info("In-memory attachment provided: %s — size = %d bytes", file_name, file_size)
+    elif attachment_path:
+        logger.info("Attachment path provided: %s", attachment_path)
+        if not os.path.exists(attachment_path):
+            logger.warning("Attachment file does not exist at %s", attachment_path)
+            return None
+        file_name = os.path.basename(attachment_path)
+        file_size = os.path.getsize(attachment_path)
+        file_data = None
+        logger.info("Attachment exists — size = %d bytes", file_size)
+    else:
+        return None
+
+    if file_size > MAX_ATTACHMENT_SIZE:
+        logger.warning("Attachment is larger than 25MB. Gmail may not attach this file directly.")
+        # you can either skip attaching or handle uploading to cloud here
+        return None
+
+    if file_data is None:
+        with open(attachment_path, 'rb') as f:
+            file_data = f.read()
+
+    return file_name, file_data
+
+
+@timed_stage("mime_compose")
+def compose_message(sender, recipient_email, subject, body, cc_emails=None,
+                    attachment_path=None, attachment=None):
+    """
+    Builds the message once; both transports send the returned PreparedMessage.
+    The HTML body is sanitised and sent as multipart/alternative with a
+    plain-text rendering.
+    """
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = recipient_email
+    message['Subject'] = subject
+    if cc_emails:
+        message['Cc'] = cc_emails
+
+    # Plain-text part first, HTML last: clients show the last part they support
+    formatted = format_body(body)
+    message.set_content(formatted.text)
+    message.add_alternative(formatted.html, subtype="html")
+
+    loaded = load_attachment(attachment_path, attachment)
+    if loaded:
+        file_name, file_data = loaded
+        raw = _splice_attachment(message, attachment_parts.get_or_build(file_name, file_data))
+        logger.info("Attached file: %s", file_name)
+    else:
+        raw = message.as_bytes(policy=SMTP)
+
+    return PreparedMessage(
+        sender=sender,
+        recipient=recipient_email,
+        cc=cc_emails,
+        subject=subject,
+        raw=raw,
+    )
+
+
+def _splice_attachment(message, part_bytes):
+    """
+    Serializes message as multipart/mixed and inserts the already serialized
+    attachment part before the closing delimiter. The email generator walks
+    base64 payloads line by line, which is the bulk of compose time for large
+    attachments; splicing skips that for the cached part. Base64 lines can't
+    contain '-', so they can never collide with the boundary.
+    """
+    boundary = f"==============={secrets.token_hex(12)}=="
+    message.make_mixed()
+    message.set_boundary(boundary)
+
+    head = message.as_bytes(policy=SMTP)
+    closing = f"--{boundary}--".encode()
+    at = head.rindex(closing)
+
+    if not part_bytes.endswith(b"\r\n"):
+        part_bytes += b"\r\n"
+    return b"".join((head[:at], f"--{boundary}\r\n".encode(), part_bytes, head[at:]))
@@ -0,0 +1,88 @@
+import os
+import threading
+from dataclasses import dataclass, field
+
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+from config import (
+    GENERATE_MODEL,
+    GENERATE_TEMPERATURE,
+    GENERATE_MAX_OUTPUT_TOKENS,
+    REGENERATE_MODEL,
+    REGENERATE_TEMPERATURE,
+    REGENERATE_MAX_OUTPUT_TOKENS,
+    GEMINI_WARMUP_PING,
+)
+
+load_dotenv()
+
+genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    name: str
+    generation_config: dict = field(default_factory=dict)
+
+
+def _generation_config(temperature, max_output_tokens):
+    config = {}
+    if temperature is not None:
+        config["temperature"] = temperature
+    if max_output_tokens is not None:
+        config["max_output_tokens"] = max_output_tokens
+    return config
+
+
+# Which model/settings each endpoint uses
+MODEL_SPECS = {
+    "generate": ModelSpec(GENERATE_MODEL, _generation_config(GENERATE_TEMPERATURE, GENERATE_MAX_OUTPUT_TOKENS)),
+    "regenerate": ModelSpec(REGENERATE_MODEL, _generation_config(REGENERATE_TEMPERATURE, REGENERATE_MAX_OUTPUT_TOKENS)),
+}
+
+_models = {}
+_lock = threading.Lock()
+
+
+def get_spec(purpose):
+    return MODEL_SPECS[purpose]
+
+
+def get_model(purpose):
+    """
+    Returns the GenerativeModel for `purpose`, creating it on first use. All
+    models share the SDK's process-wide generative client, so the underlying
+    channel and its keep-alive connection are reused across requests.
+    """
+    model = _models.get(purpose)
+    if model is not None:
+        return model
+
+    with _lock:
+        if purpose not in _models:
+            spec = MODEL_SPECS[purpose]
+            _models[purpose] = genai.GenerativeModel(
+                spec.name,
+                generation_config=spec.generation_config or None,
+            )
+        return _models[purpose]
+
+
+def warm_up():
+    """
+    Creates every configured model up front and, if GEMINI_WARMUP_PING is set,
+    opens the connection with a count_tokens call (not billed as generation)
+    so the first user request doesn't pay client and TLS setup.
+    """
+    pinged = set()
+
+    for purpose, spec in MODEL_SPECS.items():
+        model = get_model(purpose)
+
+        if GEMINI_WARMUP_PING and spec.name not in pinged:
+            try:
+                model.count_tokens("ping")
+                pinged.add(spec.name)
+            except Exception as e:
+                print(f"Gemini warm-up ping for {spec.name} failed: {e}")
@@ -1,9 +1,27 @@
+import io
+
 import pdfplumber
 from urllib.parse import urlparse
 
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+from pdfminer.utils import decode_text
+
+from config import PDF_BACKEND, PDF_MAX_PAGES
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # optional faster backend
+    pdfium = None
+
+BACKENDS = ("pdfplumber", "pypdfium2")
+
+
 def friendly_text_from_url(url):
     url = url.lower()
-    
+
     if url.startswith("mailto:"):
         return "Email"
     if url.startswith("tel:"):
@@ -22,28 +40,138 @@ def friendly_text_from_url(url):
         return None
 
 
-def extract_text_from_pdf(pdf_path):
-    full_text = ""
+def resolve_backend(backend=None):
+    backend = (backend or PDF_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend '{backend}', expected one of {BACKENDS}")
+    if backend == "pypdfium2" and pdfium is None:
+        print("pypdfium2 is not installed, falling back to pdfplumber.")
+        return "pdfplumber"
+    return backend
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+def _page_cap(max_pages):
+    """Effective page cap, or None for no limit."""
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    return max_pages or None
+
+
+def _pdfminer_document(source):
+    # pdfminer reads objects lazily, so a path is loaded up front rather than
+    # handing it a file that would be closed before the document is walked
+    if not hasattr(source, "read"):
+        with open(source, "rb") as f:
+            source = io.BytesIO(f.read())
+    return PDFDocument(PDFParser(_rewind(source)))
+
+
+def count_pages(source):
+    """Page count from the page tree root, without laying out any page."""
+    document = _pdfminer_document(source)
+    pages = resolve1(document.catalog.get("Pages"))
+    count = resolve1(pages.get("Count")) if isinstance(pages, dict) else None
+    if isinstance(count, int):
+        return count
+    return sum(1 for _ in PDFPage.create_pages(document))
+
+
+def _page_texts_pdfplumber(source, start, stop):
+    with pdfplumber.open(_rewind(source)) as pdf:
+        return [(page.extract_text() or "") for page in pdf.pages[start:stop]]
+
+
+def _page_texts_pdfium(source, start, stop):
+    pdf = pdfium.PdfDocument(_rewind(source))
+    try:
+        texts = []
+        stop = len(pdf) if stop is None else min(stop, len(pdf))
+        for index in range(start, stop):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            texts.append(textpage.get_text_bounded().replace("\r\n", "\n").replace("\r", "\n"))
+            textpage.close()
+            page.close()
+        return texts
+    finally:
+        pdf.close()
+
+
+def extract_page_texts(source, start=0, stop=None, backend=None):
+    """Text of pages [start, stop), one string per page. stop=None reads to the end."""
+    if resolve_backend(backend) == "pypdfium2":
+        return _page_texts_pdfium(source, start, stop)
+    return _page_texts_pdfplumber(source, start, stop)
+
+
+def _link_url(annot):
+    annot = resolve1(annot)
+    if not isinstance(annot, dict):
+        return None
+
+    url = resolve1(annot.get("URI"))
+    action = resolve1(annot.get("A"))
+    if not url and isinstance(action, dict):
+        url = resolve1(action.get("URI"))
+
+    if isinstance(url, bytes):
+        url = decode_text(url)
+    return url or None
+
+
+def extract_links(source, max_pages=None):
+    """
+    Link annotations only. Walks the page objects with pdfminer's low-level
+    API, so no page content is parsed or laid out.
+    """
+    document = _pdfminer_document(source)
+    limit = _page_cap(max_pages)
     links = []
 
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            full_text += (page.extract_text() or "") + "\n"
+    for index, page in enumerate(PDFPage.create_pages(document)):
+        if limit and index >= limit:
+            break
+        for annot in resolve1(page.annots) or []:
+            url = _link_url(annot)
+            if not url:
+                continue
+
+            # Auto-generate meaningful text
+            links.append({
+                "url": url,
+                "text": friendly_text_from_url(url)
+            })
+
+    return links
+
+
+def page_ranges(page_count, chunks):
+    """Splits [0, page_count) into at most `chunks` contiguous ranges."""
+    chunks = max(1, min(chunks, page_count))
+    size, extra = divmod(page_count, chunks)
+    ranges, start = [], 0
+    for i in range(chunks):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
 
-            if page.annots:
-                for annot in page.annots:
-                    url = annot.get("uri")
-                    if not url and isinstance(annot.get("A"), dict):
-                        url = annot["A"].get("URI")
-                    if not url:
-                        continue
 
-                    # Auto-generate meaningful text
-                    text = friendly_text_from_url(url)
+def join_pages(texts):
+    return "\n".join(texts).strip()
 
-                    links.append({
-                        "url": url,
-                        "text": text
-                    })
 
-    return full_text.strip(), links
+def extract_text_from_pdf(pdf_path, backend=None, max_pages=None):
+    """
+    (text, links) for a PDF path or binary file object. Pages past the
+    PDF_MAX_PAGES cap (or max_pages) are skipped entirely.
+    """
+    cap = _page_cap(max_pages)
+    texts = extract_page_texts(pdf_path, 0, cap, backend)
+    links = extract_links(pdf_path, max_pages)
+    return join_pages(texts), links
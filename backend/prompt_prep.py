@@ -0,0 +1,220 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+from config import (
+    PROMPT_CONDENSE_ENABLED,
+    PROMPT_RESUME_TOKEN_BUDGET,
+    PROMPT_JD_TOKEN_BUDGET,
+    PROMPT_CONDENSE_CACHE_SIZE,
+)
+
+CHARS_PER_TOKEN = 4
+
+_SPACES = re.compile(r"[ \t\u00a0]+")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_BOILERPLATE = re.compile(
+    r"^(?:page\s*\d+(?:\s*(?:of|/)\s*\d+)?|\d{1,3}|curriculum vitae|resume|cv"
+    r"|references?\s+(?:are\s+)?available\s+(?:up)?on\s+request\.?"
+    r"|i hereby declare.*)$",
+    re.IGNORECASE,
+)
+_HEADING = re.compile(
+    r"^(?P<title>contact(?: information| details)?|personal (?:details|information)"
+    r"|(?:professional |career )?summary|profile|objective|about me"
+    r"|(?:technical |key |core )?skills(?: & tools| and tools)?|core competencies|technologies|tech stack"
+    r"|(?:work |professional |relevant )?experience|employment history|internships?"
+    r"|(?:personal |key |academic )?projects|education|certifications?|achievements|awards"
+    r"|hobbies|interests|languages|references|declaration)\s*:?$",
+    re.IGNORECASE,
+)
+
+# Canonical section per heading keyword, first match wins; order of
+# SECTION_PRIORITY decides what survives when the budget is tight. Sections
+# not listed are dropped. "project" comes before "personal", so "Personal
+# Projects" is not taken for contact details.
+_SECTION_KEYWORDS = (
+    ("project", "projects"),
+    ("contact", "contact"), ("personal", "contact"),
+    ("summary", "summary"), ("profile", "summary"), ("objective", "summary"), ("about", "summary"),
+    ("skill", "skills"), ("competenc", "skills"), ("technolog", "skills"), ("stack", "skills"),
+    ("experience", "experience"), ("employment", "experience"), ("intern", "experience"),
+    ("language", "skills"),
+    ("education", "education"),
+    ("certif", "certifications"), ("achievement", "certifications"), ("award", "certifications"),
+)
+SECTION_PRIORITY = ("header", "contact", "skills", "experience", "summary", "projects", "education", "certifications")
+
+
+def estimate_tokens(text):
+    """Cheap local estimate (~4 characters per token for English text)."""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text, budget):
+    if estimate_tokens(text) <= budget:
+        return text
+    if budget <= 0:
+        return ""
+
+    cut = text[:budget * CHARS_PER_TOKEN - 1]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    if boundary > len(cut) // 2:
+        cut = cut[:boundary]
+    return cut.rstrip() + "…"
+
+
+def clean_lines(text):
+    """Normalizes whitespace, drops boilerplate and repeated lines (e.g. per-page headers)."""
+    seen = set()
+    lines = []
+
+    for raw in text.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        line = _SPACES.sub(" ", raw).strip()
+        if not line or _BOILERPLATE.match(line):
+            continue
+
+        key = line.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+
+    return lines
+
+
+def _section_name(title):
+    title = title.lower()
+    for keyword, section in _SECTION_KEYWORDS:
+        if keyword in title:
+            return section
+    return None
+
+
+def split_sections(lines):
+    """
+    Groups resume lines under canonical section names. Lines before the first
+    heading (name, phone, links) go under "header".
+    """
+    sections = OrderedDict(header=[])
+    current = "header"
+
+    for line in lines:
+        match = _HEADING.match(line) if len(line) <= 40 else None
+        if match:
+            current = _section_name(match.group("title")) or "_dropped"
+            sections.setdefault(current, [])
+            continue
+        sections.setdefault(current, []).append(line)
+
+    return sections
+
+
+def _condense_resume(text, budget):
+    sections = split_sections(clean_lines(text))
+
+    if len(sections) == 1:
+        return truncate_to_tokens("\n".join(sections["header"]), budget)
+
+    parts = []
+    remaining = budget
+
+    for name in SECTION_PRIORITY:
+        lines = sections.get(name)
+        if not lines or remaining <= 0:
+            continue
+
+        block = "\n".join(lines)
+        if name != "header":
+            block = f"{name.upper()}:\n{block}"
+
+        block = truncate_to_tokens(block, remaining)
+        remaining -= estimate_tokens(block) + 1
+        parts.append(block)
+
+    return "\n".join(parts)
+
+
+class PrepStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def record(self, before, after):
+        with self._lock:
+            self.tokens_in += before
+            self.tokens_out += after
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "tokens_in": self.tokens_in,
+                "tokens_out": self.tokens_out,
+                "tokens_saved": self.tokens_in - self.tokens_out,
+                "condense_cache_hits": self.cache_hits,
+                "condense_cache_misses": self.cache_misses,
+            }
+
+
+prep_stats = PrepStats()
+_condensed = OrderedDict()
+_condensed_lock = threading.Lock()
+
+
+def condense_resume(text, budget=PROMPT_RESUME_TOKEN_BUDGET):
+    """
+    Keeps contact, skills and experience (then summary/projects/education as
+    the budget allows) and caps the result at `budget` estimated tokens.
+    Results are cached by hash of the resume text.
+    """
+    if not text or not PROMPT_CONDENSE_ENABLED:
+        return text
+
+    key = hashlib.sha256(f"{budget}:{text}".encode("utf-8")).hexdigest()
+
+    with _condensed_lock:
+        condensed = _condensed.get(key)
+        if condensed is not None:
+            _condensed.move_to_end(key)
+            prep_stats.cache_hits += 1
+
+    if condensed is None:
+        condensed = _condense_resume(text, budget)
+        with _condensed_lock:
+            prep_stats.cache_misses += 1
+            _condensed[key] = condensed
+            while len(_condensed) > PROMPT_CONDENSE_CACHE_SIZE:
+                _condensed.popitem(last=False)
+
+    prep_stats.record(estimate_tokens(text), estimate_tokens(condensed))
+    return condensed
+
+
+def condense_jd(text, budget=PROMPT_JD_TOKEN_BUDGET):
+    """
+    Cleans the JD and caps it at `budget`. Lines with email addresses are
+    always kept, since recipient/CC detection depends on them.
+    """
+    if not text or not PROMPT_CONDENSE_ENABLED:
+        return text
+
+    lines = clean_lines(text)
+    condensed = "\n".join(lines)
+
+    if estimate_tokens(condensed) > budget:
+        email_lines = [line for line in lines if _EMAIL.search(line)]
+        reserved = estimate_tokens("\n".join(email_lines))
+        condensed = truncate_to_tokens(condensed, max(0, budget - reserved))
+        missing = [line for line in email_lines if line not in condensed]
+        if missing:
+            condensed = "\n".join([condensed] + missing)
+
+    prep_stats.record(estimate_tokens(text), estimate_tokens(condensed))
+    return condensed
+
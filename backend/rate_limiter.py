@@ -0,0 +1,188 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+
+# Lower value = served first
+INTERACTIVE = 0
+BATCH = 1
+SPECULATIVE = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", SPECULATIVE: "speculative"}
+
+
+class QuotaTimeout(Exception):
+    """Raised when a call waited longer than the scheduler's timeout for quota."""
+
+    def __init__(self, name, waited, retry_after):
+        super().__init__(f"{name} quota exhausted (waited {waited:.1f}s)")
+        self.name = name
+        self.waited = waited
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Refills at `per_minute` units per minute up to `burst_seconds` worth of
+    quota. The level may go negative when a call turns out to cost more than
+    was reserved; later calls then wait for the debt to refill.
+    """
+
+    def __init__(self, per_minute, burst_seconds, clock):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` units are available (amounts above capacity count as a full bucket)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount):
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+    def drain(self):
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+
+class QuotaScheduler:
+    """
+    Admits calls against a requests-per-minute and a tokens-per-minute budget
+    (either may be 0 for unlimited). Callers that cannot be admitted queue in
+    priority order, FIFO within a priority, instead of failing; only the head
+    of the queue may take quota, so a batch burst cannot starve an
+    interactive call that arrives later.
+    """
+
+    def __init__(self, name, requests_per_minute=0, tokens_per_minute=0, burst_seconds=10,
+                 timeout=None, on_wait=None, clock=time.monotonic):
+        self.name = name
+        self.timeout = timeout
+        self.on_wait = on_wait
+        self._clock = clock
+        self._requests = TokenBucket(requests_per_minute, burst_seconds, clock) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute, burst_seconds, clock) if tokens_per_minute > 0 else None
+
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self.admitted = {}
+        self.waited_seconds = {}
+        self.timeouts = 0
+        self.throttled = 0
+        self.max_queue_depth = 0
+
+    def _wait_time(self, tokens):
+        # Caller must hold self._cond
+        wait = 0.0
+        if self._requests is not None:
+            wait = self._requests.wait_time(1)
+        if self._tokens is not None:
+            wait = max(wait, self._tokens.wait_time(tokens))
+        return wait
+
+    def acquire(self, tokens=0, priority=INTERACTIVE, timeout=None):
+        """
+        Blocks until one request and `tokens` estimated tokens are available.
+        Returns the seconds spent waiting; raises QuotaTimeout after `timeout`
+        (default: the scheduler's) seconds.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = self._clock()
+        deadline = start + timeout if timeout is not None else None
+        ticket = (priority, next(self._seq))
+
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            try:
+                while True:
+                    wait = self._wait_time(tokens) if self._queue[0] == ticket else None
+                    if wait == 0.0:
+                        break
+
+                    remaining = deadline - self._clock() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        self.timeouts += 1
+                        waited = self._clock() - start
+                        raise QuotaTimeout(self.name, waited, max(1, round(wait or 0)))
+
+                    # Non-head waiters sleep until the head is admitted or leaves
+                    if wait is None:
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait(wait if remaining is None else min(wait, remaining))
+            except BaseException:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+                raise
+
+            heapq.heappop(self._queue)
+            if self._requests is not None:
+                self._requests.take(1)
+            if self._tokens is not None:
+                self._tokens.take(tokens)
+
+            waited = self._clock() - start
+            self.admitted[priority] = self.admitted.get(priority, 0) + 1
+            self.waited_seconds[priority] = self.waited_seconds.get(priority, 0.0) + waited
+            self._cond.notify_all()
+
+        if self.on_wait is not None:
+            self.on_wait(priority, waited)
+        return waited
+
+    def settle(self, reserved, actual):
+        """Corrects the token budget once a call's real usage is known."""
+        if self._tokens is None or actual is None:
+            return
+        with self._cond:
+            self._tokens.adjust(actual - reserved)
+            self._cond.notify_all()
+
+    def throttle(self):
+        """
+        The backend rejected a call for quota (429): empty the request bucket
+        so queued callers back off too instead of each discovering it.
+        """
+        with self._cond:
+            self.throttled += 1
+            if self._requests is not None:
+                self._requests.drain()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "max_queue_depth": self.max_queue_depth,
+                "requests_per_minute": round(self._requests.rate * 60) if self._requests else None,
+                "tokens_per_minute": round(self._tokens.rate * 60) if self._tokens else None,
+                "request_budget": round(self._requests.level, 2) if self._requests else None,
+                "token_budget": round(self._tokens.level) if self._tokens else None,
+                "admitted": {PRIORITY_NAMES.get(p, str(p)): n for p, n in self.admitted.items()},
+                "mean_wait_ms": {
+                    PRIORITY_NAMES.get(p, str(p)): round(total / self.admitted[p] * 1000, 1)
+                    for p, total in self.waited_seconds.items()
+                },
+                "timeouts": self.timeouts,
+                "throttled": self.throttled,
+            }
+
+
+def backoff_delay(attempt, base, cap, rng=random):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return rng.uniform(0, min(cap, base * (2 ** attempt)))
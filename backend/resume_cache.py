@@ -0,0 +1,267 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from parse_resume_pdf import (
+    extract_text_from_pdf, extract_page_texts, extract_links, count_pages, page_ranges, join_pages
+)
+from config import RESUME_CACHE_SIZE, RESUME_CACHE_DIR, PDF_MAX_PAGES, PDF_PARALLEL_MIN_PAGES, CPU_POOL_WORKERS
+from executor import cpu_pool, run_cpu, run_io
+from metrics import stage
+from shared_state import shared_cache
+
+
+def resume_digest(data: bytes) -> str:
+    """Content address of an uploaded resume."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResumeParseCache:
+    """
+    Caches extract_text_from_pdf results keyed by the SHA-256 of the PDF bytes.
+    Memory tier is a bounded LRU; the optional disk tier keeps one JSON file
+    per digest so parsed resumes survive restarts. With a `shared` store
+    (shared_state.SharedNamespace) parses are also visible to the other
+    worker processes.
+
+    Use get_async/put_async on the event loop: they only leave the loop (for
+    the I/O pool) when the shared or disk tier has to be read or written.
+    """
+
+    def __init__(self, max_entries=128, disk_dir=None, shared=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _remember(self, key, value):
+        # Caller must hold self._lock
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_shared(self, key):
+        if self.shared is None:
+            return None
+        stored = self.shared.get(key)
+        if stored is None:
+            return None
+        text, links = json.loads(stored)
+        return text, links
+
+    def _write_shared(self, key, value):
+        if self.shared is not None:
+            self.shared.put(key, json.dumps(value).encode("utf-8"))
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            return stored["text"], stored["links"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key, value):
+        if not self.disk_dir:
+            return
+        text, links = value
+        os.makedirs(self.disk_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"text": text, "links": links}, f)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            print(f"Could not persist parsed resume {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @property
+    def _persistent(self):
+        return self.shared is not None or bool(self.disk_dir)
+
+    def _get_memory(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        return None
+
+    def get(self, key):
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+        return self._get_stored(key)
+
+    async def get_async(self, key):
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+        if not self._persistent:
+            with self._lock:
+                self.misses += 1
+            return None
+        return await run_io(self._get_stored, key)
+
+    def _get_stored(self, key):
+        value = self._read_shared(key)
+        tier = "shared_hits"
+        if value is None:
+            value = self._read_disk(key)
+            tier = "disk_hits"
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            setattr(self, tier, getattr(self, tier) + 1)
+            self._remember(key, value)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+        self._write_stored(key, value)
+
+    async def put_async(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+        if self._persistent:
+            await run_io(self._write_stored, key, value)
+
+    def _write_stored(self, key, value):
+        self._write_shared(key, value)
+        self._write_disk(key, value)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits + self.shared_hits) / lookups if lookups else 0.0,
+            }
+
+
+resume_cache = ResumeParseCache(
+    max_entries=RESUME_CACHE_SIZE,
+    disk_dir=RESUME_CACHE_DIR,
+    shared=shared_cache.namespace("resume_parse") if shared_cache else None,
+)
+
+
+def parse_pdf_bytes(data: bytes):
+    """Uncached parse. Module-level so it can run in the process pool."""
+    return extract_text_from_pdf(io.BytesIO(data))
+
+
+def parse_pdf_file(path: str):
+    """Uncached parse of a PDF file. Runs in the process pool."""
+    return extract_text_from_pdf(path)
+
+
+def parse_pdf_pages(path: str, start: int, stop: int):
+    """Text of pages [start, stop). Runs in the process pool."""
+    return extract_page_texts(path, start, stop)
+
+
+def parse_pdf_links(path: str, max_pages: int):
+    return extract_links(path, max_pages)
+
+
+def parse_short_pdf(path: str, min_pages: int):
+    """
+    (result, page count): parses the PDF right away if it has fewer than
+    `min_pages` pages (after the PDF_MAX_PAGES cap), otherwise result is None
+    and the caller splits the parse by page. Runs in the process pool.
+    """
+    page_count = count_pages(path)
+    if PDF_MAX_PAGES:
+        page_count = min(page_count, PDF_MAX_PAGES)
+    if page_count < min_pages:
+        return parse_pdf_file(path), page_count
+    return None, page_count
+
+
+def _worker_path(file):
+    """
+    A path the CPU pool workers can open `file` by, or None. An upload
+    spooled to disk is an unnamed temporary file, reachable through its
+    descriptor in /proc (Linux); one still held in memory has no path.
+    """
+    if getattr(file, "_rolled", True) is False:
+        # SpooledTemporaryFile below its size limit: fileno() would write it out
+        return None
+
+    name = getattr(file, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        return name
+    try:
+        fd = file.fileno()
+    except (OSError, ValueError, io.UnsupportedOperation):
+        return None
+    path = f"/proc/{os.getpid()}/fd/{fd}"
+    return path if os.path.exists(path) else None
+
+
+async def parse_pdf_file_async(path: str):
+    """
+    Uncached parse on the CPU pool. Short PDFs are parsed by the worker that
+    counts their pages; longer ones are split into contiguous page ranges
+    (one per worker) plus a separate link-annotation pass, and the page texts
+    are joined in order. Jobs get the path, so the PDF is never pickled.
+    """
+    with stage("pdf_parse"):
+        if CPU_POOL_WORKERS < 2:
+            return await run_cpu(parse_pdf_file, path)
+
+        result, page_count = await run_cpu(parse_short_pdf, path, max(PDF_PARALLEL_MIN_PAGES, 2))
+        if result is not None:
+            return result
+
+        ranges = page_ranges(page_count, CPU_POOL_WORKERS)
+        page_jobs = [cpu_pool.submit(parse_pdf_pages, path, start, stop) for start, stop in ranges]
+        links_job = cpu_pool.submit(parse_pdf_links, path, page_count)
+
+        chunks = await asyncio.gather(*page_jobs)
+        links = await links_job
+        return join_pages(text for chunk in chunks for text in chunk), links
+
+
+async def parse_pdf_upload_async(file):
+    """
+    Uncached parse of an uploaded PDF's spooled file, without copying it:
+    one spooled to disk is opened by the workers themselves (see
+    parse_pdf_file_async); a small one still in memory goes to a single
+    worker as is.
+    """
+    path = _worker_path(file)
+    if path is not None:
+        return await parse_pdf_file_async(path)
+
+    file.seek(0)
+    data = file.read()
+    file.seek(0)
+    with stage("pdf_parse"):
+        return await run_cpu(parse_pdf_bytes, data)
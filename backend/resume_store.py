@@ -0,0 +1,68 @@
+import os
+import re
+import uuid
+
+from config import RESUME_STORE_DIR
+from resume_cache import resume_digest, resume_cache, parse_pdf_file_async
+from executor import run_io
+
+_RESUME_ID = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ResumeStore:
+    """
+    Content-addressed resume storage. A resume's ID is the SHA-256 of its
+    bytes (the same key resume_cache uses), and the file is kept under
+    <root>/<id>/<original filename> so it can be attached as-is. The root
+    directory is created by the first save.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def save(self, data: bytes, filename: str):
+        resume_id = resume_digest(data)
+        folder = os.path.join(self.root, resume_id)
+
+        if self.path(resume_id) is None:
+            os.makedirs(folder, exist_ok=True)
+            target = os.path.join(folder, os.path.basename(filename or "") or "resume.pdf")
+            tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, target)
+
+        return resume_id
+
+    def path(self, resume_id):
+        """Path of the stored PDF, or None if the ID is unknown/invalid."""
+        if not _RESUME_ID.match(resume_id or ""):
+            return None
+
+        folder = os.path.join(self.root, resume_id)
+        if not os.path.isdir(folder):
+            return None
+
+        for name in os.listdir(folder):
+            if not name.endswith(".tmp"):
+                return os.path.join(folder, name)
+        return None
+
+
+resume_store = ResumeStore(RESUME_STORE_DIR)
+
+
+async def parsed_resume(resume_id):
+    """(text, links) for a stored resume; re-parses only if evicted from the cache."""
+    cached = await resume_cache.get_async(resume_id)
+    if cached is not None:
+        return cached
+
+    path = await run_io(resume_store.path, resume_id)
+    if path is None:
+        return None
+
+    # Parsed straight from the stored file
+    result = await parse_pdf_file_async(path)
+    await resume_cache.put_async(resume_id, result)
+    return result
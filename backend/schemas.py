@@ -16,6 +16,21 @@ class GenerateEmailResponse(BaseModel):
     data: GenerateEmailData
 
 
+class ResumeUploadResponse(BaseModel):
+    status: str
+    resume_id: str
+    filename: str
+    size: int
+
+
+class GenerateBatchItem(BaseModel):
+    index: int
+    status: str
+    data: Optional[GenerateEmailData] = None
+    error_code: Optional[int] = None
+    message: Optional[str] = None
+
+
 class SendEmailResponse(BaseModel):
     status: str
     recipient: List[EmailStr]
@@ -28,6 +43,39 @@ class RegenerateResponse(BaseModel):
     body: str
 
 
+class BatchSendResponse(BaseModel):
+    status: str
+    batch_id: str
+    job_ids: List[str]
+
+
+class JobStatusResponse(BaseModel):
+    status: str
+    job: Optional[dict] = None
+    batch: Optional[dict] = None
+
+
+class CampaignResponse(BaseModel):
+    status: str
+    campaign_id: str
+    total: int
+    invalid: int
+    missing_fields: List[str]
+    subject_template: str
+    body_template: str
+    started: bool
+
+
+class CampaignStatusResponse(BaseModel):
+    status: str
+    campaign: dict
+
+
+class CampaignRecipientsResponse(BaseModel):
+    status: str
+    recipients: List[dict]
+
+
 # ---------- REQUEST MODELS ----------
 
 class SendEmailRequest(BaseModel):
@@ -37,6 +85,13 @@ class SendEmailRequest(BaseModel):
     cc: Optional[List[EmailStr]] = None
 
 
+class BatchEmailItem(BaseModel):
+    recipient: str = Field(..., min_length=1)
+    subject: str = Field(..., min_length=1)
+    body: str = Field(..., min_length=1)
+    cc: Optional[str] = None
+
+
 class RegenerateRequest(BaseModel):
     original_body: str = Field(..., min_length=1)
     instruction: Optional[str] = None
@@ -0,0 +1,95 @@
+"""
+Starts the API with one worker process per CPU core (or --workers N).
+
+    cd backend && python serve.py [--workers N] [--host 0.0.0.0] [--port 8000]
+
+With gunicorn installed the app is imported once in the master and the
+workers are forked from it (--preload), so startup cost and read-only pages
+are shared. Without it, uvicorn's own supervisor starts N independent
+workers.
+
+What the workers share:
+  - SHARED_CACHE_DB: parsed resumes, attachment MIME parts, Gemini responses
+  - token.json: refreshed under a file lock and replaced atomically
+  - the mail queue database (jobs are claimed with BEGIN IMMEDIATE)
+The client-side Gemini quota is split evenly between the workers.
+Metrics and /stats are per worker.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+import uvicorn
+
+from config import (
+    API_HOST,
+    API_PORT,
+    API_WORKERS,
+    SHARED_CACHE_DB,
+    GMAIL_AUTH_MODE,
+    GEMINI_REQUESTS_PER_MINUTE,
+    GEMINI_TOKENS_PER_MINUTE,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the API with multiple worker processes.")
+    parser.add_argument("--workers", type=int, default=API_WORKERS or os.cpu_count() or 1)
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--no-gunicorn", action="store_true", help="use uvicorn's supervisor even if gunicorn is installed")
+    return parser.parse_args()
+
+
+def uvicorn_worker_class():
+    # uvicorn.workers moved to the uvicorn-worker package in newer releases
+    if importlib.util.find_spec("uvicorn_worker") is not None:
+        return "uvicorn_worker.UvicornWorker"
+    return "uvicorn.workers.UvicornWorker"
+
+
+def split_quota(workers):
+    """Each worker enforces its share of the Gemini quota (read by config at import)."""
+    if GEMINI_REQUESTS_PER_MINUTE > 0:
+        os.environ["GEMINI_REQUESTS_PER_MINUTE"] = str(max(1, GEMINI_REQUESTS_PER_MINUTE // workers))
+    if GEMINI_TOKENS_PER_MINUTE > 0:
+        os.environ["GEMINI_TOKENS_PER_MINUTE"] = str(max(1, GEMINI_TOKENS_PER_MINUTE // workers))
+
+
+def warn_about_setup(workers):
+    if workers <= 1:
+        return
+    if not SHARED_CACHE_DB:
+        print("⚠ SHARED_CACHE_DB is not set — each worker keeps its own caches.")
+    if GMAIL_AUTH_MODE != "server":
+        print("⚠ GMAIL_AUTH_MODE is not 'server' — a worker may start the browser login; "
+              "provision a token with `python gmail_auth.py provision` and use server mode.")
+
+
+def main():
+    args = parse_args()
+    workers = max(1, args.workers)
+
+    warn_about_setup(workers)
+    split_quota(workers)
+    # Workers import api from this directory whatever the caller's cwd
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    if not args.no_gunicorn and importlib.util.find_spec("gunicorn") is not None:
+        command = [
+            sys.executable, "-m", "gunicorn", "api:app",
+            "--worker-class", uvicorn_worker_class(),
+            "--workers", str(workers),
+            "--bind", f"{args.host}:{args.port}",
+            "--preload",
+        ]
+        print(f"Starting {workers} gunicorn workers on {args.host}:{args.port} (preload)")
+        os.execv(sys.executable, command)
+
+    print(f"Starting {workers} uvicorn workers on {args.host}:{args.port}")
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=workers)
+
+
+if __name__ == "__main__":
+    main()
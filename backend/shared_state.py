@@ -0,0 +1,207 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from config import SHARED_CACHE_DB, SHARED_CACHE_MAX_ROWS, SHARED_CACHE_TTL_SECONDS
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks only serialise threads of one process
+    fcntl = None
+
+
+class FileLock:
+    """
+    Exclusive lock shared by every process that opens the same lock file
+    (flock), and by threads of one process since each acquire opens its own
+    file description. Use as a context manager.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._thread_lock = threading.Lock()
+
+    def __enter__(self):
+        if fcntl is None:
+            self._thread_lock.acquire()
+            return self
+
+        f = open(self.path, "a")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            f.close()
+            raise
+        self._local.file = f
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is None:
+            self._thread_lock.release()
+            return
+
+        f = self._local.file
+        self._local.file = None
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        finally:
+            f.close()
+
+
+def atomic_write(path, data):
+    """
+    Writes `data` (str or bytes) to a temp file next to `path`, fsyncs it and
+    renames it over `path`, so readers see either the old or the new file,
+    never a partial one. The file is created with mode 0600.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb" if isinstance(data, bytes) else "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class SharedCache:
+    """
+    Key/value blobs in one SQLite database in WAL mode, readable and writable
+    by every worker process at once. Entries live in namespaces (one per
+    cache), each capped at `max_rows` with an optional TTL.
+
+    Connections are per thread and per process: one inherited across a fork
+    (gunicorn --preload) is never reused in the child.
+    """
+
+    PRUNE_EVERY = 64
+
+    def __init__(self, db_path, max_rows=5000, ttl_sec=None):
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self.ttl_sec = ttl_sec
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes_since_prune = {}
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+        with self._conn() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS shared_cache (
+                       namespace TEXT NOT NULL,
+                       key TEXT NOT NULL,
+                       value BLOB NOT NULL,
+                       expires_at REAL,
+                       created_at REAL NOT NULL,
+                       PRIMARY KEY (namespace, key)
+                   )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS shared_cache_age ON shared_cache (namespace, created_at)"
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def get(self, namespace, key):
+        try:
+            row = self._conn().execute(
+                """SELECT value FROM shared_cache
+                   WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)""",
+                (namespace, key, time.time()),
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Shared cache read failed: {e}")
+            self._count("errors")
+            return None
+
+        self._count("hits" if row else "misses")
+        return row[0] if row else None
+
+    def put(self, namespace, key, value):
+        now = time.time()
+        expires_at = now + self.ttl_sec if self.ttl_sec else None
+
+        with self._lock:
+            self.writes += 1
+            pending = self._writes_since_prune.get(namespace, 0) + 1
+            prune = pending >= self.PRUNE_EVERY
+            self._writes_since_prune[namespace] = 0 if prune else pending
+
+        conn = self._conn()
+        try:
+            with conn:
+                conn.execute(
+                    """INSERT OR REPLACE INTO shared_cache (namespace, key, value, expires_at, created_at)
+                       VALUES (?, ?, ?, ?, ?)""",
+                    (namespace, key, value, expires_at, now),
+                )
+                if prune:
+                    self._prune(conn, namespace, now)
+        except sqlite3.Error as e:
+            print(f"Shared cache write failed: {e}")
+            self._count("errors")
+
+    def _prune(self, conn, namespace, now):
+        conn.execute("DELETE FROM shared_cache WHERE namespace = ? AND expires_at <= ?", (namespace, now))
+        conn.execute(
+            """DELETE FROM shared_cache WHERE namespace = ? AND key IN (
+                   SELECT key FROM shared_cache WHERE namespace = ?
+                   ORDER BY created_at DESC LIMIT -1 OFFSET ?
+               )""",
+            (namespace, namespace, self.max_rows),
+        )
+
+    def namespace(self, name):
+        return SharedNamespace(self, name)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "errors": self.errors,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class SharedNamespace:
+    """One cache's view of a SharedCache: get(key) / put(key, value) with bytes values."""
+
+    def __init__(self, cache, name):
+        self.cache = cache
+        self.name = name
+
+    def get(self, key):
+        return self.cache.get(self.name, key)
+
+    def put(self, key, value):
+        self.cache.put(self.name, key, value)
+
+
+shared_cache = SharedCache(
+    SHARED_CACHE_DB, max_rows=SHARED_CACHE_MAX_ROWS, ttl_sec=SHARED_CACHE_TTL_SECONDS
+) if SHARED_CACHE_DB else None
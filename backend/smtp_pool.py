@@ -0,0 +1,139 @@
+import smtplib
+import threading
+import time
+
+
+class SMTPConnectionPool:
+    """
+    Keeps up to `size` authenticated SMTP connections open and hands them out
+    to senders, so the TLS handshake and login are paid once per connection
+    instead of once per message.
+    """
+
+    def __init__(self, host, port, username=None, password=None, use_ssl=True,
+                 size=4, idle_timeout=60, healthcheck_after=5, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.healthcheck_after = healthcheck_after
+        self.timeout = timeout
+
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []  # list of (connection, last_used)
+        self.created = 0
+        self.reused = 0
+        self.reconnects = 0
+
+    def _connect(self):
+        if self.use_ssl:
+            conn = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+
+        if self.username and self.password:
+            conn.login(self.username, self.password)
+
+        with self._lock:
+            self.created += 1
+        return conn
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _is_alive(conn):
+        try:
+            return conn.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _checkout(self):
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    conn, last_used = self._idle.pop()
+
+                idle_for = time.monotonic() - last_used
+                if idle_for > self.idle_timeout:
+                    self._close(conn)
+                    continue
+                if idle_for > self.healthcheck_after and not self._is_alive(conn):
+                    self._close(conn)
+                    continue
+
+                with self._lock:
+                    self.reused += 1
+                return conn
+
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _checkin(self, conn):
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+        self._slots.release()
+
+    def _discard(self, conn):
+        self._close(conn)
+        self._slots.release()
+
+    def _send(self, send_fn):
+        """
+        Runs send_fn(conn) on a pooled connection. If the server dropped the
+        connection it is replaced and the send retried once.
+        """
+        conn = self._checkout()
+        try:
+            send_fn(conn)
+        except smtplib.SMTPServerDisconnected:
+            self._close(conn)
+            with self._lock:
+                self.reconnects += 1
+            try:
+                conn = self._connect()
+                send_fn(conn)
+            except Exception:
+                self._discard(conn)
+                raise
+        except Exception:
+            self._discard(conn)
+            raise
+
+        self._checkin(conn)
+
+    def send_raw(self, from_addr, to_addrs, raw):
+        """Sends an already serialized message (bytes) to the envelope recipients."""
+        self._send(lambda conn: conn.sendmail(from_addr, to_addrs, raw))
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "created": self.created,
+                "reused": self.reused,
+                "reconnects": self.reconnects,
+            }
@@ -0,0 +1,205 @@
+import asyncio
+import contextvars
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+
+from executor import run_io
+from gemini_ai_writer import regenerate_mail_body, regenerate_cost, gemini_quota
+from metrics import speculation_events
+from rate_limiter import TokenBucket, SPECULATIVE
+from config import (
+    REGENERATE_SPECULATION_ENABLED,
+    REGENERATE_SPECULATIVE_INSTRUCTIONS,
+    REGENERATE_SPECULATION_TTL_SECONDS,
+    REGENERATE_SPECULATION_MAX_SESSIONS,
+    REGENERATE_SPECULATION_CONCURRENCY,
+    REGENERATE_SPECULATION_TOKENS_PER_HOUR,
+)
+
+logger = logging.getLogger(f"hotpath.{__name__}")
+
+_SPACE = re.compile(r"\s+")
+
+OUTCOMES = ("scheduled", "skipped_budget", "skipped_busy", "failed", "hit", "inflight_hit", "miss", "unused")
+
+
+def normalize_instruction(instruction):
+    return _SPACE.sub(" ", (instruction or "").strip().lower()).rstrip(".!")
+
+
+def session_key(original_body, resume_text=None):
+    """A draft is identified by its body (whitespace-insensitive) and the resume it was written from."""
+    digest = hashlib.sha256(_SPACE.sub(" ", original_body).strip().encode("utf-8"))
+    digest.update(b"\0")
+    digest.update((resume_text or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+class _Session:
+    __slots__ = ("expires_at", "variants", "used")
+
+    def __init__(self, expires_at):
+        self.expires_at = expires_at
+        self.variants = {}  # normalized instruction -> asyncio.Task
+        self.used = set()
+
+
+class RegenerateSpeculator:
+    """
+    Regenerates a fresh draft in the background with the instructions users
+    most often ask for next, so /regenerate-body can answer those from
+    memory. Variants are kept per draft for `ttl_sec` (at most
+    `max_sessions` drafts). Speculative Gemini calls run at the lowest quota
+    priority, at most `concurrency` at once, and are skipped when Gemini
+    calls are already queueing or the `tokens_per_hour` estimate is spent.
+
+    State is per worker process; a variant asked for on another worker is
+    still served by the shared LLM response cache, if configured.
+    """
+
+    def __init__(self, instructions, ttl_sec=900, max_sessions=500, concurrency=2, tokens_per_hour=200000,
+                 clock=time.monotonic):
+        self.instructions = {normalize_instruction(i): i.strip() for i in instructions if i.strip()}
+        self.ttl_sec = ttl_sec
+        self.max_sessions = max_sessions
+        self.concurrency = concurrency
+        self._clock = clock
+        self._budget = TokenBucket(tokens_per_hour / 60, 3600, clock) if tokens_per_hour > 0 else None
+        self._sessions = OrderedDict()
+        self._loop = None
+        self._slots = None
+        self.tokens_reserved = 0
+
+    def _bind(self):
+        # Tasks and the semaphore belong to the loop that created them
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._sessions.clear()
+
+    def _drop(self, session):
+        for instruction, task in session.variants.items():
+            if not task.done():
+                task.cancel()
+            elif instruction not in session.used and not task.cancelled() and task.exception() is None:
+                speculation_events.inc("unused")
+
+    def _expire(self):
+        now = self._clock()
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if session.expires_at > now and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[key]
+            self._drop(session)
+
+    def speculate(self, original_body, resume_text=None):
+        """Starts the variants of a newly generated draft; returns how many were started."""
+        if not self.instructions or not original_body or not original_body.strip():
+            return 0
+
+        self._bind()
+        key = session_key(original_body, resume_text)
+        if key in self._sessions:
+            return 0
+
+        if gemini_quota.stats()["queued"]:
+            speculation_events.inc("skipped_busy", amount=len(self.instructions))
+            return 0
+
+        session = _Session(self._clock() + self.ttl_sec)
+        for normalized, instruction in self.instructions.items():
+            cost = regenerate_cost(original_body, instruction, resume_text)
+            if self._budget is not None:
+                if self._budget.wait_time(cost) > 0:
+                    speculation_events.inc("skipped_budget")
+                    continue
+                self._budget.take(cost)
+
+            # A fresh context: the speculative calls are not part of this request's trace
+            task = contextvars.Context().run(
+                asyncio.create_task, self._generate(original_body, instruction, resume_text)
+            )
+            task.add_done_callback(self._on_done)
+            session.variants[normalized] = task
+            self.tokens_reserved += cost
+            speculation_events.inc("scheduled")
+
+        if session.variants:
+            self._sessions[key] = session
+            self._expire()
+        return len(session.variants)
+
+    async def _generate(self, original_body, instruction, resume_text):
+        async with self._slots:
+            return await run_io(regenerate_mail_body, original_body, instruction, resume_text, True, SPECULATIVE)
+
+    @staticmethod
+    def _on_done(task):
+        if not task.cancelled() and task.exception() is not None:
+            speculation_events.inc("failed")
+            logger.info("Speculative regenerate failed: %s", task.exception())
+
+    async def lookup(self, original_body, instruction, resume_text=None):
+        """
+        The precomputed body for this draft and instruction, or None. A
+        variant still being generated is awaited rather than requested again.
+        """
+        self._bind()
+        self._expire()
+
+        normalized = normalize_instruction(instruction)
+        session = self._sessions.get(session_key(original_body, resume_text))
+        task = session.variants.get(normalized) if session else None
+        if task is None or task.cancelled():
+            speculation_events.inc("miss")
+            return None
+
+        outcome = "hit" if task.done() else "inflight_hit"
+        try:
+            # shield: a client disconnect must not cancel the shared variant
+            body = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            body = None
+
+        if not body or not body.strip():
+            speculation_events.inc("miss")
+            return None
+
+        session.used.add(normalized)
+        speculation_events.inc(outcome)
+        return body
+
+    def close(self):
+        """Cancels variants still being generated (server shutdown)."""
+        sessions, self._sessions = self._sessions, OrderedDict()
+        for session in sessions.values():
+            self._drop(session)
+
+    def stats(self):
+        counts = {outcome: speculation_events.value(outcome) for outcome in OUTCOMES}
+        hits = counts["hit"] + counts["inflight_hit"]
+        lookups = hits + counts["miss"]
+        return {
+            "instructions": list(self.instructions.values()),
+            "sessions": len(self._sessions),
+            **counts,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "tokens_reserved": self.tokens_reserved,
+            "token_budget": round(self._budget.level) if self._budget else None,
+        }
+
+
+regenerate_speculator = RegenerateSpeculator(
+    REGENERATE_SPECULATIVE_INSTRUCTIONS,
+    ttl_sec=REGENERATE_SPECULATION_TTL_SECONDS,
+    max_sessions=REGENERATE_SPECULATION_MAX_SESSIONS,
+    concurrency=REGENERATE_SPECULATION_CONCURRENCY,
+    tokens_per_hour=REGENERATE_SPECULATION_TOKENS_PER_HOUR,
+) if REGENERATE_SPECULATION_ENABLED else None
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+from fakes import Faults, FakeSMTPServer  # noqa: E402
+
+SENDER = "sender@example.com"
+RAW_MESSAGE = b"From: sender@example.com\r\nTo: hr@example.com\r\nSubject: Hello\r\n\r\nHi there.\r\n"
+
+
+@pytest.fixture
+def smtp_server():
+    """Local aiosmtpd stand-in that accepts every message."""
+    with FakeSMTPServer(Faults()) as server:
+        yield server
@@ -0,0 +1,153 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import automate_mail
+from async_transports import AsyncGmailClient, AsyncSMTPPool, SharedSlots
+from conftest import SENDER, RAW_MESSAGE
+from fakes import FakeGmailHTTP
+
+PREPARED = SimpleNamespace(
+    sender=SENDER,
+    envelope_recipients=["hr@example.com"],
+    raw=RAW_MESSAGE,
+    gmail_raw="RnJvbTogc2VuZGVy",
+)
+
+
+def make_pool(server, **kwargs):
+    return AsyncSMTPPool(server.host, server.port, use_ssl=False, **kwargs)
+
+
+def test_async_smtp_connection_is_reused(smtp_server):
+    pool = make_pool(smtp_server)
+
+    async def run():
+        for _ in range(3):
+            await pool.send_raw(SENDER, ["hr@example.com"], RAW_MESSAGE)
+        await pool.close_all()
+
+    asyncio.run(run())
+
+    stats = pool.stats()
+    assert (stats["created"], stats["reused"]) == (1, 2)
+    assert smtp_server.handler.received == 3
+    assert len(smtp_server.handler.peers) == 1
+
+
+def test_async_smtp_recovers_from_server_side_close(smtp_server):
+    pool = make_pool(smtp_server, healthcheck_after=3600)
+
+    async def run():
+        await pool.send_raw(SENDER, ["hr@example.com"], RAW_MESSAGE)
+        smtp_server.drop_connections()
+        await pool.send_raw(SENDER, ["hr@example.com"], RAW_MESSAGE)
+        await pool.close_all()
+
+    asyncio.run(run())
+
+    assert pool.stats()["created"] == 2
+    assert smtp_server.handler.received == 2
+
+
+def test_smtp_attempt_async_sends(monkeypatch, smtp_server):
+    pool = make_pool(smtp_server)
+    monkeypatch.setattr(automate_mail, "async_smtp_pool", pool)
+
+    async def run():
+        try:
+            return await automate_mail._smtp_attempt_async(PREPARED)
+        finally:
+            await pool.close_all()
+
+    assert asyncio.run(run()) == automate_mail.SENT
+    assert smtp_server.handler.received == 1
+
+
+def status_transport(status):
+    return httpx.MockTransport(lambda request: httpx.Response(status, json={"error": {"code": status}}))
+
+
+@pytest.mark.parametrize("transport, outcome", [
+    (FakeGmailHTTP().transport(), automate_mail.SENT),
+    (status_transport(400), automate_mail.REJECTED),
+    (status_transport(401), automate_mail.UNAVAILABLE),
+    (status_transport(429), automate_mail.FAILED),
+    (status_transport(503), automate_mail.FAILED),
+])
+def test_oauth_attempt_async_maps_gmail_responses(monkeypatch, transport, outcome):
+    client = AsyncGmailClient("https://gmail.test", transport=transport)
+    monkeypatch.setattr(automate_mail, "async_gmail", client)
+    monkeypatch.setattr(automate_mail.gmail_holder, "bearer_token", lambda: "token")
+
+    async def run():
+        try:
+            return await automate_mail._oauth_attempt_async(PREPARED)
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == outcome
+
+
+def test_shared_slots_cap_threads_and_tasks_together():
+    slots = SharedSlots(2)
+    peak = 0
+    active = 0
+    lock = threading.Lock()
+
+    def enter():
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+
+    def leave():
+        nonlocal active
+        with lock:
+            active -= 1
+
+    def thread_sender():
+        for _ in range(20):
+            with slots:
+                enter()
+                threading.Event().wait(0.001)
+                leave()
+
+    async def task_sender():
+        for _ in range(20):
+            async with slots:
+                enter()
+                await asyncio.sleep(0.001)
+                leave()
+
+    async def run():
+        await asyncio.gather(*(task_sender() for _ in range(3)))
+
+    threads = [threading.Thread(target=thread_sender) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    asyncio.run(run())
+    for thread in threads:
+        thread.join()
+
+    assert peak == 2
+    assert slots.stats() == {"limit": 2, "in_use": 0, "waiting": 0}
+
+
+def test_cancelled_waiter_gives_its_slot_back():
+    slots = SharedSlots(1)
+
+    async def run():
+        await slots.acquire_async()
+        waiter = asyncio.create_task(slots.acquire_async())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        slots.release()
+
+    asyncio.run(run())
+    assert slots.stats() == {"limit": 1, "in_use": 0, "waiting": 0}
@@ -0,0 +1,50 @@
+import pytest
+
+from body_format import format_body, lines_to_br
+
+
+@pytest.mark.parametrize("body", [
+    "<svg/onload=alert(1)>hi",
+    '<a href="java&#115;cript:alert(1)">hi</a>',
+    '<a href=" jav\tascript:alert(1)">hi</a>',
+    "<scr<script></script>ipt>alert(1)</script>",
+    "<<svg>script>alert(1)<</svg>/script>",
+    '<p style="background:url(javascript:alert(1))">hi</p>',
+    '<img src=x onerror="alert(1)">',
+])
+def test_script_does_not_survive(body):
+    sanitized = format_body(body).html.lower()
+
+    assert "<script" not in sanitized
+    assert "<svg" not in sanitized
+    assert "javascript" not in sanitized
+    assert "onload" not in sanitized and "onerror" not in sanitized
+
+
+def test_allowed_markup_is_kept():
+    body = '<p>Hi <b>Team</b>,<br>see <a href="https://github.com/jd">GitHub</a>.</p>'
+    assert format_body(body).html == body
+
+
+def test_attributes_are_filtered_and_requoted():
+    body = "<P Style='color:red;width:expression(alert(1))' class=x>A &amp; B</P>"
+    assert format_body(body).html == '<p style="color: red">A &amp; B</p>'
+
+
+def test_text_rendering():
+    body = (
+        "Hi <b>Team</b>,<br>\n  See <a href=\"https://github.com/jd\">GitHub</a>."
+        "<ul><li>Python</li><li>SQL &amp; Docker</li></ul><script>x()</script>Thanks"
+    )
+    assert format_body(body).text == (
+        "Hi Team,\nSee GitHub (https://github.com/jd).\n\n- Python\n- SQL & Docker\n\nThanks"
+    )
+
+
+def test_plain_text_body():
+    formatted = format_body("Tom & Jerry < 3")
+    assert (formatted.html, formatted.text) == ("Tom & Jerry &lt; 3", "Tom & Jerry < 3")
+
+
+def test_lines_to_br_normalises_line_endings():
+    assert lines_to_br("a\r\nb\rc\nd") == "a<br>b<br>c<br>d"
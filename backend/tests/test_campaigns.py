@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+import campaigns
+from campaigns import CampaignRunner, CampaignStore
+
+
+def test_store_creates_database_on_first_use(tmp_path):
+    db_path = tmp_path / "campaigns.db"
+    store = CampaignStore(str(db_path))
+    assert not db_path.exists()
+
+    store.create("c", "Hi", "Hello", [{"email": "hr@example.com"}])
+    assert db_path.exists()
+
+
+def test_send_quota_is_shared_between_stores(tmp_path):
+    db_path = str(tmp_path / "campaigns.db")
+    first, second = CampaignStore(db_path), CampaignStore(db_path)
+
+    assert first.take_send("gmail", 60) == 0
+    assert second.take_send("gmail", 60) > 0
+    # Another provider has its own budget
+    assert second.take_send("smtp.example.com", 60) == 0
+
+
+def test_lease_is_renewed_while_transports_are_down(monkeypatch, tmp_path):
+    store = CampaignStore(str(tmp_path / "campaigns.db"))
+    campaign_id, _ = store.create("c", "Hi", "Hello", [{"email": "hr@example.com"}])
+    monkeypatch.setattr(campaigns, "transports_available", lambda: False)
+
+    async def send_fn(**kwargs):
+        return True
+
+    runner = CampaignRunner(store, send_fn=send_fn, lease_sec=0.3)
+
+    async def run():
+        assert await runner.start(campaign_id)
+        await asyncio.sleep(0.1)
+        store._conn().execute("UPDATE campaigns SET heartbeat_at = 0 WHERE id = ?", (campaign_id,))
+        store._conn().commit()
+        await asyncio.sleep(0.5)
+        heartbeat_at = store.campaign(campaign_id)["heartbeat_at"]
+        await runner.stop_all()
+        return heartbeat_at
+
+    assert asyncio.run(run()) > time.time() - 1
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+import automate_mail
+from circuit_breaker import CircuitBreaker, HALF_OPEN
+from executor import PoolSaturated
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def half_open_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_seconds=30, clock=clock)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.state == HALF_OPEN
+    return breaker
+
+
+def test_release_returns_the_probe():
+    breaker = half_open_breaker()
+
+    assert breaker.try_acquire()
+    assert not breaker.try_acquire()
+    breaker.release()
+    assert breaker.try_acquire()
+
+
+@pytest.mark.parametrize("error", [PoolSaturated("io"), asyncio.CancelledError()])
+def test_async_attempt_releases_probe_on_escape(monkeypatch, error):
+    breaker = half_open_breaker()
+
+    async def attempt(prepared):
+        raise error
+
+    monkeypatch.setitem(automate_mail.TRANSPORTS, "smtp", (None, breaker, None, "send_smtp"))
+    monkeypatch.setitem(automate_mail.ASYNC_ATTEMPTS, "smtp", attempt)
+
+    assert breaker.try_acquire()
+    with pytest.raises(type(error)):
+        asyncio.run(automate_mail._attempt_async("smtp", None))
+
+    # Still half-open, with the probe free for the next caller
+    assert breaker.state == HALF_OPEN
+    assert breaker.try_acquire()
+
+
+def test_latency_probe_is_due_once_per_interval():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", clock=clock)
+    assert not breaker.latency_probe_due(60)
+
+    breaker.record_success(20.0)
+    clock.now += 60
+    assert breaker.latency_probe_due(60)
+    assert not breaker.latency_probe_due(60)
+
+    clock.now += 60
+    assert breaker.latency_probe_due(60)
+
+
+def test_slow_gmail_is_tried_again_and_failures_keep_the_average(monkeypatch):
+    clock = FakeClock()
+    oauth = CircuitBreaker("oauth", clock=clock)
+    smtp = CircuitBreaker("smtp", clock=clock)
+    for name, breaker in (("oauth", oauth), ("smtp", smtp)):
+        attempt, _, slots, stage_name = automate_mail.TRANSPORTS[name]
+        monkeypatch.setitem(automate_mail.TRANSPORTS, name, (attempt, breaker, slots, stage_name))
+    monkeypatch.setattr(automate_mail, "oauth_breaker", oauth)
+    monkeypatch.setattr(automate_mail, "smtp_breaker", smtp)
+
+    automate_mail._record_outcome("oauth", automate_mail.SENT, 20.0)
+    automate_mail._record_outcome("smtp", automate_mail.SENT, 1.0)
+    automate_mail._record_outcome("oauth", automate_mail.UNAVAILABLE, 0.001)
+    assert oauth.latency_ewma == 20.0
+    # Close the breaker UNAVAILABLE tripped, so only latency decides the order
+    oauth.record_success()
+    assert automate_mail.transport_order() == ["smtp", "oauth"]
+
+    clock.now += automate_mail.MAIL_LATENCY_REPROBE_SECONDS
+    assert automate_mail.transport_order() == ["oauth", "smtp"]
+    assert automate_mail.transport_order() == ["smtp", "oauth"]
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import pytest
+
+import gemini_ai_writer
+
+
+def chunk(text, total_tokens=None):
+    usage = SimpleNamespace(total_token_count=total_tokens) if total_tokens else None
+    return SimpleNamespace(text=text, usage_metadata=usage)
+
+
+@pytest.fixture
+def settled(monkeypatch):
+    calls = []
+    monkeypatch.setattr(gemini_ai_writer.gemini_quota, "settle", lambda reserved, actual: calls.append(actual))
+    return calls
+
+
+def fake_stream(monkeypatch, chunks):
+    def call_gemini(open_stream, reserved, priority):
+        return 0.0, iter(chunks)
+
+    monkeypatch.setattr(gemini_ai_writer, "call_gemini", call_gemini)
+
+
+def test_completed_stream_settles_its_usage(monkeypatch, settled):
+    fake_stream(monkeypatch, [chunk("Hello "), chunk("there", total_tokens=42)])
+
+    assert "".join(gemini_ai_writer.stream_text("prompt", "regenerate", use_cache=False)) == "Hello there"
+    assert settled == [42]
+
+
+def test_abandoned_stream_still_settles(monkeypatch, settled):
+    fake_stream(monkeypatch, [chunk("Hello "), chunk("there", total_tokens=42)])
+
+    stream = gemini_ai_writer.stream_text("prompt", "regenerate", use_cache=False)
+    assert next(stream) == "Hello "
+    # Client disconnect: the generator is closed mid-stream
+    stream.close()
+
+    assert len(settled) == 1 and 0 < settled[0] < gemini_ai_writer._reserved_tokens(
+        "prompt", gemini_ai_writer.get_spec("regenerate")
+    )
+
+
+def test_failed_stream_still_settles(monkeypatch, settled):
+    def failing():
+        yield chunk("Hello ")
+        raise RuntimeError("connection reset")
+
+    fake_stream(monkeypatch, failing())
+
+    with pytest.raises(RuntimeError):
+        list(gemini_ai_writer.stream_text("prompt", "regenerate", use_cache=False))
+    assert len(settled) == 1
@@ -0,0 +1,34 @@
+import threading
+from types import SimpleNamespace
+
+import gmail_auth
+from gmail_auth import GmailServiceHolder
+
+
+def test_login_in_progress_does_not_block_other_callers(monkeypatch):
+    started, finish = threading.Event(), threading.Event()
+    creds = SimpleNamespace(token="t", expiry=None, refresh_token="r", valid=True)
+
+    def slow_login():
+        started.set()
+        finish.wait(5)
+        return creds
+
+    monkeypatch.setattr(gmail_auth, "load_credentials", slow_login)
+    monkeypatch.setattr(gmail_auth, "build", lambda *args, **kwargs: "service")
+    holder = GmailServiceHolder(interactive=True)
+
+    results = []
+    login = threading.Thread(target=lambda: results.append(holder.get_service()))
+    login.start()
+    assert started.wait(5)
+
+    # Neither waits for the browser login
+    assert holder.get_service() is None
+    assert holder.stats()["builds"] == 0
+
+    finish.set()
+    login.join(5)
+    assert results == ["service"]
+    assert holder.get_service() == "service"
+    assert holder.bearer_token() == "t"
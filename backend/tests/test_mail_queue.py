@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pytest
+
+import automate_mail
+from circuit_breaker import CircuitBreaker
+from mail_queue import MailQueue, STATUS_QUEUED, STATUS_SENDING, STATUS_SENT
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "mail_queue.db")
+
+
+def make_queue(db_path, tmp_path, owner_id):
+    queue = MailQueue(db_path, str(tmp_path / "attachments"), workers=0, lease_sec=30, send_fn=None)
+    queue.owner_id = owner_id
+    return queue
+
+
+def claim_one(queue):
+    _, (job_id,) = queue.enqueue_batch([{"recipient": "hr@example.com", "subject": "Hi", "body": "Hello"}])
+    job = queue._claim()
+    assert job["id"] == job_id
+    return job
+
+
+def test_start_leaves_jobs_of_live_owners_alone(db_path, tmp_path):
+    sender = make_queue(db_path, tmp_path, "a")
+    job = claim_one(sender)
+
+    other = make_queue(db_path, tmp_path, None)
+    other.start()
+    other.stop()
+
+    assert other.get_job(job["id"])["status"] == STATUS_SENDING
+    sender._finish(job)
+    assert sender.get_job(job["id"])["status"] == STATUS_SENT
+
+
+def test_expired_lease_is_requeued_and_late_outcome_dropped(db_path, tmp_path):
+    sender = make_queue(db_path, tmp_path, "a")
+    job = claim_one(sender)
+    conn = sender._conn()
+    with conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time() - 60, job["id"]))
+
+    other = make_queue(db_path, tmp_path, "b")
+    other._requeue_expired()
+    assert other.get_job(job["id"])["status"] == STATUS_QUEUED
+
+    # The original sender no longer owns the job and must not overwrite it
+    sender._finish(job)
+    assert other.get_job(job["id"])["status"] == STATUS_QUEUED
+
+
+def beat_once(queue):
+    queue.lease_sec = 0.03
+    thread = threading.Thread(target=queue._heartbeat_loop)
+    thread.start()
+    time.sleep(0.05)
+    queue._heartbeat_stop.set()
+    thread.join()
+
+
+def test_heartbeat_renews_own_jobs_only(db_path, tmp_path):
+    sender = make_queue(db_path, tmp_path, "a")
+    claim_one(sender)
+    conn = sender._conn()
+    with conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = 0")
+
+    beat_once(make_queue(db_path, tmp_path, "b"))
+    assert conn.execute("SELECT heartbeat_at FROM jobs").fetchone()[0] == 0
+
+    beat_once(sender)
+    assert conn.execute("SELECT heartbeat_at FROM jobs").fetchone()[0] > 0
+
+
+def test_stop_keeps_renewing_leases_until_workers_finish(db_path, tmp_path):
+    sending, release = threading.Event(), threading.Event()
+
+    def slow_send(**kwargs):
+        sending.set()
+        release.wait(5)
+        return True
+
+    queue = MailQueue(db_path, str(tmp_path / "attachments"), workers=1, lease_sec=0.06,
+                      send_fn=slow_send, available_fn=lambda: True)
+    queue.start()
+    _, (job_id,) = queue.enqueue_batch([{"recipient": "hr@example.com", "subject": "Hi", "body": "Hello"}])
+    assert sending.wait(5)
+
+    stopper = threading.Thread(target=queue.stop)
+    stopper.start()
+    time.sleep(0.05)
+    conn = queue._conn()
+    with conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = 0")
+    time.sleep(0.1)
+    # stop() is still waiting for the send, and the lease is still renewed
+    heartbeat_at = conn.execute("SELECT heartbeat_at FROM jobs").fetchone()[0]
+
+    release.set()
+    stopper.join(5)
+    assert heartbeat_at > 0
+    assert queue.get_job(job_id)["status"] == STATUS_SENT
+
+
+def open_breaker(name):
+    breaker = CircuitBreaker(name, failure_threshold=1, recovery_seconds=3600)
+    breaker.record_failure()
+    return breaker
+
+
+def test_open_breakers_do_not_use_up_attempts(monkeypatch, db_path, tmp_path):
+    for name, (attempt, _, slots, stage_name) in list(automate_mail.TRANSPORTS.items()):
+        monkeypatch.setitem(automate_mail.TRANSPORTS, name, (attempt, open_breaker(name), slots, stage_name))
+    sends = []
+    queue = MailQueue(db_path, str(tmp_path / "attachments"), workers=1, backoff_sec=0,
+                      send_fn=lambda **kwargs: sends.append(kwargs) or False)
+    _, (job_id,) = queue.enqueue_batch([{"recipient": "hr@example.com", "subject": "Hi", "body": "Hello"}])
+
+    queue.start()
+    time.sleep(0.3)
+    queue.stop()
+
+    job = queue.get_job(job_id)
+    assert sends == []
+    assert (job["status"], job["attempts"]) == (STATUS_QUEUED, 0)
+
+
+def test_job_claimed_before_breakers_opened_is_given_back(db_path, tmp_path):
+    queue = make_queue(db_path, tmp_path, "a")
+    queue.available_fn = lambda: False
+    job = claim_one(queue)
+
+    queue._process(job)
+
+    job = queue.get_job(job["id"])
+    assert (job["status"], job["attempts"]) == (STATUS_QUEUED, 0)
@@ -0,0 +1,15 @@
+import pytest
+
+from prompt_prep import _section_name
+
+
+@pytest.mark.parametrize("heading, section", [
+    ("Personal Projects", "projects"),
+    ("Academic Projects", "projects"),
+    ("Personal Details", "contact"),
+    ("Contact Information", "contact"),
+    ("Work Experience", "experience"),
+    ("Technical Skills", "skills"),
+])
+def test_section_name(heading, section):
+    assert _section_name(heading) == section
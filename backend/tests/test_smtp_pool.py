@@ -0,0 +1,71 @@
+import threading
+
+from conftest import SENDER, RAW_MESSAGE
+from smtp_pool import SMTPConnectionPool
+
+
+def make_pool(server, **kwargs):
+    return SMTPConnectionPool(server.host, server.port, use_ssl=False, **kwargs)
+
+
+def test_connection_is_reused(smtp_server):
+    pool = make_pool(smtp_server)
+
+    for _ in range(3):
+        pool.send_raw(SENDER, ["hr@example.com"], RAW_MESSAGE)
+
+    stats = pool.stats()
+    assert (stats["created"], stats["reused"], stats["idle"]) == (1, 2, 1)
+    assert smtp_server.handler.received == 3
+    assert len(smtp_server.handler.peers) == 1
+    pool.close_all()
+
+
+def test_reconnects_after_server_side_close(smtp_server):
+    # No health check: the dead connection is handed out and the send hits the disconnect
+    pool = make_pool(smtp_server, healthcheck_after=3600)
+    pool.send_raw(SENDER, ["hr@example.com"], RAW_MESSAGE)
+
+    smtp_server.drop_connections()
+    pool.send_raw(SENDER, ["hr@example.com"], RAW_MESSAGE)
+
+    stats = pool.stats()
+    assert (stats["created"], stats["reconnects"], stats["idle"]) == (2, 1, 1)
+    assert smtp_server.handler.received == 2
+    pool.close_all()
+
+
+def test_health_check_replaces_dropped_idle_connection(smtp_server):
+    pool = make_pool(smtp_server, healthcheck_after=0)
+    pool.send_raw(SENDER, ["hr@example.com"], RAW_MESSAGE)
+
+    smtp_server.drop_connections()
+    pool.send_raw(SENDER, ["hr@example.com"], RAW_MESSAGE)
+
+    stats = pool.stats()
+    assert (stats["created"], stats["reused"], stats["reconnects"]) == (2, 0, 0)
+    assert smtp_server.handler.received == 2
+    pool.close_all()
+
+
+def test_concurrent_senders_share_at_most_size_connections(smtp_server):
+    pool = make_pool(smtp_server, size=2)
+    errors = []
+
+    def send():
+        try:
+            for _ in range(5):
+                pool.send_raw(SENDER, ["hr@example.com"], RAW_MESSAGE)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=send) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert smtp_server.handler.received == 30
+    assert pool.stats()["created"] <= 2
+    pool.close_all()
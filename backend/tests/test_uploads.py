@@ -0,0 +1,42 @@
+import asyncio
+import io
+import tempfile
+
+import pytest
+from fastapi import HTTPException
+from starlette.datastructures import UploadFile
+
+from bench_pdf_extract import make_pdf
+from parse_resume_pdf import extract_text_from_pdf
+from resume_cache import _worker_path, parse_pdf_upload_async
+from uploads import read_upload
+
+PDF = make_pdf(3)
+
+
+def spooled(data, max_size):
+    file = tempfile.SpooledTemporaryFile(max_size=max_size)
+    file.write(data)
+    file.seek(0)
+    return file
+
+
+@pytest.mark.parametrize("max_size", [len(PDF) // 2, len(PDF) * 2], ids=["on_disk", "in_memory"])
+def test_upload_is_parsed_from_its_spool(max_size):
+    file = spooled(PDF, max_size)
+    on_disk = max_size < len(PDF)
+
+    assert (_worker_path(file) is not None) == on_disk
+    assert tuple(asyncio.run(parse_pdf_upload_async(file))) == tuple(extract_text_from_pdf(io.BytesIO(PDF)))
+    # Parsing neither rolls an in-memory spool over to disk nor moves the file position
+    assert file._rolled == on_disk
+    assert file.tell() == 0
+
+
+def test_read_upload_enforces_max_size():
+    upload = UploadFile(spooled(PDF, 1024))
+
+    assert asyncio.run(read_upload(upload, max_size=len(PDF))) == PDF
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_upload(upload, max_size=len(PDF) - 1))
+    assert error.value.status_code == 413
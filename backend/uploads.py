@@ -0,0 +1,82 @@
+import hashlib
+
+from fastapi import HTTPException, UploadFile
+
+from config import MAX_ATTACHMENT_SIZE
+from metrics import stage
+from resume_cache import resume_cache, parse_pdf_upload_async
+
+CHUNK_SIZE = 64 * 1024
+
+
+def upload_too_large(max_size):
+    return HTTPException(
+        status_code=413,
+        detail={
+            "code": "FILE_TOO_LARGE",
+            "message": f"File must be at most {max_size // (1024 * 1024)} MB"
+        }
+    )
+
+
+async def digest_upload(upload: UploadFile, max_size=MAX_ATTACHMENT_SIZE):
+    """
+    Streams the upload's spooled file in chunks, enforcing max_size as it goes,
+    and returns (sha256 hex digest, size). The file is rewound afterwards, so
+    nothing is copied into memory beyond one chunk.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+
+    with stage("upload_read"):
+        await upload.seek(0)
+        while True:
+            chunk = await upload.read(CHUNK_SIZE)
+            if not chunk:
+                break
+
+            size += len(chunk)
+            if size > max_size:
+                raise upload_too_large(max_size)
+            hasher.update(chunk)
+
+        await upload.seek(0)
+    return hasher.hexdigest(), size
+
+
+async def read_upload(upload: UploadFile, max_size=MAX_ATTACHMENT_SIZE):
+    """Size-checked read of the whole upload into a single bytes object, in one pass."""
+    chunks = []
+    size = 0
+
+    with stage("upload_read"):
+        await upload.seek(0)
+        while True:
+            chunk = await upload.read(CHUNK_SIZE)
+            if not chunk:
+                break
+
+            size += len(chunk)
+            if size > max_size:
+                raise upload_too_large(max_size)
+            chunks.append(chunk)
+
+        await upload.seek(0)
+    return b"".join(chunks)
+
+
+async def parse_resume_upload(upload: UploadFile, max_size=MAX_ATTACHMENT_SIZE):
+    """
+    (text, links) for an uploaded PDF. The content hash is computed while
+    streaming, so a cache hit never reads the file into memory at all, and
+    a miss is parsed straight from Starlette's spooled file.
+    """
+    digest, _ = await digest_upload(upload, max_size)
+
+    cached = await resume_cache.get_async(digest)
+    if cached is not None:
+        return cached
+
+    result = await parse_pdf_upload_async(upload.file)
+    await resume_cache.put_async(digest, result)
+    return result
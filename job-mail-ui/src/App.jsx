@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useEditor, EditorContent } from '@tiptap/react'
 import StarterKit from '@tiptap/starter-kit'
 import Underline from '@tiptap/extension-underline'
@@ -65,6 +65,9 @@ const FontFamily = Extension.create({
 function App() {
   const [jdText, setJdText] = useState("We are hiring for Junior AI/ML developer at example.com. We need people with 1 year of experience. Interested candidates mail at hr@example..com or hra@example.com and keep ceo@example.com in cc");
   const [resumeFile, setResumeFile] = useState(null);
+  const [resumeId, setResumeId] = useState(null);
+  // The upload in flight; a newer file choice aborts it
+  const resumeUpload = useRef(null);
 
   const [recipient, setRecipient] = useState("");
   const [cc, setCc] = useState("");
@@ -138,6 +141,73 @@ function App() {
     }
   })
 
+  // Upload the resume once; later calls reference it by resume_id
+  const handleResumeChange = async (file) => {
+    resumeUpload.current?.abort();
+    setResumeFile(file || null);
+    setResumeId(null);
+
+    if (!file) return;
+
+    const upload = new AbortController();
+    resumeUpload.current = upload;
+
+    const formData = new FormData();
+    formData.append("resume_file", file);
+
+    try {
+      const res = await fetch(`${BASE_API_URL}/resumes`, {
+        method: "POST",
+        body: formData,
+        signal: upload.signal
+      });
+
+      const data = await res.json();
+
+      // Ignore the answer if another file was picked meanwhile
+      if (res.ok && resumeUpload.current === upload) {
+        setResumeId(data.resume_id);
+      }
+    } catch (error) {
+      // Fall back to sending the file with each request
+      if (error.name !== "AbortError") {
+        console.error("Resume upload failed:", error);
+      }
+    } finally {
+      if (resumeUpload.current === upload) {
+        resumeUpload.current = null;
+      }
+    }
+  };
+
+  // POSTs the form filled in by buildForm, plus the resume. If the server no
+  // longer has the stored resume (404), the file is sent instead and uploaded
+  // again for later calls.
+  const postWithResume = async (path, buildForm) => {
+    const post = (useResumeId) => {
+      const formData = new FormData();
+      buildForm(formData);
+
+      if (useResumeId && resumeId) {
+        formData.append("resume_id", resumeId);
+      } else if (resumeFile) {
+        formData.append("resume_file", resumeFile);
+      }
+
+      return fetch(`${BASE_API_URL}${path}`, {
+        method: "POST",
+        body: formData
+      });
+    };
+
+    const res = await post(true);
+    if (res.status === 404 && resumeId && resumeFile) {
+      handleResumeChange(resumeFile);
+      return post(false);
+    }
+    return res;
+  };
+
   const handleGenerate = async () => {
     if (!jdText) {
       showMessage("Please enter Job Description", "error");
@@ -147,16 +217,9 @@ function App() {
     setGenerating(true);
     setMessage("");
 
-    const formData = new FormData();
-    formData.append("jd_text", jdText);
-    if (resumeFile) {
-      formData.append("resume_file", resumeFile);
-    }
-
     try {
-      const res = await fetch(`${BASE_API_URL}/generate-email`, {
-        method: "POST",
-        body: formData
+      const res = await postWithResume("/generate-email", (formData) => {
+        formData.append("jd_text", jdText);
       });
 
       const data = await res.json();
@@ -196,24 +259,13 @@ function App() {
     console.log("cc", cc);
     console.log("subject", subject);
     console.log("body", body);
-    const formData = new FormData();
-    formData.append("recipient", recipient);
-    formData.append("cc", cc);
-    formData.append("subject", subject);
-    formData.append("body", body);
-    if (resumeFile) {
-      formData.append("resume_file", resumeFile);
-    }
-
-    console.log("formData", formData);
     console.log("Called send email");
-    for (let pair of formData.entries()) {
-      console.log(pair[0], pair[1]);
-    }
     try {
-      const res = await fetch(`${BASE_API_URL}/send-email`, {
-        method: "POST",
-        body: formData
+      const res = await postWithResume("/send-email", (formData) => {
+        formData.append("recipient", recipient);
+        formData.append("cc", cc);
+        formData.append("subject", subject);
+        formData.append("body", body);
       });
 
       const text = await res.text();
@@ -250,22 +302,14 @@ function App() {
     setRegenerating(true);
     setMessage("");
 
-    const formData = new FormData();
-    formData.append("original_body", body);
-
-    if (instruction && instruction.trim()) {
-      formData.append("instruction", instruction);
-    }
-
-    if (resumeFile) {
-      formData.append("resume_file", resumeFile);
-    }
-
     const previousBody = body;
     try {
-      const res = await fetch(`${BASE_API_URL}/regenerate-body`, {
-        method: "POST",
-        body: formData
+      const res = await postWithResume("/regenerate-body", (formData) => {
+        formData.append("original_body", body);
+
+        if (instruction && instruction.trim()) {
+          formData.append("instruction", instruction);
+        }
       });
 
       const data = await res.json();
@@ -350,7 +394,7 @@ function App() {
                   <input
                     type="file"
                     accept="application/pdf"
-                    onChange={(e) => setResumeFile(e.target.files[0])}
+                    onChange={(e) => handleResumeChange(e.target.files[0])}
                     className="block w-full text-sm text-slate-500
                       file:mr-4 file:py-2.5 file:px-4
                       file:rounded-full file:border-0